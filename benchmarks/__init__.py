@@ -0,0 +1,6 @@
+"""Reproducible benchmarks of the langtree core constructs and chain execution.
+
+Run the suite with `python -m benchmarks.run --output results.json` and compare two
+runs with `python -m benchmarks.compare baseline.json results.json`. The import time
+budget is checked with `python -m benchmarks.startup`.
+"""
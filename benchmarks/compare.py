@@ -0,0 +1,76 @@
+"""Compare two benchmark result files, e.g. from two commits.
+
+    python -m benchmarks.compare baseline.json results.json [--threshold 0.1]
+
+Exits with status 1 when a case got slower (or, for memory benchmarks, bigger) by more
+than the threshold.
+"""
+import argparse
+import json
+import sys
+
+
+def case_key(result):
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def metric(result):
+    """Return the number compared for a case: median seconds per call, or peak bytes per item."""
+    if result["kind"] == "memory":
+        return result["stats"]["peak_bytes_per_item"]
+    return result["stats"]["median"]
+
+
+def compare(baseline, current, threshold=0.1):
+    """Match the cases of two result sets and compute their relative change.
+
+    Args:
+        baseline (dict): The reference results, as written by `benchmarks.run`.
+        current (dict): The results to check.
+        threshold (float, optional): The relative increase that counts as a regression. Defaults to 0.1.
+
+    Returns:
+        list of dict: One row per case found in both sets, with `ratio` (current / baseline) and `regression`.
+    """
+    reference = {case_key(result): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        before = reference.get(case_key(result))
+        if before is None:
+            continue
+        old, new = metric(before), metric(result)
+        ratio = new / old if old else float("inf")
+        rows.append({
+            "name": result["name"],
+            "params": result["params"],
+            "kind": result["kind"],
+            "baseline": old,
+            "current": new,
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold,
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative slowdown that fails the comparison")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.threshold)
+    for row in rows:
+        params = ", ".join(f"{key}={value}" for key, value in row["params"].items())
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['name']:<30} {params:<55} {row['ratio']:>7.2f}x{flag}")
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import random
+import threading
+import time
+
+__all__ = ["FakeChatCompletion", "FakeEmbedding"]
+
+
+class _SimulatedLatency:
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter) if self.jitter else self.latency
+        if delay > 0:
+            time.sleep(delay)
+
+
+class FakeChatCompletion(_SimulatedLatency):
+    """Stands in for `openai.ChatCompletion.create`, answering after a simulated network latency.
+
+    The delay of every call is `latency` plus a uniform jitter in `[-jitter, jitter]`,
+    drawn from a seeded generator so runs are reproducible.
+    """
+
+    def __call__(self, messages=(), model=None, **kwargs):
+        self.wait()
+        content = messages[-1]["content"] if messages else ""
+        return {
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(content) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": len(content) // 2},
+        }
+
+
+class FakeEmbedding(_SimulatedLatency):
+    """Stands in for `openai.Embedding.create`, returning deterministic `dim`-dimensional vectors."""
+
+    def __init__(self, dim=1536, latency=0.0, jitter=0.0, seed=0):
+        super().__init__(latency, jitter, seed)
+        self.dim = dim
+
+    def __call__(self, input, model=None, **kwargs):
+        self.wait()
+        data = [{"index": i, "embedding": [(len(text) + j) % 7 / 7 for j in range(self.dim)]}
+                for i, text in enumerate(input)]
+        return {"model": model, "data": data, "usage": {"prompt_tokens": len(input), "total_tokens": len(input)}}
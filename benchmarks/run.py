@@ -0,0 +1,365 @@
+"""Run the benchmark suite and write machine-readable results.
+
+    python -m benchmarks.run --output results.json [--quick] [--filter parallel]
+"""
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import FakeChatCompletion, FakeEmbedding
+from langtree.core import Operator
+from langtree.core.buffer import Buffer, TokenBuffer
+from langtree.core.prompt import Prompt, render_prompt
+from langtree.core.utils import get_embedding_content
+from langtree.models.openai import OpenAIChatCompletion, OpenAIEmbedding
+from langtree.operators import Parallel, Sequential
+from langtree.prompting import UserMessage, to_wire
+from langtree.utils.data import Data
+
+BENCHMARKS = {}
+
+
+def benchmark(name, kind="time", per=None):
+    """Register a benchmark.
+
+    The decorated function takes a `quick` flag and yields `(params, run)` pairs, one per
+    case; `run` is a zero-argument callable. "time" benchmarks time `run`, "memory"
+    benchmarks measure the peak memory it allocates, divided by `params[per]`.
+    """
+    def register(function):
+        BENCHMARKS[name] = (function, kind, per)
+        return function
+    return register
+
+
+def chat_messages(size):
+    return [{"role": "user" if i % 2 else "assistant", "content": "lorem ipsum dolor sit amet " * 8}
+            for i in range(size)]
+
+
+class ListBuffer:
+    """Buffer as it was when it was backed by a list, the baseline of the buffer benchmarks."""
+
+    def __init__(self, length):
+        self._len = length
+        self.memory = []
+
+    def append(self, item):
+        self.memory.append(item)
+        while self._len < len(self.memory):
+            self.memory.pop(0)
+
+    def extend(self, item_list):
+        self.memory.extend(item_list)
+        while self._len < len(self.memory):
+            self.memory.pop(0)
+
+
+BUFFER_TYPES = {"deque": Buffer, "list": ListBuffer}
+
+
+@benchmark("buffer.append")
+def buffer_append(quick):
+    for length in ((100, 1_000) if quick else (100, 10_000)):
+        items = list(range(length * 10))
+        for implementation, cls in BUFFER_TYPES.items():
+
+            def run(items=items, length=length, cls=cls):
+                buffer = cls(length)
+                for item in items:
+                    buffer.append(item)
+                return buffer.memory
+
+            yield {"length": length, "items": len(items), "implementation": implementation}, run
+
+
+@benchmark("buffer.extend")
+def buffer_extend(quick):
+    for length in ((100, 1_000) if quick else (100, 10_000)):
+        items = list(range(length * 10))
+        for implementation, cls in BUFFER_TYPES.items():
+
+            def run(items=items, length=length, cls=cls):
+                buffer = cls(length)
+                buffer.extend(items)
+                return buffer.memory
+
+            yield {"length": length, "items": len(items), "implementation": implementation}, run
+
+
+@benchmark("token_buffer.append")
+def token_buffer_append(quick):
+    messages = chat_messages(200 if quick else 2_000)
+
+    def run():
+        buffer = TokenBuffer(4_096, pin_system=True)
+        for message in messages:
+            buffer.append(message)
+        return buffer.memory
+
+    yield {"items": len(messages), "max_tokens": 4_096}, run
+
+
+@benchmark("prompt.render")
+def prompt_render(quick):
+    for placeholders in (2, 20):
+        template = " ".join(f"section {i}: {{{{var{i}}}}}" for i in range(placeholders))
+        values = {f"var{i}": f"value {i}" for i in range(placeholders)}
+        yield {"placeholders": placeholders, "api": "render_prompt"}, lambda t=template, v=values: render_prompt(t, **v)
+        prompt = Prompt(template)
+        yield {"placeholders": placeholders, "api": "Prompt"}, lambda p=prompt, v=values: p(**v)
+
+
+@benchmark("prompt.render_many")
+def prompt_render_many(quick):
+    rows = [{"name": f"user {i}", "question": f"question {i}"} for i in range(1_000 if quick else 100_000)]
+    prompt = Prompt("Hello {{name}}, here is the answer to {{question}}.")
+    yield {"rows": len(rows)}, lambda: sum(1 for _ in prompt.render_many(rows))
+
+
+@benchmark("embedding.parse")
+def embedding_parse(quick):
+    for count in ((10, 100) if quick else (10, 1_000)):
+        output = [[(i + j) % 7 / 7 for j in range(1536)] for i in range(count)]
+        for as_array in (False, True):
+            yield {"embeddings": count, "dim": 1536, "as_array": as_array}, \
+                lambda o=output, a=as_array: get_embedding_content(o, as_array=a)
+
+
+@benchmark("sequential.dispatch")
+def sequential_dispatch(quick):
+    for stages in (1, 10, 50):
+        chain = Sequential([Operator(call=lambda x: x, parse=None) for _ in range(stages)])
+        yield {"stages": stages}, lambda c=chain: c(1)
+
+
+@benchmark("parallel.fanout")
+def parallel_fanout(quick):
+    sizes = (1, 50) if quick else (1, 50, 500)
+    for branches in (2, 8):
+        for size in sizes:
+            messages = chat_messages(size)
+            for isolation in ("deepcopy", "copy-on-write", "shared"):
+                chain = Parallel([Operator(call=lambda messages: len(messages), parse=None) for _ in range(branches)],
+                                 isolation=isolation)
+                yield {"branches": branches, "messages": size, "isolation": isolation}, \
+                    lambda c=chain, m=messages: c(m)
+
+
+@benchmark("chain.latency")
+def chain_latency(quick):
+    """A prompt -> fake provider -> parse chain; overhead is the time beyond the simulated latency."""
+    for latency, jitter in ((0.0, 0.0), (0.005, 0.002)):
+        chat = OpenAIChatCompletion(call=FakeChatCompletion(latency, jitter), model="fake")
+        prompt = Operator(call=lambda question: [{"role": "user", "content": f"Answer briefly: {question}"}],
+                          parse=None)
+        chain = Sequential([prompt, Operator(call=lambda messages: chat(messages=messages), parse=None)])
+        yield {"latency": latency, "jitter": jitter}, lambda c=chain: c("why is the sky blue?")
+
+
+@benchmark("chain.fanout_scaling")
+def chain_fanout_scaling(quick):
+    """Wall time of a fan-out to fake providers; ideal thread scaling keeps it near one latency."""
+    latency = 0.01
+    for branches in ((1, 4, 16) if quick else (1, 4, 16, 64)):
+        chat = FakeChatCompletion(latency, latency / 5)
+        chain = Parallel([OpenAIChatCompletion(call=chat, model="fake") for _ in range(branches)],
+                         executor="thread", max_workers=branches, isolation="shared")
+        messages = chat_messages(4)
+        yield {"branches": branches, "latency": latency}, lambda c=chain, m=messages: c(messages=m)
+
+
+@benchmark("embedding.batched_call")
+def embedding_batched_call(quick):
+    docs = [f"document number {i}" for i in range(200 if quick else 5_000)]
+    for workers in (1, 4):
+        embedding = OpenAIEmbedding(create=FakeEmbedding(dim=64, latency=0.002), batch_size=100, max_workers=workers,
+                                    as_array=True, model="fake")
+        yield {"documents": len(docs), "max_workers": workers}, lambda e=embedding: e(docs)
+
+
+@benchmark("ivf.search")
+def ivf_search(quick):
+    """IVF search latency per nprobe, next to exact search; recall is checked by tests/vectordb/test_ivf.py."""
+    import numpy as np
+
+    from langtree.vectordb import IVFVectorDatabase, MemoryVectorDatabase
+
+    rng = np.random.default_rng(42)
+    centers = rng.normal(size=(64, 32))
+    size = 5_000 if quick else 20_000
+    data = (centers[rng.integers(64, size=size + 200)] + 0.3 * rng.normal(size=(size + 200, 32))).astype(np.float32)
+    vectors, queries = data[:size], data[size:]
+    for metric in ("cosine", "l2"):
+        exact = MemoryVectorDatabase(metric=metric)
+        exact.insert(vectors)
+        yield {"metric": metric, "vectors": size, "nprobe": "exact"}, lambda e=exact: e.search(queries, 10)
+
+        index = IVFVectorDatabase(metric=metric, nlist=64)
+        index.insert(vectors)
+        for nprobe in (1, 4, 16, 64):
+            yield {"metric": metric, "vectors": size, "nprobe": nprobe}, \
+                lambda i=index, n=nprobe: i.search(queries, 10, nprobe=n)
+
+
+@benchmark("chain.memory_per_in_flight", kind="memory", per="in_flight")
+def chain_memory(quick):
+    for size in ((10, 100) if quick else (10, 100, 1_000)):
+        for in_flight in (8, 32):
+            chat = FakeChatCompletion(0.001)
+            chain = Sequential([
+                Operator(call=lambda messages: messages, parse=None),
+                Parallel([OpenAIChatCompletion(call=chat, model="fake") for _ in range(2)]),
+            ])
+            messages = chat_messages(size)
+
+            def run(c=chain, m=messages, n=in_flight):
+                with ThreadPoolExecutor(max_workers=n) as executor:
+                    list(executor.map(lambda _: c(messages=m), range(n)))
+
+            yield {"messages": size, "in_flight": in_flight}, run
+
+
+class DataUserMessage(Data):
+    """UserMessage as it was when messages were Data dicts, the baseline of the message benchmarks."""
+    role = "user"
+    content = None
+
+    def __init__(self, content=None):
+        super().__init__(role=DataUserMessage.role, content=content)
+        self.content = content
+
+
+MESSAGE_TYPES = {"slotted": UserMessage, "data": DataUserMessage}
+
+
+@benchmark("messages.construct")
+def messages_construct(quick):
+    texts = [f"message number {i}" for i in range(1_000 if quick else 100_000)]
+    for implementation, cls in MESSAGE_TYPES.items():
+        yield {"messages": len(texts), "implementation": implementation}, lambda c=cls: [c(content=t) for t in texts]
+
+
+@benchmark("messages.to_wire")
+def messages_to_wire(quick):
+    count = 1_000 if quick else 100_000
+    for implementation, cls in MESSAGE_TYPES.items():
+        messages = [cls(content=f"message number {i}") for i in range(count)]
+        convert = to_wire if implementation == "slotted" else (lambda m: [dict(message) for message in m])
+        yield {"messages": count, "implementation": implementation}, lambda f=convert, m=messages: f(m)
+
+
+@benchmark("messages.memory", kind="memory", per="messages")
+def messages_memory(quick):
+    texts = [f"message number {i}" for i in range(1_000 if quick else 100_000)]
+    for implementation, cls in MESSAGE_TYPES.items():
+        yield {"messages": len(texts), "implementation": implementation}, lambda c=cls: [c(content=t) for t in texts]
+
+
+def time_case(run, repeat, min_time):
+    """Time `run`, calibrating the number of calls per sample so every sample lasts `min_time`."""
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    number = max(1, int(min_time / elapsed)) if elapsed > 0 else 1000
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        samples.append((time.perf_counter() - start) / number)
+    samples.sort()
+    median = statistics.median(samples)
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min": samples[0],
+        "median": median,
+        "mean": statistics.fmean(samples),
+        "p95": samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+        "ops_per_sec": 1 / median if median else None,
+    }
+
+
+def memory_case(run, count):
+    tracemalloc.start()
+    try:
+        # Keep what `run` returns alive until the peak is read, e.g. the objects being measured
+        result = run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {"peak_bytes": peak, "peak_bytes_per_item": peak / count}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(quick=False, names=None, repeat=None, min_time=None):
+    """Run the registered benchmarks.
+
+    Args:
+        quick (bool, optional): Use small inputs and short samples, e.g. for a smoke test. Defaults to False.
+        names (str, optional): Only run benchmarks whose name contains this string.
+        repeat (int, optional): The number of samples per case. Defaults to 3 when quick, 7 otherwise.
+        min_time (float, optional): The minimum duration of a sample. Defaults to 0.005s when quick, 0.1s otherwise.
+
+    Returns:
+        dict: The results, with a "meta" section describing the environment and one entry per case.
+    """
+    repeat = repeat or (3 if quick else 7)
+    min_time = min_time if min_time is not None else (0.005 if quick else 0.1)
+
+    results = []
+    for name, (function, kind, per) in BENCHMARKS.items():
+        if names and names not in name:
+            continue
+        for params, run in function(quick):
+            stats = memory_case(run, params[per]) if kind == "memory" else time_case(run, repeat, min_time)
+            results.append({"name": name, "kind": kind, "params": params, "stats": stats})
+
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", "-o", help="Write the JSON results to this file instead of stdout")
+    parser.add_argument("--quick", action="store_true", help="Small inputs and short samples")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this string")
+    parser.add_argument("--repeat", type=int, help="The number of samples per case")
+    args = parser.parse_args(argv)
+
+    results = run_suite(quick=args.quick, names=args.filter, repeat=args.repeat)
+    data = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(data + "\n")
+    else:
+        sys.stdout.write(data + "\n")
+
+
+if __name__ == "__main__":
+    main()
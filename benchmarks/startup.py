@@ -0,0 +1,64 @@
+"""Measure the cold-start import time of langtree and check it against a budget.
+
+    python -m benchmarks.startup [--budget 0.15]
+
+Exits with status 1 when the import takes longer than the budget or loads a heavy
+dependency that should only be imported on first use.
+"""
+import argparse
+import subprocess
+import sys
+
+MODULES = ("langtree", "langtree.core", "langtree.operators", "langtree.models.openai", "langtree.vectordb")
+
+# Imported on first use only; none of them may be loaded by importing MODULES
+LAZY_DEPENDENCIES = ("openai", "aiohttp", "requests", "numpy", "backoff", "asyncio", "sqlite3", "multiprocessing",
+                     "urllib.request")
+
+BUDGET = 0.15
+
+
+def measure_import(modules=MODULES, repeat=3):
+    """Import modules in fresh interpreters and report the fastest run.
+
+    Args:
+        modules (tuple of str, optional): The modules to import.
+        repeat (int, optional): The number of interpreters to start. Defaults to 3.
+
+    Returns:
+        tuple: The import time in seconds, as reported by `-X importtime` for the top-level
+            packages of `modules`, and the sorted list of LAZY_DEPENDENCIES that were loaded.
+    """
+    code = (f"import sys\nimport {', '.join(modules)}\n"
+            f"print(','.join(m for m in {LAZY_DEPENDENCIES!r} if m in sys.modules))")
+    times = []
+    for _ in range(repeat):
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                                 check=True)
+        total = 0
+        for line in process.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package", children are indented
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line.split("|")
+            if name.startswith(" ") and not name.startswith("  ") and name.strip() in modules:
+                total += int(cumulative)
+        times.append(total / 1e6)
+        loaded = sorted(filter(None, process.stdout.strip().split(",")))
+    return min(times), loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=BUDGET, help="The maximum import time in seconds")
+    args = parser.parse_args(argv)
+
+    seconds, loaded = measure_import()
+    print(f"import {', '.join(MODULES)}: {seconds * 1000:.1f}ms (budget {args.budget * 1000:.0f}ms)")
+    if loaded:
+        print(f"eagerly imported: {', '.join(loaded)}")
+    return 1 if seconds > args.budget or loaded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
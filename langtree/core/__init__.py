@@ -2,3 +2,8 @@ from langtree.core.buffer import *
 from langtree.core.operator import *
 from langtree.core.prompt import *
 from langtree.core.vectordb import *
+from langtree.core.cache import *
+from langtree.core.scheduler import *
+from langtree.core.batching import *
+from langtree.core.recording import *
+from langtree.core.registry import *
@@ -0,0 +1,147 @@
+import threading
+from concurrent.futures import Future
+
+from langtree.core.cache import make_cache_key
+from langtree.core.operator import Operator
+
+__all__ = ["BatchedOperator", "concatenate_call"]
+
+
+def concatenate_call(call):
+    """Make a batch call out of a call taking a list of inputs, like an embeddings endpoint.
+
+    The input lists of every caller are concatenated into one call, and its output
+    is sliced back into one result per caller.
+
+    Args:
+        call (callable): A function taking a list of inputs and returning one output per input.
+
+    Returns:
+        callable: A function taking a list of input lists and returning one output list per input list.
+    """
+    def batch_call(inputs, **kwargs):
+        output = call([item for items in inputs for item in items], **kwargs)
+        results, start = [], 0
+        for items in inputs:
+            results.append(output[start:start + len(items)])
+            start += len(items)
+        return results
+
+    return batch_call
+
+
+class _Batch:
+
+    def __init__(self, kwargs):
+        self.kwargs = kwargs
+        self.inputs = []
+        self.futures = []
+        self.timer = None
+
+
+class BatchedOperator(Operator):
+    """Wrap an Operator so concurrent calls are sent to the provider as one batched call.
+
+    Calls with the same keyword arguments that arrive within `max_wait_ms` of the first
+    one are collected, up to `max_batch_size`, and dispatched together through
+    `batch_call`. Each caller gets its own slice of the raw output back, which then goes
+    through the wrapped operator's `parse` on the caller's side, so callers see exactly
+    what the wrapped operator would have returned.
+
+    By default the first argument of every call must be a list of inputs (e.g. the
+    documents of an `OpenAIEmbedding`) and the lists are concatenated into one call.
+    """
+
+    def __init__(self, operator, max_batch_size=64, max_wait_ms=5, batch_call=None):
+        """Initialize the micro-batching wrapper.
+
+        Args:
+            operator (Operator): The operator whose calls are batched.
+            max_batch_size (int, optional): The maximum number of calls merged into one batch. Defaults to 64.
+            max_wait_ms (float, optional): How long the first call of a batch waits for others to join. Defaults to 5.
+            batch_call (callable, optional): Takes the list of the callers' first arguments plus the shared
+                keyword arguments and returns one raw output per caller. Defaults to
+                `concatenate_call(operator.call)`.
+        """
+        super().__init__(call=self._batched_call, parse=operator.parse)
+        self.operator = operator
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batch_call = concatenate_call(operator.call) if batch_call is None else batch_call
+        self.batches = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def submit(self, inputs, **kwargs):
+        """Queue a call and return a future for its raw (unparsed) output.
+
+        Args:
+            inputs: The first argument of the call.
+            **kwargs: The keyword arguments of the call. Only calls with equal keyword arguments are batched together.
+
+        Returns:
+            concurrent.futures.Future: The future raw output.
+        """
+        try:
+            key = make_cache_key(self.operator.call, (), kwargs)
+        except TypeError:
+            # Arguments without a stable key cannot be compared, so the call gets a batch of its own
+            key = object()
+        future = Future()
+        with self._lock:
+            batch = self._pending.get(key)
+            if batch is None:
+                batch = self._pending[key] = _Batch(kwargs)
+                batch.timer = threading.Timer(self.max_wait_ms / 1000, self._flush, (key, batch))
+                batch.timer.daemon = True
+                batch.timer.start()
+            batch.inputs.append(inputs)
+            batch.futures.append(future)
+            full = len(batch.inputs) >= self.max_batch_size
+
+        if full:
+            self._flush(key, batch)
+        return future
+
+    @property
+    def streams(self):
+        """bool: Whether the wrapped operator can stream."""
+        return self.operator.streams
+
+    def stream(self, *args, **kwargs):
+        """Stream from the wrapped operator. Streamed calls are not batched."""
+        return self.operator.stream(*args, **kwargs)
+
+    def _batched_call(self, inputs, **kwargs):
+        return self.submit(inputs, **kwargs).result()
+
+    def _flush(self, key, batch):
+        with self._lock:
+            # The timer and a full batch may both try to flush it; only the first one does
+            if self._pending.get(key) is not batch:
+                return
+            del self._pending[key]
+            batch.timer.cancel()
+            self.batches += 1
+
+        try:
+            results = self.batch_call(batch.inputs, **batch.kwargs)
+            if len(results) != len(batch.futures):
+                raise ValueError(f"batch_call returned {len(results)} results for {len(batch.futures)} calls")
+        except BaseException as e:
+            for future in batch.futures:
+                future.set_exception(e)
+            return
+
+        for future, result in zip(batch.futures, results):
+            future.set_result(result)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_pending"] = {}
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
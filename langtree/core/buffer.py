@@ -1,3 +1,64 @@
+from collections import deque
+from collections.abc import Sequence
+from itertools import chain
+
+
+class BufferView(Sequence):
+    """A read-only, live view of a buffer's content, as returned by `Buffer.view`.
+
+    The view wraps the buffer's storage instead of copying it, so it always
+    reflects the current content and getting it costs O(1). It has no mutating
+    methods: add items through the buffer, and copy the view (e.g. `list(view)`)
+    to keep a snapshot or to iterate while the buffer changes.
+
+    Views compare equal to lists and tuples holding the same items.
+    """
+
+    __slots__ = ("_head", "_items")
+
+    def __init__(self, items, head=()):
+        """Initialize the view.
+
+        Args:
+            items (collections.deque): The buffer's storage.
+            head (list, optional): Items shown before `items`, e.g. a pinned message. Defaults to ().
+        """
+        self._items = items
+        self._head = head
+
+    def __len__(self):
+        return len(self._head) + len(self._items)
+
+    def __iter__(self):
+        return chain(self._head, self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("buffer index out of range")
+        if index < len(self._head):
+            return self._head[index]
+        return self._items[index - len(self._head)]
+
+    def __eq__(self, other):
+        if not isinstance(other, (BufferView, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __add__(self, other):
+        return list(self) + other
+
+    def __radd__(self, other):
+        return other + list(self)
+
+    def __repr__(self):
+        return list(self).__repr__()
+
 
 class Buffer:
     """A class to represent a buffer with a fixed length.
@@ -5,6 +66,9 @@ class Buffer:
     This buffer allows appending and extending its content while ensuring 
     it never exceeds its defined length. If the buffer's content exceeds 
     its length, items are removed from the beginning.
+
+    The content is kept in a bounded deque, so appending and evicting are O(1).
+    `memory` returns a list copy of it, and `view` a zero-copy read-only view.
     """
 
     def __init__(self, length):
@@ -14,7 +78,8 @@ class Buffer:
             length (int): The maximum length of the buffer.
         """
         self._len = length
-        self._memory = []
+        self._memory = deque(maxlen=length)
+        self._view = BufferView(self._memory)
 
     def append(self, item):
         """Append an item to the buffer and ensure the buffer does not exceed its length.
@@ -23,7 +88,6 @@ class Buffer:
             item: The item to append.
         """
         self._memory.append(item)
-        self._shrink()
 
     def extend(self, item_list):
         """Extend the buffer with a list of items and ensure the buffer does not exceed its length.
@@ -32,12 +96,6 @@ class Buffer:
             item_list (list): The list of items to extend the buffer with.
         """
         self._memory.extend(item_list)
-        self._shrink()
-
-    def _shrink(self):
-        """Private method to shrink the buffer to its defined length by removing items from the beginning."""
-        while self._len < len(self._memory):
-            self._memory.pop(0)
 
     def __add__(self, item):
         """Handle addition operations with the buffer. Allows for adding a single item or a list of items.
@@ -70,13 +128,126 @@ class Buffer:
 
     def __repr__(self):
         """Return a representation of the buffer's memory."""
-        return self._memory.__repr__()
+        return self._view.__repr__()
 
     @property
     def memory(self):
         """Provide access to the buffer's memory.
 
         Returns:
-            list: The buffer's memory content.
+            list: A copy of the buffer's memory content. Changing it does not change the buffer.
         """
-        return self._memory
+        return list(self._view)
+
+    def view(self):
+        """Return a read-only view of the buffer's memory, without copying it.
+
+        The view is live: it follows later changes to the buffer. Use `append`/`extend`
+        to change the buffer.
+
+        Returns:
+            BufferView: The view.
+        """
+        return self._view
+
+
+def approximate_token_count(text):
+    """Estimate the number of tokens in a text using the common ~4 characters per token heuristic.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    return (len(text) + 3) // 4
+
+
+class TokenBuffer(Buffer):
+    """A buffer capped by a token budget instead of a number of items.
+
+    Every item is measured once when it is added and the running total is kept up
+    to date, so evicting the oldest items costs amortized O(1) per append. Items
+    that are mappings (e.g. chat messages) are measured by their "content". With
+    `pin_system`, `memory` starts with the pinned system message.
+    """
+
+    def __init__(self, max_tokens, tokenizer=None, pin_system=False):
+        """Initialize the TokenBuffer with a token budget.
+
+        Args:
+            max_tokens (int): The maximum number of tokens the buffer may hold.
+            tokenizer (callable, optional): A function turning a text into its tokens, e.g. a tiktoken
+                encoding's `encode`. Defaults to `approximate_token_count`.
+            pin_system (bool, optional): Never evict the first system message. It counts toward
+                `max_tokens`, so it must fit in the budget on its own. Defaults to False.
+        """
+        super().__init__(None)
+        self.max_tokens = max_tokens
+        self.tokenizer = tokenizer
+        self.pin_system = pin_system
+        self._counts = deque()
+        self._pinned = []
+        self._view = BufferView(self._memory, self._pinned)
+        self.tokens = 0
+
+    def count(self, item):
+        """Count the tokens of an item with the buffer's tokenizer.
+
+        Args:
+            item: The item to measure.
+
+        Returns:
+            int: The number of tokens in the item.
+        """
+        text = item.get("content") if hasattr(item, "get") else item
+        text = "" if text is None else str(text)
+        if self.tokenizer is None:
+            return approximate_token_count(text)
+        return len(self.tokenizer(text))
+
+    def append(self, item):
+        """Append an item to the buffer and evict the oldest items until the budget is met.
+
+        Args:
+            item: The item to append.
+
+        Raises:
+            ValueError: If the item is the system message to pin and it alone exceeds `max_tokens`.
+        """
+        self._push(item)
+        self._evict()
+
+    def extend(self, item_list):
+        """Extend the buffer with a list of items and evict the oldest items until the budget is met.
+
+        Args:
+            item_list (list): The list of items to extend the buffer with.
+
+        Raises:
+            ValueError: If the system message to pin alone exceeds `max_tokens`.
+        """
+        try:
+            for item in item_list:
+                self._push(item)
+        finally:
+            self._evict()
+
+    def _push(self, item):
+        tokens = self.count(item)
+        pin = self.pin_system and not self._pinned and hasattr(item, "get") and item.get("role") == "system"
+        if pin and tokens > self.max_tokens:
+            raise ValueError(f"The pinned system message has {tokens} tokens, more than the buffer's budget of "
+                             f"{self.max_tokens}. It can never be evicted, so raise max_tokens or shorten it.")
+        self.tokens += tokens
+
+        if pin:
+            self._pinned.append(item)
+        else:
+            self._memory.append(item)
+            self._counts.append(tokens)
+
+    def _evict(self):
+        while self.tokens > self.max_tokens and self._memory:
+            self._memory.popleft()
+            self.tokens -= self._counts.popleft()
@@ -0,0 +1,779 @@
+import bisect
+import contextlib
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import threading
+import time
+import types
+import weakref
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from concurrent.futures import Future
+
+from langtree.core.operator import Operator, call_async
+from langtree.core.recording import annotate, record_usage, traced
+
+__all__ = ["make_cache_key", "MemoryCache", "SQLiteCache", "CachedOperator", "EmbeddingCache"]
+
+
+def _code_digest(code):
+    """Hash the bytecode, constants and names of a code object, nested functions included."""
+    constants = []
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            constant = _code_digest(constant)
+        elif isinstance(constant, frozenset):
+            constant = sorted(constant, key=repr)
+        constants.append(repr(constant))
+    return hashlib.sha256(repr((code.co_code, constants, code.co_names)).encode("utf-8")).hexdigest()
+
+
+def _function_key(function, seen=None):
+    """Identify a function in a cache key.
+
+    Functions are named by module and qualified name. Lambdas and nested functions, whose
+    names are not unique, also get a digest of their code, defaults and captured values
+    (see `_captured`), so two lambdas of one module, or two closures over different
+    settings, never share a key. A bound method also gets a digest of its instance's
+    attributes, so two clients with different settings never share a key either. Other
+    callable objects are identified by their class.
+    """
+    seen = set() if seen is None else seen
+    instance = function.__self__ if inspect.ismethod(function) else None
+    key = _code_key(inspect.unwrap(getattr(function, "__func__", function)), seen)
+    if instance is None:
+        return key
+    if isinstance(instance, type):
+        # A class method: the class it was called on is enough
+        return f"{key}@{instance.__module__}.{instance.__qualname__}"
+    if id(instance) in seen:
+        return key
+    seen.add(id(instance))
+    attributes = getattr(instance, "__dict__", None)
+    if attributes is None:
+        raise TypeError(f"Cannot build a cache key from a method of a {type(instance).__name__}: the instance "
+                        f"has no attributes to identify it by. Cache a plain function instead")
+    data = json.dumps({name: _captured(value, seen) for name, value in attributes.items()},
+                      sort_keys=True, separators=(",", ":"))
+    return f"{key}@{hashlib.sha256(data.encode('utf-8')).hexdigest()}"
+
+
+def _code_key(function, seen):
+    """Name a function, adding a digest of its code and captured values when the name is not unique."""
+    if not hasattr(function, "__qualname__"):
+        function = type(function)
+    name = f"{function.__module__}.{function.__qualname__}"
+    code = getattr(function, "__code__", None)
+    if code is None or "<" not in function.__qualname__ or id(function) in seen:
+        return name
+
+    seen.add(id(function))
+    closure = []
+    for cell in function.__closure__ or ():
+        try:
+            closure.append(cell.cell_contents)
+        except ValueError:
+            # A cell whose variable is not assigned yet
+            closure.append(None)
+    identity = [
+        _code_digest(code),
+        _captured(function.__defaults__, seen),
+        {key: _captured(value, seen) for key, value in (function.__kwdefaults__ or {}).items()},
+        [_captured(value, seen) for value in closure],
+    ]
+    data = json.dumps(identity, sort_keys=True, separators=(",", ":"))
+    return f"{name}:{hashlib.sha256(data.encode('utf-8')).hexdigest()}"
+
+
+def _captured(value, seen):
+    """Encode a value captured by a function: immutable values by value, anything else by type.
+
+    Mutable state, e.g. a list the function appends to, would otherwise change the key on every call.
+    """
+    if isinstance(value, (str, int, float, bool, type(None))):
+        return value
+    if isinstance(value, bytes):
+        return {"bytes": value.hex()}
+    if type(value) is tuple:
+        return [_captured(item, seen) for item in value]
+    if isinstance(value, frozenset):
+        return sorted((_captured(item, seen) for item in value), key=repr)
+    if callable(value):
+        return {"function": _function_key(value, seen)}
+    return {"type": f"{type(value).__module__}.{type(value).__qualname__}"}
+
+
+def _encode(value):
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    if isinstance(value, bytes):
+        return {"bytes": value.hex()}
+    if isinstance(value, Sequence):
+        return list(value)
+    if callable(value):
+        return {"function": _function_key(value)}
+    raise TypeError(f"Cannot build a cache key from a {type(value).__name__}: its value has no stable "
+                    f"serialization. Pass JSON-serializable arguments, or do not cache this call")
+
+
+def make_cache_key(call, args=(), kwargs=None):
+    """Build a stable key for a call from its function, frozen arguments and call arguments.
+
+    Frozen arguments (`functools.partial` layers, as built by `Operator.freeze_call`) are
+    merged with the call arguments, so freezing `model="x"` or passing it at call time
+    produce the same key. The arguments are serialized to canonical JSON (sorted keys)
+    and hashed, so the key is the same in every process. Lambdas and closures are told
+    apart by their code and captured values, bound methods by the attributes of their
+    instance. Arguments that cannot be serialized raise rather than falling back to a
+    `repr`, which could collide.
+
+    Args:
+        call (callable): The function that would be called.
+        args (tuple, optional): The positional arguments of the call.
+        kwargs (dict, optional): The keyword arguments of the call.
+
+    Returns:
+        str: The SHA-256 hex digest identifying the call.
+
+    Raises:
+        TypeError: If an argument, or a value a closure captures, has no stable serialization, or
+            `call` is a method of an object without a `__dict__`.
+    """
+    frozen_args, frozen_kwargs = [], {}
+    while isinstance(call, functools.partial):
+        frozen_args[:0] = call.args
+        frozen_kwargs = {**call.keywords, **frozen_kwargs}
+        call = call.func
+
+    payload = {
+        "function": _function_key(call),
+        "args": [*frozen_args, *args],
+        "kwargs": {**frozen_kwargs, **(kwargs or {})},
+    }
+    data = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_encode)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """A thread-safe in-memory LRU cache with optional time-to-live."""
+
+    def __init__(self, max_size=1024, ttl=None):
+        """Initialize an empty cache.
+
+        Args:
+            max_size (int, optional): The maximum number of entries; the least recently used is evicted first. Defaults to 1024.
+            ttl (float, optional): The number of seconds an entry stays valid. Defaults to no expiry.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Look up a key.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            tuple: `(found, value)`; `value` is None when the key is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entries beyond `max_size`.
+
+        Args:
+            key (str): The key.
+            value: The value.
+        """
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """A persistent cache in a SQLite file, shared by every process that opens the same path.
+
+    Values are pickled. The database runs in WAL mode so readers do not block writers.
+    Every thread uses its own connection; `close` closes all of them.
+    """
+
+    def __init__(self, path, ttl=None, max_size=None):
+        """Open (or create) a cache file.
+
+        Args:
+            path (str): The path of the SQLite database.
+            ttl (float, optional): The number of seconds an entry stays valid. Defaults to no expiry.
+            max_size (int, optional): The maximum number of entries; the oldest are evicted first. Defaults to no limit.
+        """
+        self.path = os.fspath(path)
+        self.ttl = ttl
+        self.max_size = max_size
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        # Closes the connections of a cache that is dropped without calling `close`
+        self._finalizer = weakref.finalize(self, _close_connections, self._connections, self._lock)
+        with self._connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, created REAL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS cache_created ON cache (created)")
+
+    def _connection(self):
+        # sqlite3 connections cannot be used by two threads at once, so every thread opens its own
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            import sqlite3
+
+            # Only the owning thread uses it, but `close` may close it from any thread
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            with self._lock:
+                self._connections.append(connection)
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        """Look up a key.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            tuple: `(found, value)`; `value` is None when the key is missing or expired.
+        """
+        row = self._connection().execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.ttl is not None and row[1] + self.ttl <= time.time()):
+            return False, None
+        return True, pickle.loads(row[0])
+
+    def set(self, key, value):
+        """Store a value, evicting expired entries and the oldest entries beyond `max_size`.
+
+        Args:
+            key (str): The key.
+            value: The value. It must be picklable.
+        """
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                               (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now))
+            if self.ttl is not None:
+                connection.execute("DELETE FROM cache WHERE created <= ?", (now - self.ttl,))
+            if self.max_size is not None:
+                connection.execute("DELETE FROM cache WHERE key IN "
+                                   "(SELECT key FROM cache ORDER BY created DESC LIMIT -1 OFFSET ?)", (self.max_size,))
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def clear(self):
+        """Remove every entry."""
+        with self._connection() as connection:
+            connection.execute("DELETE FROM cache")
+
+    def close(self):
+        """Close the connections of every thread, once none of them is using the cache.
+
+        The cache reopens a connection if it is used again.
+        """
+        _close_connections(self._connections, self._lock)
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getstate__(self):
+        return {"path": self.path, "ttl": self.ttl, "max_size": self.max_size}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+def _close_connections(connections, lock):
+    with lock:
+        closing = list(connections)
+        connections.clear()
+    for connection in closing:
+        connection.close()
+
+
+class CachedOperator(Operator):
+    """Wrap an Operator so identical calls are answered from a cache.
+
+    The raw output of the wrapped operator's `call` is cached under a key built from
+    its frozen arguments and the call arguments (see `make_cache_key`); `parse` still
+    runs on every call. Lookups go to an in-memory LRU first, then to the optional
+    persistent tier, whose hits are promoted to memory. Concurrent identical calls are
+    coalesced: only the first one reaches the wrapped operator, the others wait for its
+    result. Failed calls are not cached.
+
+    Only cache deterministic requests (e.g. `temperature=0`): a cached answer is reused as is.
+    Token usage and cost are recorded only on the call that actually reached the wrapped
+    operator, not on hits or coalesced calls.
+    """
+
+    # Usage is recorded where the upstream call happens, see `_cached_call`
+    _records_usage = False
+
+    def __init__(self, operator, max_size=1024, ttl=None, backend=None):
+        """Initialize the caching wrapper.
+
+        Args:
+            operator (Operator): The operator to cache, e.g. an `OpenAIChatCompletion`.
+            max_size (int, optional): The maximum number of entries kept in memory. Defaults to 1024.
+            ttl (float, optional): The number of seconds an in-memory entry stays valid. Defaults to no expiry.
+            backend (object, optional): A persistent tier with `get`/`set` methods, e.g. a `SQLiteCache`.
+        """
+        super().__init__(call=self._cached_call, parse=operator.parse)
+        self.operator = operator
+        self.memory = MemoryCache(max_size=max_size, ttl=ttl)
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        """dict: The hit, miss and coalesced-call counters."""
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+    def clear(self):
+        """Empty the in-memory tier and reset the counters. The persistent tier is left untouched."""
+        self.memory.clear()
+        self.hits = self.misses = self.coalesced = 0
+
+    @property
+    def streams(self):
+        """bool: Whether the wrapped operator can stream."""
+        return self.operator.streams
+
+    def stream(self, *args, **kwargs):
+        """Stream from the wrapped operator. Streamed calls bypass the cache."""
+        return self.operator.stream(*args, **kwargs)
+
+    @traced
+    async def acall(self, *args, **kwargs):
+        """Asynchronously call through the cache.
+
+        An `async def` call function is awaited before its result is cached, so hits return
+        the result rather than an already awaited coroutine.
+
+        Args:
+            *args: Variable length argument list.
+            **kwargs: Arbitrary keyword arguments.
+
+        Returns:
+            The parsed result of the call function.
+        """
+        res = await self._acached_call(*args, **kwargs)
+        if self.parse is not None:
+            res = self.parse(res)
+            if inspect.isawaitable(res):
+                res = await res
+        return res
+
+    def _cached_call(self, *args, **kwargs):
+        key = make_cache_key(self.operator.call, args, kwargs)
+        found, value, future, leader = self._claim(key)
+        if found:
+            return value
+        if not leader:
+            annotate(cache="coalesced")
+            return future.result()
+
+        try:
+            found, value = self._lookup(key)
+            if not found:
+                value = self.operator.call(*args, **kwargs)
+                if inspect.isawaitable(value):
+                    getattr(value, "close", lambda: None)()
+                    raise TypeError("The call function is asynchronous, call the CachedOperator with `acall`")
+                record_usage(value)
+            self._store(key, value, found)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    async def _acached_call(self, *args, **kwargs):
+        key = make_cache_key(self.operator.call, args, kwargs)
+        found, value, future, leader = self._claim(key)
+        if found:
+            return value
+        if not leader:
+            annotate(cache="coalesced")
+            import asyncio
+
+            return await asyncio.wrap_future(future)
+
+        try:
+            found, value = self._lookup(key)
+            if not found:
+                value = await call_async(self.operator.call, *args, **kwargs)
+                record_usage(value)
+            self._store(key, value, found)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _claim(self, key):
+        """Look a key up in memory, or join the in-flight call computing it, or become that call.
+
+        Returns:
+            tuple: `(found, value, future, leader)`. The leader must settle `future` and remove it
+            from the in-flight calls.
+        """
+        with self._lock:
+            found, value = self.memory.get(key)
+            if found:
+                self.hits += 1
+                annotate(cache="hit")
+                return True, value, None, False
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        return False, None, future, leader
+
+    def _lookup(self, key):
+        """Look a key up in the persistent tier, counting the hit or miss."""
+        found, value = (False, None) if self.backend is None else self.backend.get(key)
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        annotate(cache="hit" if found else "miss")
+        return found, value
+
+    def _store(self, key, value, persisted):
+        if not persisted and self.backend is not None:
+            self.backend.set(key, value)
+        self.memory.set(key, value)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_in_flight"] = {}
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _file_lock(path):
+    """Hold an exclusive lock on the file `path`, created if needed, that other processes also wait for."""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    # Only retries for about ten seconds before raising
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class EmbeddingCache:
+    """A compact cache of embeddings keyed by `(model, content hash)`.
+
+    Embeddings are stored as rows of float32 matrices next to arrays of 16-byte content
+    hashes; a dict maps each hash to its row. `save` appends the rows added since the
+    last save as a segment of two `.npy` files, listed in a manifest, and `load`
+    memory-maps the segments, so many workers can share one cache without copying it.
+    New entries go to an in-memory tail until the next `save`. One cache holds
+    embeddings of a single dimension. Requires NumPy.
+    """
+
+    MANIFEST = "manifest.json"
+    LOCK = "manifest.lock"
+
+    def __init__(self, dim=None, capacity=1024):
+        """Initialize an empty cache.
+
+        Args:
+            dim (int, optional): The dimensionality of the embeddings. Inferred from the first insert when omitted.
+            capacity (int, optional): The number of rows to allocate up front. Defaults to 1024.
+        """
+        self.dim = dim
+        self._capacity = capacity
+        self._index = {}
+        # The key of every row: the rows of the segments opened by `load`, then the in-memory tail
+        self._keys = []
+        self._segments = []
+        self._starts = []
+        self._offset = 0
+        self._vectors = None
+        self._size = 0
+        # The directory and row count of the last save or load, used to append new segments
+        self._persisted = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._index)
+
+    @staticmethod
+    def key(model, text):
+        """Return the 16-byte content hash of a text embedded with a model.
+
+        Args:
+            model (str): The embedding model.
+            text (str): The embedded text.
+
+        Returns:
+            bytes: The key.
+        """
+        return hashlib.blake2b(f"{model or ''}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+    def get(self, model, texts):
+        """Look up the embeddings of several texts.
+
+        Args:
+            model (str): The embedding model.
+            texts (list of str): The texts.
+
+        Returns:
+            list: A float32 row for every cached text and None for the others.
+        """
+        with self._lock:
+            return [None if row is None else self._row(row) for row in map(self._index.get, self._hashes(model, texts))]
+
+    def put(self, model, texts, embeddings):
+        """Store the embeddings of several texts.
+
+        Args:
+            model (str): The embedding model.
+            texts (list of str): The texts.
+            embeddings (list of lists, numpy.ndarray): One embedding per text.
+
+        Raises:
+            ValueError: If the embeddings do not have the dimension of the cache.
+        """
+        import numpy as np
+
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+        with self._lock:
+            if self.dim is not None and len(matrix) and matrix.shape[1] != self.dim:
+                raise ValueError(f"Expected embeddings of dimension {self.dim}, got {matrix.shape[1]}")
+            for key, vector in zip(self._hashes(model, texts), matrix):
+                if key in self._index:
+                    continue
+                self._reserve(self._size + 1, len(vector))
+                self._vectors[self._size] = vector
+                self._size += 1
+                self._index[key] = len(self._keys)
+                self._keys.append(key)
+
+    def embed(self, model, texts, fetch):
+        """Return the embeddings of texts, computing only the ones that are not cached.
+
+        Args:
+            model (str): The embedding model.
+            texts (list of str): The texts.
+            fetch (callable): Embeds a list of texts; it only receives the distinct cache misses, in order.
+
+        Returns:
+            numpy.ndarray: The `(len(texts), dim)` float32 embeddings, in the order of `texts`.
+        """
+        import numpy as np
+
+        cached = self.get(model, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        if missing:
+            fetched = dict(zip(missing, np.asarray(fetch(missing), dtype=np.float32)))
+            self.put(model, missing, [fetched[text] for text in missing])
+            cached = [fetched[text] if vector is None else vector for text, vector in zip(texts, cached)]
+        if not cached:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.stack(cached)
+
+    def save(self, path):
+        """Write the entries added since the last save to a cache directory.
+
+        The new rows are written as a new segment, then a manifest listing every segment is
+        replaced atomically. Readers only follow the manifest, so a concurrent `load` sees
+        either the previous or the new segments, never keys that do not match their rows.
+        Rows already saved in the directory are never rewritten. Saving into a directory
+        that holds another cache adds this cache's entries to it; processes saving into the
+        same directory at once take turns through a lock file.
+
+        Args:
+            path (str): The cache directory.
+
+        Raises:
+            ValueError: If the directory holds embeddings of another dimension.
+        """
+        import numpy as np
+
+        from langtree.vectordb.persistence import save_array, write_file
+
+        path = os.path.abspath(path)
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            start = self._persisted[1] if self._persisted is not None and self._persisted[0] == path else 0
+            end = len(self._keys)
+            keys = np.frombuffer(b"".join(self._keys[start:end]), dtype=np.uint8).reshape(-1, 16)
+            vectors = self._rows(start, end)
+
+        # Another process may be appending to the same directory; without the lock one of
+        # the two manifests written from the same previous one would drop the other's segment
+        with _file_lock(os.path.join(path, self.LOCK)):
+            manifest = self._read_manifest(path) or {"dim": None, "segments": []}
+            if manifest["dim"] is not None and self.dim is not None and manifest["dim"] != self.dim:
+                raise ValueError(f"{path} holds embeddings of dimension {manifest['dim']}, not {self.dim}")
+            if end > start:
+                name = f"segment-{len(manifest['segments']):05d}-{os.getpid()}"
+                save_array(os.path.join(path, f"{name}.keys.npy"), keys)
+                save_array(os.path.join(path, f"{name}.embeddings.npy"), vectors)
+                manifest["segments"].append({"name": name, "rows": end - start})
+            manifest["dim"] = manifest["dim"] if self.dim is None else self.dim
+            write_file(os.path.join(path, self.MANIFEST), lambda f: json.dump(manifest, f, indent=2))
+        self._persisted = (path, end)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Open a cache written by `save`.
+
+        Args:
+            path (str): The cache directory.
+            mmap (bool, optional): Memory-map the embeddings read-only instead of reading them. Defaults to True.
+
+        Returns:
+            EmbeddingCache: The cache.
+
+        Raises:
+            FileNotFoundError: If the directory holds no cache.
+        """
+        import numpy as np
+
+        path = os.path.abspath(path)
+        manifest = cls._read_manifest(path)
+        if manifest is None:
+            raise FileNotFoundError(f"No embedding cache found in {path}")
+        cache = cls(dim=manifest["dim"])
+        for segment in manifest["segments"]:
+            prefix = os.path.join(path, segment["name"])
+            data = np.load(f"{prefix}.keys.npy").tobytes()
+            cache._segments.append(np.load(f"{prefix}.embeddings.npy", mmap_mode="r" if mmap else None))
+            cache._starts.append(cache._offset)
+            cache._offset += segment["rows"]
+            for i in range(0, len(data), 16):
+                cache._index.setdefault(data[i:i + 16], len(cache._keys))
+                cache._keys.append(data[i:i + 16])
+        cache._persisted = (path, len(cache._keys))
+        return cache
+
+    @classmethod
+    def _read_manifest(cls, path):
+        try:
+            with open(os.path.join(path, cls.MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _hashes(self, model, texts):
+        return [self.key(model, text) for text in texts]
+
+    def _row(self, row):
+        if row >= self._offset:
+            return self._vectors[row - self._offset]
+        i = bisect.bisect_right(self._starts, row) - 1
+        return self._segments[i][row - self._starts[i]]
+
+    def _rows(self, start, end):
+        """Return a copy of rows `start:end`, wherever they are stored."""
+        import numpy as np
+
+        blocks = []
+        for first, vectors in zip(self._starts, self._segments):
+            if first < end and first + len(vectors) > start:
+                blocks.append(vectors[max(start - first, 0):end - first])
+        if end > self._offset:
+            blocks.append(self._vectors[max(start - self._offset, 0):end - self._offset])
+        return np.concatenate(blocks) if blocks else np.empty((0, self.dim or 0), dtype=np.float32)
+
+    def _reserve(self, size, dim):
+        """Grow the tail geometrically so that at least `size` rows fit."""
+        import numpy as np
+
+        if self._vectors is None:
+            self.dim = dim
+            self._vectors = np.empty((max(self._capacity, size), dim), dtype=np.float32)
+        elif size > len(self._vectors):
+            vectors = np.empty((max(size, 2 * len(self._vectors)), self.dim), dtype=np.float32)
+            vectors[:self._size] = self._vectors[:self._size]
+            self._vectors = vectors
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
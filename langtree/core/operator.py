@@ -1,5 +1,9 @@
 
-import backoff
+import functools
+import inspect
+from collections.abc import Iterator
+
+from langtree.core.recording import record_usage, traced
 
 
 def default_call(*args, **kwargs):
@@ -37,27 +41,126 @@ def freeze(function, **top_kwargs):
     Returns:
         callable: The function with specific arguments frozen.
     """
-    def frozen(*args, **kwargs):
-        return function(*args, **{**top_kwargs, **kwargs})
-    return frozen
+    # functools.partial keeps coroutine functions detectable by inspect.iscoroutinefunction
+    return functools.partial(function, **top_kwargs)
+
+
+def accepts_stream(function):
+    """Return whether a call function opts in to streaming.
+
+    A function opts in with a `streams` attribute set to True (see `streaming`), or by
+    declaring a `stream` parameter of its own. Catch-all `**kwargs` do not count, so
+    `stream=True` never reaches a function that is not expecting it.
+
+    Args:
+        function (callable): The call function.
+
+    Returns:
+        bool: True if the function accepts `stream=True` and returns an iterator of chunks.
+    """
+    while isinstance(function, functools.partial):
+        if getattr(function, "streams", None) is not None:
+            break
+        function = function.func
+    flag = getattr(function, "streams", None)
+    if flag is not None:
+        return bool(flag)
+    try:
+        parameter = inspect.signature(function).parameters.get("stream")
+    except (TypeError, ValueError):
+        return False
+    return parameter is not None and parameter.kind in (parameter.POSITIONAL_OR_KEYWORD, parameter.KEYWORD_ONLY)
+
+
+def streaming(function):
+    """Mark a call function as able to stream, e.g. an endpoint that takes `stream` through `**kwargs`.
+
+    Args:
+        function (callable): The call function, e.g. `openai.ChatCompletion.create`.
+
+    Returns:
+        callable: A wrapper of `function` that `accepts_stream` recognizes.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        return function(*args, **kwargs)
+
+    wrapper.streams = True
+    return wrapper
+
+
+async def call_async(function, *args, **kwargs):
+    """Await a function from asynchronous code, whatever kind of callable it is.
+
+    Objects exposing `acall` (Operators and composite operators) are awaited through it,
+    `async def` functions are awaited directly and plain functions are offloaded to the
+    default executor so they do not block the event loop.
+
+    Args:
+        function (callable): The function to call.
+        *args: Variable length argument list.
+        **kwargs: Arbitrary keyword arguments.
+
+    Returns:
+        The result of the function.
+    """
+    if hasattr(function, "acall"):
+        return await function.acall(*args, **kwargs)
+    if inspect.iscoroutinefunction(function):
+        return await function(*args, **kwargs)
+
+    # Imported here so that chains that never run asynchronously do not pay for loading asyncio
+    import asyncio
+
+    res = await asyncio.to_thread(function, *args, **kwargs)
+    if inspect.isawaitable(res):
+        res = await res
+    return res
 
 
 class Operator(object):
     """A class to represent and process custom call and parse operations."""
 
-    def __init__(self, call=default_call, parse=default_parse):
+    # Whether the call function's result is a fresh provider response whose usage goes on the span
+    _records_usage = True
+
+    def __init__(self, call=default_call, parse=default_parse, parse_chunk=None):
         """Initialize the Operator with custom call and parse functions.
 
         Args:
             call (callable, optional): The custom call function. Defaults to default_call.
             parse (callable, optional): The custom parse function. Defaults to default_parse.
+            parse_chunk (callable, optional): Parses every chunk of a streamed result, see `stream`.
+                Chunks it turns into None are skipped. Defaults to yielding the raw chunks.
         """
         self.call = call
         self.parse = parse
-
+        self.parse_chunk = parse_chunk
+
+    @property
+    def name(self):
+        """str: The name shown in compiled plans and traces: the call function's for a plain Operator,
+        the class name for subclasses."""
+        if type(self) is not Operator:
+            return type(self).__name__
+        call = self.call
+        while isinstance(call, functools.partial):
+            call = call.func
+        return getattr(call, "__name__", type(call).__name__)
+
+    @property
+    def streams(self):
+        """bool: Whether the call function opts in to streaming, see `accepts_stream`."""
+        return accepts_stream(self.call)
+
+    @traced
     def __call__(self, *args, **kwargs):
         """Call the Operator's call function and parse its result.
 
+        If the call function can stream, `stream=True` returns an iterator over the parsed
+        chunks instead, see `stream`. Otherwise a `stream` argument is passed on to the call
+        function like any other.
+
         Args:
             *args: Variable length argument list.
             **kwargs: Arbitrary keyword arguments.
@@ -65,9 +168,66 @@ class Operator(object):
         Returns:
             The parsed result of the call function.
         """
+        if "stream" in kwargs and self.streams:
+            if kwargs.pop("stream"):
+                return self.stream(*args, **kwargs)
+
         res = self.call(*args, **kwargs)
+        if self._records_usage:
+            record_usage(res)
+        if self.parse is not None:
+            res = self.parse(res)
+        return res
+
+    def stream(self, *args, **kwargs):
+        """Call the Operator's call function in streaming mode and yield its chunks as they arrive.
+
+        A call function that opts in to streaming (see `accepts_stream`) receives `stream=True`
+        and should return an iterator of chunks, each of which goes through `parse_chunk`. Any
+        other call function is called as usual and its parsed result is yielded as a single
+        chunk, as is a complete result returned by a streaming one.
+
+        Args:
+            *args: Variable length argument list.
+            **kwargs: Arbitrary keyword arguments.
+
+        Yields:
+            The parsed chunks.
+        """
+        if not self.streams:
+            yield self(*args, **kwargs)
+            return
+
+        res = self.call(*args, stream=True, **kwargs)
+        if not isinstance(res, Iterator):
+            yield res if self.parse is None else self.parse(res)
+            return
+
+        for chunk in res:
+            if self.parse_chunk is not None:
+                chunk = self.parse_chunk(chunk)
+                if chunk is None:
+                    continue
+            yield chunk
+
+    @traced
+    async def acall(self, *args, **kwargs):
+        """Asynchronously call the Operator's call function and parse its result.
+
+        Args:
+            *args: Variable length argument list.
+            **kwargs: Arbitrary keyword arguments.
+
+        Returns:
+            The parsed result of the call function.
+        """
+        res = await call_async(self.call, *args, **kwargs)
+        if self._records_usage:
+            record_usage(res)
         if self.parse is not None:
             res = self.parse(res)
+            if inspect.isawaitable(res):
+                res = await res
         return res
 
     def freeze_call(self, **kwargs):
@@ -1,9 +1,58 @@
 
+import functools
+import itertools
+import operator
 import re
+from collections.abc import Mapping
+
+PLACEHOLDER = re.compile(r"\{\{([^{}]+)\}\}")
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_template(template):
+    """Split a template string into literal and placeholder segments.
+
+    The template is scanned once; the result alternates literals (even indices)
+    and placeholder names (odd indices), always starting and ending with a literal.
+
+    Args:
+        template (str): The template string containing placeholders.
+
+    Returns:
+        tuple: The literal and placeholder segments of the template.
+    """
+    return tuple(PLACEHOLDER.split(template))
+
+
+def render_segments(segments, values, strict=False):
+    """Render compiled template segments in a single pass.
+
+    Args:
+        segments (tuple): Segments produced by `compile_template`.
+        values (dict): Placeholder-value pairs.
+        strict (bool, optional): Raise a KeyError for missing values instead of leaving
+            their placeholders untouched. Defaults to False.
+
+    Returns:
+        str: The rendered string.
+    """
+    parts = list(segments)
+    for i in range(1, len(parts), 2):
+        name = parts[i]
+        if name in values:
+            parts[i] = str(values[name])
+        elif strict:
+            raise KeyError(f"Missing value for placeholder '{name}'")
+        else:
+            parts[i] = "{{" + name + "}}"
+    return "".join(parts)
+
 
 def render_prompt(template, **kwargs):
     """Render a template string by substituting placeholders with provided keyword arguments.
 
+    Placeholders without a matching keyword argument are left as they are.
+
     Args:
         template (str): The template string containing placeholders.
         **kwargs: Keyword arguments representing placeholder-value pairs.
@@ -14,13 +63,15 @@ def render_prompt(template, **kwargs):
     if template is None:
         return
 
-    for key, value in kwargs.items():
-        template = re.sub(r"\{\{" + re.escape(key) + r"\}\}", value, template)
-    return template
+    return render_segments(compile_template(template), kwargs)
 
 
 class Prompt:
-    """A class to represent and process prompt templates."""
+    """A class to represent and process prompt templates.
+
+    The template is compiled into literal and placeholder segments on first use,
+    so rendering is a single join no matter how many placeholders it has.
+    """
 
     def __init__(self, template):
         """Initialize the Prompt object with a template string.
@@ -30,6 +81,32 @@ class Prompt:
         """
         self.template = template
 
+    @property
+    def template(self):
+        """str: The template string for the prompt."""
+        return self._template
+
+    @template.setter
+    def template(self, template):
+        self._template = template
+        self._segments = None
+        self._variables = None
+        self._format = None
+
+    @property
+    def segments(self):
+        """tuple: The compiled literal and placeholder segments of the template."""
+        if self._segments is None and self._template is not None:
+            self._segments = compile_template(self._template)
+        return self._segments
+
+    @property
+    def variables(self):
+        """frozenset: The names of the placeholders in the template."""
+        if self._variables is None:
+            self._variables = frozenset(self.segments[1::2]) if self.segments else frozenset()
+        return self._variables
+
     def __call__(self, **kwargs):
         """Render the prompt using the provided keyword arguments.
 
@@ -38,8 +115,96 @@ class Prompt:
 
         Returns:
             str: The rendered prompt.
+
+        Raises:
+            KeyError: If a placeholder has no value or a keyword argument matches no placeholder.
         """
-        return render_prompt(self.template, **kwargs)
+        if self.template is None:
+            return
+
+        self._check_names(kwargs.keys())
+        return render_segments(self.segments, kwargs, strict=True)
+
+    def render_many(self, rows, sink=None, separator="\n"):
+        """Render the prompt for every row of a dataset.
+
+        Rows are rendered lazily with a format string compiled from the template,
+        so no intermediate list is built. Like calling the prompt, every placeholder
+        needs a value and every key must match a placeholder.
+
+        Args:
+            rows (iterable of dict, Mapping of sequences): Either an iterable of
+                placeholder-value mappings, or a column-oriented mapping from each
+                placeholder name to a sequence of values, all of the same length.
+            sink (file-like, optional): An object with a `writelines` method (an open file,
+                `io.StringIO`, ...). When given, every rendered prompt is written to it
+                followed by `separator` instead of being returned.
+            separator (str, optional): The string written after each prompt in the sink. Defaults to a newline.
+
+        Returns:
+            iterator of str: The rendered prompts, or None when `sink` is given.
+
+        Raises:
+            ValueError: If the prompt has no template, or if columns have different lengths.
+            KeyError: If a row (or the columns) has no value for one of the placeholders, or a key
+                that matches no placeholder. With an iterable of rows, this is raised when the row is reached.
+        """
+        if self.template is None:
+            raise ValueError("Cannot render a Prompt without a template")
+        fmt, names = self._format_string()
+
+        if isinstance(rows, Mapping):
+            self._check_names(rows.keys())
+            missing = [name for name in names if name not in rows]
+            if missing:
+                raise KeyError(f"Missing value for placeholder '{missing[0]}'")
+            lengths = {name: len(column) for name, column in rows.items()}
+            if len(set(lengths.values())) > 1:
+                raise ValueError(f"All columns must have the same length, got {lengths}")
+            if names:
+                values = zip(*[rows[name] for name in names])
+            else:
+                values = itertools.repeat((), next(iter(lengths.values()), 0))
+        else:
+            values = self._row_values(rows, names)
+
+        rendered = itertools.starmap(fmt.format, values)
+        if sink is None:
+            return rendered
+        sink.writelines(map(operator.add, rendered, itertools.repeat(separator)))
+
+    def _check_names(self, names):
+        """Raise a KeyError if any of `names` matches no placeholder."""
+        extra = names - self.variables
+        if extra:
+            raise KeyError(f"Prompt has no placeholders named {sorted(extra)}. Expected only {sorted(self.variables)}")
+
+    def _row_values(self, rows, names):
+        """Yield the values of every row in the order of `names`.
+
+        A row holding every placeholder and as many keys as there are placeholders has
+        no extra key, so the key check only runs on rows whose size is off.
+        """
+        get = operator.itemgetter(*names) if names else (lambda row: ())
+        single = len(names) == 1
+        for row in rows:
+            if len(row) != len(names):
+                self._check_names(row.keys())
+            values = get(row)
+            yield (values,) if single else values
+
+    def _format_string(self):
+        """Translate the compiled segments into a `str.format` template and its ordered placeholder names."""
+        if self._format is None:
+            names = list(dict.fromkeys(self.segments[1::2]))
+            parts = []
+            for i, segment in enumerate(self.segments):
+                if i % 2:
+                    parts.append("{" + str(names.index(segment)) + "}")
+                else:
+                    parts.append(segment.replace("{", "{{").replace("}", "}}"))
+            self._format = ("".join(parts), names)
+        return self._format
 
     def __add__(self, other):
         """Handle concatenation of two Prompt objects or a Prompt object with a string.
@@ -55,12 +220,19 @@ class Prompt:
         """
         # If the other object is a Prompt, concatenate templates
         if isinstance(other, Prompt):
-            return Prompt(self.template + other.template)
+            return self._concat(other.template, other.segments)
 
         # If the other object is a str (or can be represented as one), concatenate
         elif isinstance(other, str):
-            return Prompt(self.template + other)
+            return self._concat(other, compile_template(other))
 
         # If the other object is not a string or Prompt, raise a TypeError
         else:
             raise TypeError(f"Cannot concatenate 'Prompt' with '{type(other).__name__}'")
+
+    def _concat(self, template, segments):
+        prompt = Prompt(self.template + template)
+        # Only the literals meeting at the seam can form a new placeholder, so only they are re-parsed
+        seam = PLACEHOLDER.split(self.segments[-1] + segments[0])
+        prompt._segments = self.segments[:-1] + tuple(seam) + segments[1:]
+        return prompt
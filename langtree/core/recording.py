@@ -0,0 +1,460 @@
+import contextvars
+import functools
+import inspect
+import json
+import queue
+import random
+import threading
+import time
+from collections.abc import Mapping
+
+__all__ = ["Span", "Recorder", "MemorySink", "JSONLinesSink", "OTLPSink", "span", "traced", "bind",
+           "annotate", "record_usage"]
+
+_recorder = contextvars.ContextVar("langtree_recorder", default=None)
+_current = contextvars.ContextVar("langtree_span", default=None)
+_submitted = contextvars.ContextVar("langtree_submitted", default=None)
+
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+
+class Span:
+    """One timed step of a chain, nested under the step that ran it.
+
+    Attributes:
+        name (str): The name of the operator or block.
+        trace_id (str): The 32 hex digit id shared by every span of one top-level call.
+        span_id (str): The 16 hex digit id of this span.
+        parent_id (str): The id of the enclosing span, None for the root.
+        start (float): The start time, in seconds since the epoch.
+        duration (float): The wall time, in seconds.
+        queue_time (float): The seconds spent waiting for an executor between submission and start.
+        attributes (dict): Token usage, cache hits, cost and anything added with `annotate`.
+        error (str): The repr of the exception the step raised, if any.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "duration", "queue_time", "attributes",
+                 "error", "_clock", "_lock")
+
+    def __init__(self, name, parent=None, queue_time=0.0):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start = time.time()
+        self.duration = None
+        self.queue_time = queue_time
+        self.attributes = {}
+        self.error = None
+        self._clock = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, key, amount):
+        """Add a number to an attribute, e.g. tokens reported by several requests of one step."""
+        with self._lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self):
+        """Return the span as a JSON-serializable dict."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration": self.duration,
+            "queue_time": self.queue_time,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def __repr__(self):
+        return f"Span({self.name!r}, duration={self.duration}, attributes={self.attributes})"
+
+
+class MemorySink:
+    """Keep recorded spans in a list, e.g. for tests or notebooks."""
+
+    def __init__(self):
+        self.spans = []
+
+    def write(self, spans):
+        self.spans.extend(spans)
+
+
+class JSONLinesSink:
+    """Append every span as one JSON object per line to a file."""
+
+    def __init__(self, path):
+        """Initialize the sink.
+
+        Args:
+            path (str): The file to append to.
+        """
+        self.path = path
+
+    def write(self, spans):
+        with open(self.path, "a") as f:
+            f.writelines(json.dumps(span.to_dict(), default=repr) + "\n" for span in spans)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPSink:
+    """Export spans in the OpenTelemetry OTLP/JSON format.
+
+    Every batch becomes one `ExportTraceServiceRequest` payload, which is either POSTed to
+    an OTLP/HTTP collector (e.g. `http://localhost:4318/v1/traces`) or appended as one line
+    to a file, so no OpenTelemetry package is required.
+    """
+
+    def __init__(self, endpoint=None, path=None, service_name="langtree", headers=None):
+        """Initialize the sink.
+
+        Args:
+            endpoint (str, optional): The OTLP/HTTP traces endpoint.
+            path (str, optional): A file to append the payloads to instead.
+            service_name (str, optional): The `service.name` resource attribute. Defaults to "langtree".
+            headers (dict, optional): Extra HTTP headers, e.g. for authentication.
+
+        Raises:
+            ValueError: If neither an endpoint nor a path is given.
+        """
+        if endpoint is None and path is None:
+            raise ValueError("OTLPSink needs an endpoint or a path")
+        self.endpoint = endpoint
+        self.path = path
+        self.service_name = service_name
+        self.headers = headers or {}
+
+    def payload(self, spans):
+        """Convert spans to an OTLP/JSON `ExportTraceServiceRequest` dict."""
+        converted = []
+        for span in spans:
+            attributes = {"langtree.queue_time": span.queue_time, **span.attributes}
+            converted.append({
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(int(span.start * 1e9)),
+                "endTimeUnixNano": str(int((span.start + span.duration) * 1e9)),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()],
+                # STATUS_CODE_ERROR = 2, STATUS_CODE_UNSET = 0
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 0},
+            })
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "langtree"}, "spans": converted}],
+        }]}
+
+    def write(self, spans):
+        data = json.dumps(self.payload(spans))
+        if self.path is not None:
+            with open(self.path, "a") as f:
+                f.write(data + "\n")
+        if self.endpoint is not None:
+            import urllib.request
+
+            request = urllib.request.Request(self.endpoint, data=data.encode(), method="POST",
+                                             headers={"Content-Type": "application/json", **self.headers})
+            urllib.request.urlopen(request, timeout=10).close()
+
+
+class Recorder:
+    """Record the spans of the chains run while it is active and hand them to sinks.
+
+    Finished spans are put on a queue and written by a background thread, so the
+    calling code never waits on a sink. Sink errors are counted in `dropped` and
+    never reach the chain.
+
+        with Recorder([JSONLinesSink("trace.jsonl")]) as recorder:
+            chain(question)
+
+    Activation is tracked with a context variable, so it follows asyncio tasks and
+    the branches of Parallel blocks and compiled graphs.
+
+    The writer thread starts with the first span and stops when the outermost `with`
+    block exits (or on `close`), after writing the remaining spans. Using the recorder
+    again starts a new one.
+    """
+
+    def __init__(self, sinks, prices=None, batch_size=256):
+        """Initialize the recorder. Its writer thread only starts once a span is emitted.
+
+        Args:
+            sinks (list): Objects with a `write(spans)` method.
+            prices (dict, optional): Maps a model name (or prefix) to its `(prompt, completion)` price per
+                1K tokens. Spans whose response names a priced model get a "cost" attribute.
+            batch_size (int, optional): The maximum number of spans handed to a sink at once. Defaults to 256.
+        """
+        self.sinks = list(sinks)
+        self.prices = prices or {}
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._tokens = []
+        self._lock = threading.Lock()
+        # The queue and thread of the running writer, None until a span is emitted and after `close`
+        self._queue = None
+        self._writer = None
+
+    def __enter__(self):
+        self._tokens.append(_recorder.set(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        _recorder.reset(self._tokens.pop())
+        if self._tokens:
+            self.flush()
+        else:
+            self.close()
+
+    def emit(self, span):
+        """Queue a finished span for the sinks, starting the writer thread if needed."""
+        channel = self._queue
+        if channel is None:
+            channel = self._start()
+        channel.put(span)
+
+    def flush(self, timeout=None):
+        """Wait until every span emitted so far has been written.
+
+        Args:
+            timeout (float, optional): The maximum number of seconds to wait.
+
+        Returns:
+            bool: True if everything was written in time.
+        """
+        channel = self._queue
+        if channel is None:
+            return True
+        done = threading.Event()
+        channel.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Write the remaining spans and stop the writer thread."""
+        with self._lock:
+            channel, writer = self._queue, self._writer
+            self._queue = self._writer = None
+        if writer is not None:
+            channel.put(None)
+            writer.join()
+
+    def _start(self):
+        with self._lock:
+            if self._queue is None:
+                # Every writer gets its own queue, so a span emitted while an old one stops is not lost to it
+                self._queue = queue.SimpleQueue()
+                self._writer = threading.Thread(target=self._write, args=(self._queue,), name="langtree-recorder",
+                                                daemon=True)
+                self._writer.start()
+            return self._queue
+
+    def cost(self, model, usage):
+        """Return the price of a request from the `prices` table, or None if the model is not priced."""
+        matches = [name for name in self.prices if model == name or model.startswith(name)]
+        if not matches:
+            return None
+        prompt, completion = self.prices[max(matches, key=len)]
+        return (usage.get("prompt_tokens", 0) * prompt + usage.get("completion_tokens", 0) * completion) / 1000
+
+    def _write(self, channel):
+        while True:
+            item = channel.get()
+            batch, events, stop = [], [], False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = channel.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                for sink in self.sinks:
+                    try:
+                        sink.write(batch)
+                    except Exception:
+                        self.dropped += len(batch)
+            for event in events:
+                event.set()
+            if stop:
+                return
+
+
+class _SpanContext:
+    """Open a span on enter and emit it on exit, when a recorder is active."""
+
+    __slots__ = ("name", "recorder", "span", "tokens")
+
+    def __init__(self, name):
+        self.name = name
+        self.recorder = _recorder.get()
+        self.span = None
+
+    def __enter__(self):
+        if self.recorder is None:
+            return None
+        submitted = _submitted.get()
+        queue_time = 0.0
+        if submitted is not None:
+            queue_time = time.perf_counter() - submitted
+            _submitted.set(None)
+        self.span = Span(self.name, _current.get(), queue_time)
+        self.tokens = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self.span is None:
+            return
+        span = self.span
+        span.duration = time.perf_counter() - span._clock
+        if exc is not None:
+            span.error = repr(exc)
+        _current.reset(self.tokens)
+        self.recorder.emit(span)
+
+
+def span(name):
+    """Record a block of code as a span of the active recorder, e.g. around non-langtree code.
+
+        with span("retrieve"):
+            documents = retriever(question)
+
+    Args:
+        name (str): The name of the span.
+
+    Returns:
+        A context manager yielding the Span, or None when no recorder is active.
+    """
+    return _SpanContext(name)
+
+
+def _name(obj):
+    return getattr(obj, "name", None) or type(obj).__name__
+
+
+def traced(method):
+    """Decorate a `__call__` (or `acall`) method so every call is recorded as a span.
+
+    When no recorder is active the overhead is a single context variable lookup.
+    """
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            if _recorder.get() is None:
+                return await method(self, *args, **kwargs)
+            with _SpanContext(_name(self)):
+                return await method(self, *args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        # A streamed call only builds a generator here, there is nothing to time yet
+        if _recorder.get() is None or (kwargs.get("stream") and getattr(self, "streams", False)):
+            return method(self, *args, **kwargs)
+        with _SpanContext(_name(self)):
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def _run_bound(context_submitted, function, args, kwargs):
+    _submitted.set(context_submitted)
+    return function(*args, **kwargs)
+
+
+def bind(function):
+    """Carry the current span into a function that runs on another thread.
+
+    Executors do not propagate context variables, so branches submitted to a pool would
+    otherwise lose their parent span. The returned callable also records how long it
+    waited in the executor queue, and pickles as `function` itself. Without an active
+    recorder `function` is returned as is.
+
+    Args:
+        function (callable): The function to submit.
+
+    Returns:
+        callable: The function to submit instead.
+    """
+    if _recorder.get() is None:
+        return function
+    return _Bound(function, contextvars.copy_context(), time.perf_counter())
+
+
+class _Bound:
+    """A function bound to the context it was submitted from, see `bind`.
+
+    Contexts cannot cross process boundaries, so a bound function pickles as the bare
+    function, e.g. for a process pool; spans in the worker process are not recorded.
+    """
+
+    __slots__ = ("function", "context", "submitted")
+
+    def __init__(self, function, context, submitted):
+        self.function = function
+        self.context = context
+        self.submitted = submitted
+
+    def __call__(self, *args, **kwargs):
+        return self.context.run(_run_bound, self.submitted, self.function, args, kwargs)
+
+    def __reduce__(self):
+        return _unbound, (self.function,)
+
+
+def _unbound(function):
+    return function
+
+
+def annotate(**attributes):
+    """Set attributes on the current span, if a recorder is active.
+
+    Args:
+        **attributes: The attributes, e.g. `cache="hit"`.
+    """
+    current = _current.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def record_usage(response):
+    """Add the token usage (and cost) reported by a provider response to the current span.
+
+    Args:
+        response: A raw provider response. Anything without a `usage` mapping is ignored.
+    """
+    current = _current.get()
+    recorder = _recorder.get()
+    if current is None or recorder is None or not isinstance(response, Mapping):
+        return
+    usage = response.get("usage")
+    if not isinstance(usage, Mapping):
+        return
+    for field in USAGE_FIELDS:
+        if field in usage:
+            current.add(field, usage[field])
+    model = response.get("model")
+    if model:
+        current.attributes["model"] = model
+        cost = recorder.cost(model, usage)
+        if cost is not None:
+            current.add("cost", cost)
@@ -0,0 +1,112 @@
+import importlib
+
+__all__ = ["Registry", "PROVIDERS", "VECTOR_DATABASES"]
+
+
+class Registry:
+    """Implementations resolved by name, imported only when first resolved.
+
+    Targets are registered either as objects or as "module:qualname" strings, so listing
+    what is available never imports a provider SDK or NumPy.
+
+        PROVIDERS.register("mine.chat", "my_package.chat:MyChatCompletion")
+        chat = PROVIDERS.create("openai.chat", model="gpt-3.5-turbo")
+    """
+
+    def __init__(self, kind):
+        """Initialize an empty registry.
+
+        Args:
+            kind (str): What the registry holds, used in error messages.
+        """
+        self.kind = kind
+        self._targets = {}
+
+    def register(self, name, target=None):
+        """Register an implementation under a name, replacing any previous one.
+
+        Without a target, returns a decorator registering the decorated class or function.
+
+        Args:
+            name (str): The name to resolve it by.
+            target (object, str, optional): The implementation, or its "module:qualname" path.
+
+        Returns:
+            The target, or the decorator.
+        """
+        if target is None:
+            return lambda target: self.register(name, target)
+        self._targets[name] = target
+        return target
+
+    def get(self, name):
+        """Resolve a name, importing its module on first use.
+
+        Args:
+            name (str): The registered name.
+
+        Returns:
+            The registered implementation.
+
+        Raises:
+            ValueError: If nothing is registered under the name.
+        """
+        if name not in self._targets:
+            raise ValueError(f"Unknown {self.kind} '{name}'. Expected one of {self.names()}")
+        target = self._targets[name]
+        if isinstance(target, str):
+            module, qualname = target.split(":")
+            target = importlib.import_module(module)
+            for attribute in qualname.split("."):
+                target = getattr(target, attribute)
+            self._targets[name] = target
+        return target
+
+    def create(self, name, *args, **kwargs):
+        """Resolve a name and call it, e.g. to build an Operator or a database.
+
+        Args:
+            name (str): The registered name.
+            *args: Positional arguments for the implementation.
+            **kwargs: Keyword arguments for the implementation.
+
+        Returns:
+            The created object.
+        """
+        return self.get(name)(*args, **kwargs)
+
+    def find(self, target):
+        """Return the name an implementation is registered under, without importing anything.
+
+        Args:
+            target (object): The implementation, e.g. a class.
+
+        Returns:
+            str: The registered name, or None if the implementation is not registered.
+        """
+        path = f"{getattr(target, '__module__', None)}:{getattr(target, '__qualname__', None)}"
+        for name, registered in self._targets.items():
+            if registered is target or registered == path:
+                return name
+        return None
+
+    def names(self):
+        """Return the registered names, sorted."""
+        return sorted(self._targets)
+
+    def __contains__(self, name):
+        return name in self._targets
+
+    def __repr__(self):
+        return f"Registry({self.kind!r}, {self.names()})"
+
+
+PROVIDERS = Registry("provider")
+PROVIDERS.register("openai.chat", "langtree.models.openai.openai_adapter:OpenAIChatCompletion")
+PROVIDERS.register("openai.completion", "langtree.models.openai.openai_adapter:OpenAICompletion")
+PROVIDERS.register("openai.embedding", "langtree.models.openai.openai_adapter:OpenAIEmbedding")
+PROVIDERS.register("openai.client", "langtree.models.openai.client:OpenAIClient")
+
+VECTOR_DATABASES = Registry("vector database")
+VECTOR_DATABASES.register("memory", "langtree.vectordb.memory:MemoryVectorDatabase")
+VECTOR_DATABASES.register("ivf", "langtree.vectordb.ivf:IVFVectorDatabase")
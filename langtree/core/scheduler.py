@@ -0,0 +1,248 @@
+import functools
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import Mapping
+
+from langtree.core.buffer import approximate_token_count
+
+__all__ = ["INTERACTIVE", "BATCH", "TokenBucket", "Scheduler", "estimate_request_tokens"]
+
+# Lower priorities are served first
+INTERACTIVE = 0
+BATCH = 10
+
+RETRYABLE_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at a per-minute rate.
+
+    The bucket holds at most `capacity` tokens. Consuming more than is available
+    puts the bucket in debt, which later requests wait out, so a request larger
+    than the capacity still goes through instead of waiting forever.
+    """
+
+    def __init__(self, per_minute, capacity=None, clock=time.monotonic):
+        """Initialize a full bucket.
+
+        Args:
+            per_minute (float): The refill rate, in tokens per minute.
+            capacity (float, optional): The largest burst allowed. Defaults to one second worth of tokens.
+            clock (callable, optional): Returns the current time in seconds. Defaults to `time.monotonic`.
+        """
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate) if capacity is None else capacity
+        self._clock = clock
+        self._level = self.capacity
+        self._updated = clock()
+
+    @property
+    def level(self):
+        """float: The number of tokens currently available (negative when in debt)."""
+        now = self._clock()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+        return self._level
+
+    def delay(self, amount):
+        """Return the number of seconds until `amount` tokens are available, 0 if they already are."""
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount):
+        """Take `amount` tokens out of the bucket; a negative amount gives tokens back."""
+        self._level = self.level - amount
+
+
+def estimate_request_tokens(kwargs):
+    """Estimate the tokens a provider request counts against a tokens-per-minute quota.
+
+    Providers count the prompt plus the completion budget, so this adds an estimate of
+    `messages`, `prompt` or `input` to `max_tokens`.
+
+    Args:
+        kwargs (dict): The keyword arguments of the request.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    tokens = kwargs.get("max_tokens") or 0
+    for name in ("messages", "prompt", "input"):
+        value = kwargs.get(name)
+        if value is None:
+            continue
+        items = [value] if isinstance(value, str) else value
+        for item in items:
+            text = item.get("content") if isinstance(item, Mapping) else item
+            if isinstance(text, str):
+                tokens += approximate_token_count(text)
+    return tokens
+
+
+def _status(error):
+    for source in (error, getattr(error, "response", None)):
+        for attribute in ("http_status", "status_code", "status", "code"):
+            status = getattr(source, attribute, None)
+            if isinstance(status, int):
+                return status
+    return None
+
+
+def _retry_after(error):
+    """Read the retry-after hint of a failed request, in seconds."""
+    for source in (error, getattr(error, "response", None)):
+        headers = getattr(source, "headers", None)
+        if not headers:
+            continue
+        try:
+            if headers.get("retry-after-ms") is not None:
+                return float(headers.get("retry-after-ms")) / 1000
+            if headers.get("retry-after") is not None:
+                return float(headers.get("retry-after"))
+        except ValueError:
+            # HTTP dates are not worth parsing here, the backoff takes over
+            return None
+    return None
+
+
+def _usage(result):
+    try:
+        return result["usage"]["total_tokens"]
+    except (KeyError, TypeError):
+        return None
+
+
+class Scheduler:
+    """A shared gate in front of a provider that keeps requests within its rate limits.
+
+    Every request waits for a slot in a requests-per-minute and a tokens-per-minute
+    token bucket. Waiting requests are served by priority (lower first, so
+    `INTERACTIVE` goes ahead of `BATCH`), then in arrival order. Requests failing
+    with a rate-limit or transient HTTP status are retried with jittered exponential
+    backoff; a retry-after hint pauses the whole scheduler, since the quota is shared.
+
+    Thread-safe: share one instance between all the Operators calling the same provider,
+    e.g. `OpenAIChatCompletion(scheduler=scheduler)`.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, burst_seconds=1.0, max_retries=6,
+                 max_backoff=60.0, estimate_tokens=estimate_request_tokens, clock=time.monotonic):
+        """Initialize the scheduler.
+
+        Args:
+            requests_per_minute (float, optional): The request quota. Defaults to unlimited.
+            tokens_per_minute (float, optional): The token quota. Defaults to unlimited.
+            burst_seconds (float, optional): How many seconds worth of quota may be spent at once. Defaults to 1.
+            max_retries (int, optional): The number of retries of a failed request. Defaults to 6.
+            max_backoff (float, optional): The longest wait between two attempts, in seconds. Defaults to 60.
+            estimate_tokens (callable, optional): Estimates the tokens of a request from its keyword arguments.
+                The estimate is corrected with the `usage` of the response when there is one.
+            clock (callable, optional): Returns the current time in seconds. Defaults to `time.monotonic`.
+        """
+        self.buckets = {}
+        if requests_per_minute is not None:
+            self.buckets["requests"] = TokenBucket(requests_per_minute, max(1.0, requests_per_minute / 60 * burst_seconds), clock)
+        if tokens_per_minute is not None:
+            self.buckets["tokens"] = TokenBucket(tokens_per_minute, max(1.0, tokens_per_minute / 60 * burst_seconds), clock)
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.estimate_tokens = estimate_tokens
+        self.retries = 0
+        self._clock = clock
+        self._paused_until = 0.0
+        self._waiting = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+
+    def submit(self, function, *args, priority=INTERACTIVE, **kwargs):
+        """Call a function once the rate limits allow it, retrying when it is throttled.
+
+        Args:
+            function (callable): The provider call.
+            *args: Positional arguments of the call.
+            priority (int, optional): Lower priorities are served first. Defaults to INTERACTIVE.
+            **kwargs: Keyword arguments of the call.
+
+        Returns:
+            The result of the call.
+
+        Raises:
+            Exception: The last error once the retries are exhausted, or any non-retryable error.
+        """
+        import backoff
+
+        tokens = self.estimate_tokens(kwargs) if "tokens" in self.buckets else 0
+        delays = backoff.expo(max_value=self.max_backoff)
+        next(delays)
+
+        for attempt in itertools.count():
+            self._acquire(priority, tokens)
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                status = _status(e)
+                if status not in RETRYABLE_STATUSES or attempt >= self.max_retries:
+                    raise
+                self._back_off(_retry_after(e), backoff.full_jitter(next(delays)))
+                continue
+
+            used = _usage(result)
+            if used is not None and "tokens" in self.buckets:
+                with self._condition:
+                    self.buckets["tokens"].consume(used - tokens)
+            return result
+
+    def wrap(self, function, priority=INTERACTIVE):
+        """Return a version of `function` whose calls go through the scheduler.
+
+        Args:
+            function (callable): The provider call.
+            priority (int, optional): The priority of its requests. Defaults to INTERACTIVE.
+
+        Returns:
+            callable: The scheduled function, which keeps the name of the original one.
+        """
+        @functools.wraps(function)
+        def scheduled(*args, **kwargs):
+            return self.submit(function, *args, priority=priority, **kwargs)
+
+        return scheduled
+
+    def _delay(self, tokens):
+        delay = self._paused_until - self._clock()
+        for name, bucket in self.buckets.items():
+            delay = max(delay, bucket.delay(1 if name == "requests" else tokens))
+        return delay
+
+    def _acquire(self, priority, tokens):
+        """Block until this request is the most urgent one waiting and the buckets can afford it."""
+        ticket = (priority, next(self._counter))
+        with self._condition:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    if self._waiting[0] == ticket:
+                        delay = self._delay(tokens)
+                        if delay <= 0:
+                            break
+                        self._condition.wait(delay)
+                    else:
+                        self._condition.wait()
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+
+            for name, bucket in self.buckets.items():
+                bucket.consume(1 if name == "requests" else tokens)
+
+    def _back_off(self, retry_after, delay):
+        with self._condition:
+            self.retries += 1
+            if retry_after is not None:
+                # The provider told us when the quota frees up, which holds for every request
+                self._paused_until = max(self._paused_until, self._clock() + retry_after)
+                delay = max(delay, retry_after)
+        time.sleep(delay)
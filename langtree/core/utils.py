@@ -1,13 +1,32 @@
+import math
 
-def get_embedding_content(output):
+
+def get_embedding_content(output, as_array=False, normalize=False):
     """Process the output to return a list of embeddings.
 
-    Each embedding is a list of float values.
+    Each embedding is a list of float values, or a row of a single contiguous
+    float32 NumPy matrix when `as_array` is set (this requires NumPy).
 
     Args:
         output (list of lists): The output containing potential embeddings.
+        as_array (bool, optional): Return a `(n, dim)` float32 `numpy.ndarray` instead of lists. Defaults to False.
+        normalize (bool, optional): Scale every embedding to unit L2 norm. Defaults to False.
 
     Returns:
-        list of lists: Processed embeddings as lists of float values.
+        list of lists, numpy.ndarray: Processed embeddings.
     """
-    return [[float(val) for val in emb] for emb in output]
+    if as_array:
+        import numpy as np
+
+        matrix = np.asarray(output, dtype=np.float32)
+        if normalize:
+            norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+            matrix = matrix / np.where(norms == 0, 1, norms)
+        return np.ascontiguousarray(matrix)
+
+    embeddings = [[float(val) for val in emb] for emb in output]
+    if normalize:
+        for emb in embeddings:
+            norm = math.sqrt(sum(val * val for val in emb)) or 1.0
+            emb[:] = [val / norm for val in emb]
+    return embeddings
@@ -1,27 +1,34 @@
 
 from abc import ABC, abstractmethod
-from typing import Any, List
+from typing import Any, List, Sequence, Union
+
+# A single vector, or a batch of them such as the float32 matrix from get_embedding_content(as_array=True)
+Vectors = Union[Sequence[float], Sequence[Sequence[float]], "numpy.ndarray"]
 
 class VectorDatabase(ABC):
     @abstractmethod
-    def insert(self, vector: List[float], metadata: Any, **kwargs) -> None:
+    def insert(self, vector: Vectors, metadata: Any, **kwargs) -> None:
         """Insert a vector into the database with optional metadata and additional parameters.
 
+        Implementations accept a 2-D batch (one row per vector, e.g. a NumPy matrix) as well,
+        in which case `metadata` holds one entry per row.
+
         Args:
-            vector (List[float]): The vector to be inserted.
+            vector (Vectors): The vector, or batch of vectors, to be inserted.
             metadata (Any): Optional metadata associated with the vector.
             **kwargs: Additional parameters for insertion.
         """
         pass
 
     @abstractmethod
-    def query(self, vector: List[float], top_k: int, **kwargs) -> List[Any]:
+    def query(self, vector: Vectors, top_k: int, **kwargs) -> List[Any]:
         """Query the database for the 'top_k' closest vectors to the provided vector.
 
         Returns a list of matched vectors' metadata. Accepts additional parameters.
+        Querying with a 2-D batch returns one such list per row.
 
         Args:
-            vector (List[float]): The vector used for querying.
+            vector (Vectors): The vector, or batch of vectors, used for querying.
             top_k (int): Number of closest vectors to return.
             **kwargs: Additional parameters for querying.
 
@@ -41,6 +48,10 @@ class VectorDatabase(ABC):
         Returns:
             callable: The method from the underlying database object.
         """
+        # Never forward special or private lookups (copy, pickle, ...) nor the lookup of `db` itself
+        if name.startswith("_") or name == "db":
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
         def method(*args, **kwargs):
             if hasattr(self.db, name):
                 func = getattr(self.db, name)
@@ -1 +1,2 @@
+from .client import *
 from .openai_adapter import *
\ No newline at end of file
@@ -0,0 +1,126 @@
+import json
+import os
+
+from langtree.prompting.message_types import to_wire
+
+__all__ = ["OpenAIClient"]
+
+DEFAULT_API_BASE = "https://api.openai.com/v1"
+
+
+class OpenAIClient:
+    """A minimal OpenAI REST client that owns a pooled, keep-alive HTTP session.
+
+    `openai.*.create` only lets a session be configured process-wide, so every adapter
+    shares whatever the module uses. A client owns its own `requests.Session` with a
+    connection pool of `pool_size` keep-alive connections per host, which is safe to
+    share between threads, including the threads `Operator.acall` offloads calls to.
+    Responses are returned as plain dicts shaped like the `openai` ones, so the
+    adapters parse them the same way.
+
+    Pass it to an adapter with `OpenAIChatCompletion(client=client)`.
+    """
+
+    def __init__(self, api_key=None, api_base=None, organization=None, pool_size=32, pool_block=True,
+                 timeout=600, session=None):
+        """Initialize the client.
+
+        Args:
+            api_key (str, optional): The API key. Defaults to the OPENAI_API_KEY environment variable.
+            api_base (str, optional): The API root URL. Defaults to OPENAI_API_BASE or the public endpoint.
+            organization (str, optional): The organization sent with every request.
+            pool_size (int, optional): The number of connections kept open per host. Defaults to 32.
+            pool_block (bool, optional): Wait for a free pooled connection instead of opening a throwaway
+                one when they are all in use. Defaults to True.
+            timeout (float, optional): The default request timeout in seconds. Defaults to 600.
+            session (requests.Session, optional): A session to use instead of creating one. It is used as is.
+
+        Raises:
+            ImportError: If no session is given and requests is not installed.
+        """
+        self.api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY")
+        self.api_base = (api_base or os.environ.get("OPENAI_API_BASE") or DEFAULT_API_BASE).rstrip("/")
+        self.organization = organization
+        self.timeout = timeout
+
+        if session is None:
+            try:
+                import requests
+                from requests.adapters import HTTPAdapter
+            except ImportError as error:
+                raise ImportError("OpenAIClient needs the requests package, install it with `pip install requests` "
+                                  "or pass a session") from error
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=pool_block)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+
+    def request(self, path, stream=False, request_timeout=None, **params):
+        """POST a JSON request to an endpoint.
+
+        Args:
+            path (str): The endpoint path, e.g. "chat/completions".
+            stream (bool, optional): Stream the response as server-sent events. Defaults to False.
+            request_timeout (float, optional): Overrides the client timeout for this request.
+            **params: The JSON body.
+
+        Returns:
+            dict, iterator of dict: The response, or an iterator over the streamed chunks.
+
+        Raises:
+            requests.HTTPError: If the API answers with an error status. Its `response` carries the
+                status and headers, e.g. for a `Scheduler` to honor retry-after hints.
+        """
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        if self.organization:
+            headers["OpenAI-Organization"] = self.organization
+        if stream:
+            params["stream"] = True
+
+        response = self.session.post(f"{self.api_base}/{path}", data=json.dumps(params), headers=headers,
+                                     timeout=self.timeout if request_timeout is None else request_timeout,
+                                     stream=stream)
+        if not response.ok:
+            # Read the body so the connection goes back to the pool
+            response.content
+            response.raise_for_status()
+        if stream:
+            return self._events(response)
+        return response.json()
+
+    def create_chat_completion(self, messages=(), stream=False, **kwargs):
+        """Call the chat completions endpoint. Takes the arguments of `openai.ChatCompletion.create`."""
+        return self.request("chat/completions", stream=stream, messages=to_wire(messages), **kwargs)
+
+    def create_completion(self, stream=False, **kwargs):
+        """Call the completions endpoint. Takes the arguments of `openai.Completion.create`."""
+        return self.request("completions", stream=stream, **kwargs)
+
+    def create_embedding(self, **kwargs):
+        """Call the embeddings endpoint. Takes the arguments of `openai.Embedding.create`."""
+        return self.request("embeddings", **kwargs)
+
+    def close(self):
+        """Close every pooled connection."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _events(response):
+        with response:
+            for line in response.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[len(b"data:"):].strip()
+                if data == b"[DONE]":
+                    return
+                yield json.loads(data)
@@ -1,40 +1,182 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from langtree.core import Operator
+from langtree.core.buffer import approximate_token_count
+from langtree.core.recording import bind, record_usage
+from langtree.core.scheduler import INTERACTIVE, BATCH
 from langtree.core.utils import get_embedding_content
-import openai
+from langtree.operators.executors import run_branches
+from langtree.prompting.message_types import to_wire
 
 def get_chat_content(output):
     return output["choices"][0]["message"]
 
+def get_chat_delta(chunk):
+    """Return the text carried by a streamed chat completion chunk, or None if it has none."""
+    return chunk["choices"][0]["delta"].get("content") if chunk["choices"] else None
+
+def get_completion_delta(chunk):
+    """Return the text carried by a streamed completion chunk."""
+    return chunk["choices"][0]["text"] if chunk["choices"] else None
+
+def schedule(call, scheduler=None, priority=INTERACTIVE):
+    """Route a provider call through a rate-limit `Scheduler`, if one is given."""
+    return call if scheduler is None else scheduler.wrap(call, priority=priority)
+
+# The default endpoints import `openai` on their first request rather than with this module,
+# which keeps chains that never reach the SDK (stubs, clients, cache hits) off its import time
+def create_chat_completion(messages=(), stream=False, **kwargs):
+    """Call `openai.ChatCompletion.create`."""
+    import openai
+    return openai.ChatCompletion.create(messages=to_wire(messages), stream=stream, **kwargs)
+
+def create_completion(stream=False, **kwargs):
+    """Call `openai.Completion.create`."""
+    import openai
+    return openai.Completion.create(stream=stream, **kwargs)
+
+def create_embedding(**kwargs):
+    """Call `openai.Embedding.create`."""
+    import openai
+    return openai.Embedding.create(**kwargs)
+
 class OpenAIChatCompletion(Operator):
 
-    def __init__(self, call=None, parse=None, **kwargs):
+    def __init__(self, call=None, parse=None, parse_chunk=None, scheduler=None, priority=INTERACTIVE, client=None,
+                 **kwargs):
+        if call is None:
+            call = create_chat_completion if client is None else client.create_chat_completion
         super().__init__(
-            call=openai.ChatCompletion.create if call is None else call,
-            parse=get_chat_content if parse is None else parse
+            call=schedule(call, scheduler, priority),
+            parse=get_chat_content if parse is None else parse,
+            parse_chunk=get_chat_delta if parse_chunk is None else parse_chunk
         )
         self.freeze_call(**kwargs)
 
 
 class OpenAICompletion(Operator):
 
-    def __init__(self, call=None, parse=None, **kwargs):
+    def __init__(self, call=None, parse=None, parse_chunk=None, scheduler=None, priority=INTERACTIVE, client=None,
+                 **kwargs):
+        if call is None:
+            call = create_completion if client is None else client.create_completion
         super().__init__(
-            call=openai.Completion.create if call is None else call,
-            parse=None
+            call=schedule(call, scheduler, priority),
+            parse=None,
+            parse_chunk=get_completion_delta if parse_chunk is None else parse_chunk
         )
         self.freeze_call(**kwargs)
 
-def make_open_ai_embedding_call(func):
-    def embfn(docs, model=None):
-        return [func(input=d, model=model)["data"][0]["embedding"] for d in docs]
+def batch_documents(docs, batch_size, max_batch_tokens=None, tokenizer=None):
+    """Pack documents into consecutive batches capped by item count and token count.
+
+    A document that is larger than `max_batch_tokens` on its own gets a batch of its own.
+
+    Args:
+        docs (list of str): The documents to pack.
+        batch_size (int): The maximum number of documents per batch.
+        max_batch_tokens (int, optional): The maximum number of tokens per batch.
+        tokenizer (callable, optional): A function turning a text into its tokens. Defaults to an estimate.
+
+    Returns:
+        list of list of str: The batches, in input order.
+    """
+    batches, batch, tokens = [], [], 0
+    for doc in docs:
+        size = approximate_token_count(doc) if tokenizer is None else len(tokenizer(doc))
+        if batch and (len(batch) >= batch_size or (max_batch_tokens is not None and tokens + size > max_batch_tokens)):
+            batches.append(batch)
+            batch, tokens = [], 0
+        batch.append(doc)
+        tokens += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def make_open_ai_embedding_call(func, batch_size=1000, max_batch_tokens=100_000, max_workers=4, tokenizer=None,
+                                cache=None):
+    """Wrap an embeddings endpoint so a list of documents is embedded with as few requests as possible.
+
+    Documents are packed with `batch_documents`, the batches are sent concurrently and
+    the embeddings are returned in the order of the input documents. With a cache, only
+    the documents it does not hold yet are sent, and the result is a float32 matrix.
+
+    Args:
+        func (callable): The embeddings endpoint, e.g. `openai.Embedding.create`.
+        batch_size (int, optional): The maximum number of documents per request. Defaults to 1000.
+        max_batch_tokens (int, optional): The maximum number of tokens per request. Defaults to 100,000.
+        max_workers (int, optional): The maximum number of requests in flight. Defaults to 4.
+        tokenizer (callable, optional): A function turning a text into its tokens. Defaults to an estimate.
+        cache (EmbeddingCache, optional): A cache keyed by model and document content.
+
+    Returns:
+        callable: A function taking a list of documents and returning their embeddings.
+    """
+    def embed_batch(batch, **kwargs):
+        response = func(input=batch, **kwargs)
+        record_usage(response)
+        data = response["data"]
+        return [item["embedding"] for item in sorted(data, key=lambda item: item["index"])]
+
+    def fetch(docs, model=None, **kwargs):
+        batches = batch_documents(docs, batch_size, max_batch_tokens, tokenizer)
+        branches = [bind(lambda batch=batch: embed_batch(batch, model=model, **kwargs)) for batch in batches]
+
+        if len(branches) <= 1 or max_workers <= 1:
+            results = [branch() for branch in branches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(branches))) as executor:
+                results = run_branches(executor, branches)
+
+        return [embedding for result in results for embedding in result]
+
+    if cache is None:
+        return fetch
+
+    def embfn(docs, model=None, **kwargs):
+        return cache.embed(model, docs, lambda missing: fetch(missing, model=model, **kwargs))
 
     return embfn
 
 class OpenAIEmbedding(Operator):
 
-    def __init__(self, call=None, **kwargs):
+    def __init__(self, call=None, create=None, batch_size=1000, max_batch_tokens=100_000, max_workers=4, tokenizer=None,
+                 as_array=False, normalize=False, cache=None, scheduler=None, priority=BATCH, client=None, **kwargs):
+        """Initialize an embedding Operator that batches documents into concurrent requests.
+
+        Args:
+            call (callable, optional): Replaces the whole embedding function.
+            create (callable, optional): The embeddings endpoint to batch requests to. Defaults to
+                `openai.Embedding.create`, or the endpoint of `client`; pass a stub to run offline.
+            batch_size (int, optional): The maximum number of documents per request.
+            max_batch_tokens (int, optional): The maximum number of tokens per request.
+            max_workers (int, optional): The maximum number of requests in flight.
+            tokenizer (callable, optional): A function turning a text into its tokens. Defaults to an estimate.
+            as_array (bool, optional): Return one float32 NumPy matrix instead of lists of floats.
+            normalize (bool, optional): Scale every embedding to unit L2 norm.
+            cache (EmbeddingCache, optional): Reuse the embeddings of documents seen before; only new
+                documents are sent to the endpoint. Requires NumPy.
+            scheduler (Scheduler, optional): Rate-limits every batch request.
+            priority (int, optional): The scheduler priority of the batch requests. Defaults to BATCH.
+            client (OpenAIClient, optional): A client whose pooled HTTP session sends the requests.
+            **kwargs: Arguments frozen into every request, e.g. `model`.
+        """
+        if create is None:
+            create = create_embedding if client is None else client.create_embedding
+        if call is None:
+            call = make_open_ai_embedding_call(
+                schedule(create, scheduler, priority),
+                batch_size=batch_size,
+                max_batch_tokens=max_batch_tokens,
+                max_workers=max_workers,
+                tokenizer=tokenizer,
+                cache=cache,
+            )
         super().__init__(
-            call=make_open_ai_embedding_call(openai.Embedding.create) if call is None else call,
+            call=call,
             parse=get_embedding_content
         )
         self.freeze_call(**kwargs)
+        if as_array or normalize:
+            self.freeze_parse(as_array=as_array, normalize=normalize)
@@ -1 +1,4 @@
-from langtree.operators.base_operators import *
\ No newline at end of file
+from langtree.operators.base_operators import *
+from langtree.operators.executors import *
+from langtree.operators.graph import *
+from langtree.operators.batch import *
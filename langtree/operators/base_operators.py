@@ -1,6 +1,12 @@
-import copy
+import functools
+import importlib
+import threading
+import weakref
 
-from langtree.core.operator import Operator
+from langtree.core.operator import Operator, call_async
+from langtree.core.recording import bind, traced
+from langtree.operators.executors import acquire_executor, release_executor, run_branches
+from langtree.utils.isolation import ISOLATION_POLICIES, isolate
 
 """
     Before someone asks why these operators do not inherit from Operator, the answer is twofold:
@@ -8,6 +14,9 @@ from langtree.core.operator import Operator
         2) Implementing the freezing present in Operator is not a great idea on a vector OP (way too much mental overhead for a developer, i.e. me)
 """
 
+# Guards the first acquisition of a block's executor, when several threads call the block at once
+_executor_lock = threading.Lock()
+
 
 def chainable(func):
     """Decorator that makes a function chainable with its arguments.
@@ -18,20 +27,82 @@ def chainable(func):
     Returns:
         callable: The chainable function.
     """
+    chained = _Chained(func)
+
+    @functools.wraps(func)
     def wrapper(*args, **kws):
-        op = Operator(func)
+        op = Operator(chained)
         op.freeze_call(**kws)
         return op
 
+    wrapper._chained = chained
     return wrapper
 
 
+class _Chained:
+    """Calls a function decorated by `chainable` and pickles as a reference to the decorated name.
+
+    Used as a decorator, the module attribute holds the wrapper instead of the function, so pickle
+    cannot find the function itself by name (e.g. to ship a chain to worker processes).
+    """
+
+    def __init__(self, func):
+        functools.update_wrapper(self, func)
+        self._func = func
+
+    def __call__(self, *args, **kwargs):
+        return self._func(*args, **kwargs)
+
+    def __reduce__(self):
+        if "<locals>" in self.__qualname__:
+            # Not reachable by name: pickle the function itself, which cloudpickle can do by value
+            return _Chained, (self._func,)
+        return _load_chained, (self.__module__, self.__qualname__)
+
+
+def _load_chained(module, qualname):
+    target = importlib.import_module(module)
+    for name in qualname.split("."):
+        target = getattr(target, name)
+    # The name holds the function itself when `chainable` was not used as a decorator
+    chained = getattr(target, "_chained", None)
+    return chained if chained is not None else _Chained(target)
+
+
 class Parallel:
-    def __init__(self, operations):
+    def __init__(self, operations, executor=None, max_workers=None, timeout=None, isolation="deepcopy"):
+        """Initialize a Parallel block that passes the same inputs to every operation.
+
+        Args:
+            operations (list): The operations to run. A Parallel block listed here is kept as one
+                branch that runs with its own settings; use `+` to merge its branches into this block.
+            executor (str, Executor, optional): How branches are run: "serial" (default),
+                "thread", "process" or any `concurrent.futures.Executor`. With "process",
+                every operation and its inputs must be picklable. Thread and process pools
+                are shared by the blocks asking for the same kind and size, see `close`.
+            max_workers (int, optional): The pool size used when `executor` is "thread" or "process".
+            timeout (float, optional): The overall deadline, in seconds from the call, for all branches
+                together. A TimeoutError is raised when it expires.
+            isolation (str, optional): How branches are kept from seeing each other's mutations of the inputs:
+                "deepcopy" (default) copies everything per branch, "shared" passes one read-only view to
+                every branch and "copy-on-write" only copies the parts of the inputs a branch reaches into.
+        """
+        if isolation not in ISOLATION_POLICIES:
+            raise ValueError(f"Unknown isolation policy '{isolation}'. Expected one of {ISOLATION_POLICIES}")
+
+        self.isolation = isolation
+        self.executor = executor
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = None
+        self._release = None
 
         self.operations = []
         for operation in operations:
-            self.add(operation)
+            if isinstance(operation, Parallel):
+                self.operations.append(operation)
+            else:
+                self.add(operation)
 
     def __iadd__(self, other):
         return self.add(other)
@@ -40,11 +111,11 @@ class Parallel:
         operations = self.operations
 
         if isinstance(other, Sequential):
-            return Parallel(operations + [other])
+            return self._spawn(operations + [other])
         elif isinstance(other, Parallel):
-            return Parallel(self.operations + other.operations)
+            return self._spawn(operations + other.operations)
         elif isinstance(other, Operator):
-            return Parallel(operations + [other])
+            return self._spawn(operations + [other])
         else:
             raise ValueError(
                 f"{type(other)} is not usable with type:{type(self)}. This class can only add Operators (SequentialOperator, ParallelOperator, Operator)")
@@ -62,13 +133,92 @@ class Parallel:
 
         return self
 
+    @traced
     def __call__(self, *args, **kwargs):
 
-        output = []
-        for operation in self.operations:
-            output.append(operation(*copy.deepcopy(args), **copy.deepcopy(kwargs)))
+        if self._executor is None:
+            with _executor_lock:
+                if self._executor is None:
+                    executor = acquire_executor(self.executor, self.max_workers)
+                    # Released by `close`, or when the block is garbage collected
+                    self._release = weakref.finalize(self, release_executor, executor)
+                    self._executor = executor
 
-        return output
+        # Each branch gets its own isolated inputs, prepared before anything is submitted
+        inputs = isolate(args, kwargs, self.isolation, len(self.operations))
+        branches = [
+            bind(functools.partial(operation, *branch_args, **branch_kwargs))
+            for operation, (branch_args, branch_kwargs) in zip(self.operations, inputs)
+        ]
+        return run_branches(self._executor, branches, timeout=self.timeout)
+
+    @traced
+    async def acall(self, *args, **kwargs):
+        """Run every branch concurrently on the running event loop.
+
+        At most `max_workers` branches run at once when it is set. Synchronous call
+        functions are offloaded to the default executor, and as soon as one branch fails
+        or `timeout` expires the remaining branches are cancelled.
+        """
+        import asyncio
+
+        semaphore = asyncio.Semaphore(self.max_workers) if self.max_workers else None
+
+        async def branch(operation, *args, **kwargs):
+            if semaphore is None:
+                return await call_async(operation, *args, **kwargs)
+            async with semaphore:
+                return await call_async(operation, *args, **kwargs)
+
+        inputs = isolate(args, kwargs, self.isolation, len(self.operations))
+        tasks = [
+            asyncio.ensure_future(branch(operation, *branch_args, **branch_kwargs))
+            for operation, (branch_args, branch_kwargs) in zip(self.operations, inputs)
+        ]
+        try:
+            return await asyncio.wait_for(asyncio.gather(*tasks), self.timeout)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    def compile(self, **kwargs):
+        """Flatten this block into a `ChainGraph`. Keyword arguments are passed to `compile_chain`."""
+        from langtree.operators.graph import compile_chain
+        return compile_chain(self, **kwargs)
+
+    def map(self, inputs, **kwargs):
+        """Run this block over every item of an iterable. Keyword arguments are passed to `map_chain`."""
+        from langtree.operators.batch import map_chain
+        return map_chain(self, inputs, **kwargs)
+
+    def close(self):
+        """Release the executor of this block and of the blocks nested in it.
+
+        Pools created from an executor name are shared with other blocks and shut down
+        once none of them uses them anymore; executor instances passed in are left to
+        their owner. The block can still be called afterwards, which acquires a pool again.
+        """
+        with _executor_lock:
+            if self._release is not None:
+                self._release()
+            self._executor = self._release = None
+        _close_nested(self.operations)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_executor"] = state["_release"] = None
+        return state
+
+    def _spawn(self, operations):
+        return Parallel(operations, executor=self.executor, max_workers=self.max_workers,
+                        timeout=self.timeout, isolation=self.isolation)
 
 
 class Sequential:
@@ -94,8 +244,18 @@ class Sequential:
             raise ValueError(
                 f"{type(other)} is not usable with type:{type(self)}. This class can only add Operators (SequentialOperator, ParallelOperator, Operator)")
 
+    @property
+    def streams(self):
+        """bool: Whether the last operation can stream, in which case `stream=True` streams the chain."""
+        return bool(self.operations) and getattr(self.operations[-1], "streams", False)
+
+    @traced
     def __call__(self, *args, **kwargs):
 
+        if "stream" in kwargs and self.streams:
+            if kwargs.pop("stream"):
+                return self.stream(*args, **kwargs)
+
         output = args
         for i, operation in enumerate(self.operations):
 
@@ -109,6 +269,70 @@ class Sequential:
 
         return output
 
+    def stream(self, *args, **kwargs):
+        """Run every operation but the last one, then stream the output of the last one.
+
+        Intermediate stages still pass complete outputs along, so chunks start flowing as
+        soon as the last stage produces them. A last stage that cannot stream (e.g. a
+        Parallel block or an Operator whose call function does not opt in to streaming)
+        yields its whole output as a single chunk.
+
+        Yields:
+            The chunks of the last operation.
+        """
+        if not self.operations:
+            yield args
+            return
+
+        *head, last = self.operations
+        output = Sequential(head)(*args, **kwargs) if head else args
+        if not isinstance(output, tuple):
+            output = tuple([output])
+        if head:
+            kwargs = {}
+
+        if hasattr(last, "stream"):
+            yield from last.stream(*output, **kwargs)
+        else:
+            yield last(*output, **kwargs)
+
+    @traced
+    async def acall(self, *args, **kwargs):
+        """Asynchronously run each operation, feeding every output into the next one."""
+
+        output = args
+        for i, operation in enumerate(self.operations):
+
+            if not isinstance(output, tuple):
+                output = tuple([output])
+
+            if i == 0:
+                output = await call_async(operation, *output, **kwargs)
+            else:
+                output = await call_async(operation, *output)
+
+        return output
+
+    def compile(self, **kwargs):
+        """Flatten this chain into a `ChainGraph`. Keyword arguments are passed to `compile_chain`."""
+        from langtree.operators.graph import compile_chain
+        return compile_chain(self, **kwargs)
+
+    def map(self, inputs, **kwargs):
+        """Run this chain over every item of an iterable. Keyword arguments are passed to `map_chain`."""
+        from langtree.operators.batch import map_chain
+        return map_chain(self, inputs, **kwargs)
+
+    def close(self):
+        """Release the executors of the Parallel blocks in this chain, see `Parallel.close`."""
+        _close_nested(self.operations)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def add(self, other):
         if isinstance(other, Sequential):
             self.operations.extend(other.operations)
@@ -120,3 +344,9 @@ class Sequential:
             raise ValueError(f"{type(other)} is not usable with type:{type(self)}. This class can only add Operators (SequentialOperator, ParallelOperator, Operator)")
 
         return self
+
+
+def _close_nested(operations):
+    for operation in operations:
+        if isinstance(operation, (Parallel, Sequential)):
+            operation.close()
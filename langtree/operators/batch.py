@@ -0,0 +1,260 @@
+import itertools
+import os
+import pickle
+import sys
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+
+from langtree.core.recording import bind
+from langtree.operators.executors import _cancel, get_executor
+
+__all__ = ["Checkpoint", "map_chain"]
+
+
+class Checkpoint:
+    """An append-only file of finished `map_chain` results, keyed by input position.
+
+    Every finished chunk is pickled and flushed as one record, so a killed job loses at
+    most the chunks that were still running. A record cut short by the kill is dropped
+    when the file is reopened.
+    """
+
+    def __init__(self, path):
+        """Open a checkpoint, loading the results it already holds.
+
+        Args:
+            path (str): The checkpoint file. It is created if it does not exist.
+        """
+        self.path = path
+        self.results = {}
+
+        valid = 0
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                while True:
+                    try:
+                        self.results.update(pickle.load(f))
+                    except (EOFError, pickle.UnpicklingError, ValueError):
+                        break
+                    valid = f.tell()
+            with open(path, "r+b") as f:
+                f.truncate(valid)
+        self._file = open(path, "ab")
+
+    def __contains__(self, index):
+        return index in self.results
+
+    def __len__(self):
+        return len(self.results)
+
+    def add(self, pairs):
+        """Record finished results.
+
+        Args:
+            pairs (list of tuple): `(index, result)` pairs. Results must be picklable.
+        """
+        pickle.dump(pairs, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.flush()
+        self.results.update(pairs)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def dumps_chain(chain):
+    """Pickle a chain so it can be shipped to worker processes.
+
+    Chains holding lambdas or closures cannot be pickled by reference; they fall back to
+    cloudpickle when it is installed.
+
+    Args:
+        chain (callable): The chain.
+
+    Returns:
+        bytes: The pickled chain, loadable with `pickle.loads`.
+
+    Raises:
+        TypeError: If the chain cannot be pickled.
+    """
+    try:
+        return pickle.dumps(chain, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, AttributeError, TypeError) as error:
+        try:
+            import cloudpickle
+        except ImportError:
+            raise TypeError(f"The chain cannot be pickled ({error}). Define its functions at module level "
+                            "or install cloudpickle") from error
+        return cloudpickle.dumps(chain, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+# The chain unpickled once per worker process, by the pool initializer or on first use
+_worker_chains = {}
+
+
+def _init_worker(key, payload):
+    _worker_chains[key] = pickle.loads(payload)
+
+
+def _run_chunk(chain, items, return_exceptions):
+    results = []
+    for index, item in items:
+        try:
+            results.append((index, chain(item)))
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results.append((index, e))
+    return results
+
+
+def _run_shipped_chunk(key, payload, items, return_exceptions):
+    if key not in _worker_chains:
+        _worker_chains.clear()
+        _worker_chains[key] = pickle.loads(payload)
+    return _run_chunk(_worker_chains[key], items, return_exceptions)
+
+
+def _is_process_pool(executor):
+    # Without concurrent.futures.process loaded, no process pool can exist, so do not import it
+    process = sys.modules.get("concurrent.futures.process")
+    return process is not None and isinstance(executor, process.ProcessPoolExecutor)
+
+
+def map_chain(chain, inputs, executor="process", max_workers=None, chunk_size=1, max_in_flight=None,
+              ordered=True, checkpoint=None, return_exceptions=False):
+    """Run a chain over every item of an iterable, e.g. a large offline dataset.
+
+    Items are read lazily and grouped into chunks of `chunk_size`, and at most
+    `max_in_flight` chunks are submitted or waiting to be yielded at any time, so a huge
+    (or endless) input never piles up in memory. Each item is passed as `chain(item)`.
+
+    With the default "process" executor the chain is pickled once and unpickled once per
+    worker, so CPU-bound render and parse stages use every core. Chains built from
+    lambdas or closures are shipped with cloudpickle when it is installed.
+
+        for answer in map_chain(chain, questions, max_workers=8, chunk_size=32, checkpoint="job.ckpt"):
+            ...
+
+    Args:
+        chain (callable): The chain, e.g. an Operator, Sequential or Parallel block.
+        inputs (iterable): The items to run the chain on.
+        executor (str, Executor, optional): "process" (default), "thread", "serial" or any
+            `concurrent.futures.Executor`. Executors given as instances are not shut down.
+        max_workers (int, optional): The pool size for "thread" and "process".
+        chunk_size (int, optional): The number of items sent to a worker at once. Larger chunks amortize
+            the cost of shipping items between processes. Defaults to 1.
+        max_in_flight (int, optional): The maximum number of chunks submitted but not yet yielded.
+            Defaults to twice the number of workers.
+        ordered (bool, optional): Yield results in input order. Otherwise `(index, result)` pairs are
+            yielded as soon as their chunk finishes. Defaults to True.
+        checkpoint (str, Checkpoint, optional): A checkpoint file. Items it already holds a result for are
+            not run again, their stored result is yielded instead, and every finished chunk is added to it.
+        return_exceptions (bool, optional): Yield the exception raised by an item in place of its result
+            instead of stopping the run. Failed items are not checkpointed. Defaults to False.
+
+    Yields:
+        The result of every item, or `(index, result)` pairs when `ordered` is False.
+
+    Raises:
+        ValueError: If `chunk_size` or `max_in_flight` is not positive.
+        TypeError: If the chain has to be pickled and cannot be.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    if max_in_flight is not None and max_in_flight < 1:
+        raise ValueError(f"max_in_flight must be positive, got {max_in_flight}")
+
+    # Pickling errors surface here rather than on the first iteration
+    payload = None
+    if executor == "process" or _is_process_pool(executor):
+        payload = dumps_chain(chain)
+
+    if isinstance(checkpoint, (str, os.PathLike)):
+        checkpoint = Checkpoint(checkpoint)
+        owned_checkpoint = True
+    else:
+        owned_checkpoint = False
+
+    return _map(chain, payload, inputs, executor, max_workers, chunk_size, max_in_flight, ordered, checkpoint,
+                owned_checkpoint, return_exceptions)
+
+
+def _map(chain, payload, inputs, executor, max_workers, chunk_size, max_in_flight, ordered, checkpoint,
+         owned_checkpoint, return_exceptions):
+    owned = not isinstance(executor, Executor)
+    if payload is None:
+        pool = get_executor(executor, max_workers)
+        submit = lambda chunk: pool.submit(bind(_run_chunk), chain, chunk, return_exceptions)
+    elif owned:
+        key = hash(payload)
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(key, payload))
+        submit = lambda chunk: pool.submit(_run_shipped_chunk, key, None, chunk, return_exceptions)
+    else:
+        key, pool = hash(payload), executor
+        submit = lambda chunk: pool.submit(_run_shipped_chunk, key, payload, chunk, return_exceptions)
+    if max_in_flight is None:
+        max_in_flight = 2 * (getattr(pool, "_max_workers", None) or os.cpu_count() or 1)
+
+    stored = checkpoint.results if checkpoint is not None else {}
+    # Positions of the items still to run, in input order; checkpointed items are never submitted
+    items = ((index, item) for index, item in enumerate(inputs) if index not in stored)
+    running = {}
+    finished = {}  # results waiting for earlier ones, by input position, when ordered
+    next_index = 0  # the next input position to yield, when ordered
+    exhausted = False
+
+    def store(results):
+        if checkpoint is not None:
+            succeeded = [(index, result) for index, result in results if not isinstance(result, Exception)]
+            if succeeded:
+                checkpoint.add(succeeded)
+
+    try:
+        if not ordered:
+            yield from list(stored.items())
+
+        while True:
+            # Results held back for ordering count against the bound, so a slow item cannot let them pile up
+            while not exhausted and len(running) + -(-len(finished) // chunk_size) < max_in_flight:
+                chunk = list(itertools.islice(items, chunk_size))
+                if not chunk:
+                    exhausted = True
+                    break
+                running[submit(chunk)] = chunk
+
+            while ordered:
+                if next_index in finished:
+                    yield finished.pop(next_index)
+                elif next_index in stored:
+                    yield stored[next_index]
+                else:
+                    break
+                next_index += 1
+
+            if not running:
+                if exhausted or finished:
+                    return
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                results = future.result()
+                store(results)
+                if ordered:
+                    finished.update(results)
+                else:
+                    yield from results
+    finally:
+        _cancel(running)
+        if owned:
+            pool.shutdown(wait=False, cancel_futures=True)
+        if owned_checkpoint:
+            checkpoint.close()
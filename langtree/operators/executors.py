@@ -0,0 +1,195 @@
+from concurrent.futures import FIRST_EXCEPTION, Executor, Future, ThreadPoolExecutor, TimeoutError, wait
+import threading
+import time
+
+__all__ = ["SerialExecutor", "get_executor", "acquire_executor", "release_executor", "run_branches"]
+
+
+class SerialExecutor(Executor):
+    """An executor that runs every submitted function immediately in the calling thread.
+
+    This mirrors the original behaviour of `Parallel`, while exposing the same
+    interface as the executors from `concurrent.futures`.
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        """Run `fn` right away and return an already completed future.
+
+        Args:
+            fn (callable): The function to run.
+            *args: Positional arguments for `fn`.
+            **kwargs: Keyword arguments for `fn`.
+
+        Returns:
+            Future: A future holding the result (or exception) of `fn`.
+        """
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def _process_pool(max_workers):
+    # concurrent.futures.process loads multiprocessing, which most chains never need
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=max_workers)
+
+
+EXECUTORS = {
+    "serial": lambda max_workers: SerialExecutor(),
+    "thread": lambda max_workers: ThreadPoolExecutor(max_workers=max_workers),
+    "process": _process_pool,
+}
+
+
+def get_executor(executor, max_workers=None):
+    """Resolve an executor specification into an executor instance.
+
+    Args:
+        executor (str, Executor, None): One of "serial", "thread", "process", an
+            existing `concurrent.futures.Executor`, or None for "serial".
+        max_workers (int, optional): The bound on the pool size for "thread" and "process".
+
+    Returns:
+        Executor: The resolved executor.
+
+    Raises:
+        ValueError: If the specification is not a known executor.
+    """
+    if executor is None:
+        executor = "serial"
+    if isinstance(executor, Executor):
+        return executor
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor '{executor}'. Expected one of {sorted(EXECUTORS)} or a concurrent.futures.Executor")
+    return EXECUTORS[executor](max_workers)
+
+
+# Pools shared by the blocks that name the same executor and size: (executor, max_workers) -> [pool, users]
+_shared = {}
+# Reentrant, since a block collected while the lock is held releases its pool from a finalizer
+_shared_lock = threading.RLock()
+# The key of the shared thread pool the current thread is a worker of, if any
+_worker = threading.local()
+
+
+def _mark_worker(key):
+    _worker.key = key
+
+
+def acquire_executor(executor, max_workers=None):
+    """Resolve an executor specification, sharing thread and process pools between users.
+
+    Every user asking for the same executor name and `max_workers` gets the same pool,
+    so blocks do not each keep their own idle workers around. Each call must be matched
+    by a `release_executor`; the pool is shut down once its last user released it.
+    "serial" and executor instances are returned as `get_executor` does and are never shut down.
+
+    Args:
+        executor (str, Executor, None): See `get_executor`.
+        max_workers (int, optional): The bound on the pool size for "thread" and "process".
+
+    Returns:
+        Executor: The resolved executor.
+
+    Raises:
+        ValueError: If the specification is not a known executor.
+    """
+    if executor not in ("thread", "process"):
+        return get_executor(executor, max_workers)
+
+    key = (executor, max_workers)
+    with _shared_lock:
+        entry = _shared.get(key)
+        if entry is None:
+            if executor == "thread":
+                pool = ThreadPoolExecutor(max_workers=max_workers, initializer=_mark_worker, initargs=(key,))
+            else:
+                pool = _process_pool(max_workers)
+            entry = _shared[key] = [pool, 0]
+        entry[1] += 1
+        return entry[0]
+
+
+def release_executor(executor):
+    """Release an executor obtained from `acquire_executor`, shutting its pool down after the last user.
+
+    Args:
+        executor (Executor): The executor to release. Executors that are not shared pools are left untouched.
+    """
+    with _shared_lock:
+        for key, entry in list(_shared.items()):
+            if entry[0] is executor:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del _shared[key]
+                    # Running branches finish in the background, nothing waits on them anymore
+                    executor.shutdown(wait=False)
+                return
+
+
+def _reentrant(executor):
+    """Return `executor`, or a SerialExecutor when the caller is one of its own shared workers.
+
+    A nested block waiting on the pool it is running on could otherwise take every worker
+    and wait forever for branches that have no worker left to run them.
+    """
+    key = getattr(_worker, "key", None)
+    if key is not None and _shared.get(key, (None,))[0] is executor:
+        return SerialExecutor()
+    return executor
+
+
+def run_branches(executor, branches, timeout=None):
+    """Run a list of zero-argument callables on an executor and gather their results.
+
+    Results are returned in the same order as `branches`. As soon as one branch
+    raises (or the timeout expires), every branch that has not started yet is
+    cancelled and the error is re-raised. Branches that are already running
+    cannot be interrupted and are left to finish in the background.
+
+    Args:
+        executor (Executor): The executor to submit the branches to.
+        branches (list of callable): The branches to run.
+        timeout (float, optional): The overall deadline, in seconds from the moment the first
+            branch is submitted, for all branches together.
+
+    Returns:
+        list: The result of each branch.
+
+    Raises:
+        TimeoutError: If the branches did not all finish within `timeout`.
+    """
+    executor = _reentrant(executor)
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    futures = []
+    for branch in branches:
+        future = executor.submit(branch)
+        futures.append(future)
+        # Executors that run inline (e.g. SerialExecutor) finish before we get here, so fail fast
+        if future.done() and future.exception() is not None:
+            _cancel(futures)
+            raise future.exception()
+        if deadline is not None and time.monotonic() > deadline:
+            _cancel(futures)
+            raise TimeoutError(f"Parallel branches did not finish within {timeout}s")
+
+    remaining = None if deadline is None else max(0, deadline - time.monotonic())
+    done, pending = wait(futures, timeout=remaining, return_when=FIRST_EXCEPTION)
+
+    failed = [future for future in futures if future in done and future.exception() is not None]
+    if failed or pending:
+        _cancel(pending)
+        if failed:
+            raise failed[0].exception()
+        raise TimeoutError(f"{len(pending)} of {len(futures)} parallel branches did not finish within {timeout}s")
+
+    return [future.result() for future in futures]
+
+
+def _cancel(futures):
+    for future in futures:
+        future.cancel()
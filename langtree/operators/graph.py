@@ -0,0 +1,236 @@
+import threading
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, TimeoutError, wait
+
+from langtree.core.operator import Operator
+from langtree.core.recording import bind, traced
+from langtree.operators.base_operators import Parallel, Sequential
+from langtree.operators.executors import _cancel, _reentrant, acquire_executor, release_executor
+from langtree.utils.isolation import isolate
+
+__all__ = ["Node", "ChainGraph", "compile_chain"]
+
+INPUT = "input"
+CALL = "call"
+GATHER = "gather"
+
+# Guards the first acquisition of a graph's executor, when several threads call the graph at once
+_executor_lock = threading.Lock()
+
+
+class Node:
+    """A step of a compiled chain.
+
+    Attributes:
+        index (int): The position of the node in the plan; nodes only depend on earlier ones.
+        kind (str): "input" for the chain inputs, "call" for an Operator and "gather" for the
+            list of results a Parallel block returns.
+        operation (Operator): The operator of a "call" node.
+        inputs (tuple of int): The nodes whose outputs this node consumes.
+        isolation (tuple of str): The isolation policies applied, in order, to the inputs of a node
+            that starts a Parallel branch.
+    """
+
+    def __init__(self, index, kind, operation=None, inputs=(), isolation=()):
+        self.index = index
+        self.kind = kind
+        self.operation = operation
+        self.inputs = tuple(inputs)
+        self.isolation = tuple(isolation)
+
+    @property
+    def label(self):
+        """str: A readable name for the node."""
+        return self.operation.name if self.kind == CALL else self.kind
+
+    def __repr__(self):
+        inputs = ", ".join(f"n{i}" for i in self.inputs)
+        isolation = f" [{', '.join(self.isolation)}]" if self.isolation else ""
+        return f"n{self.index} = {self.label}({inputs}){isolation}"
+
+
+class ChainGraph:
+    """A chain of Sequential and Parallel blocks flattened into a DAG of Operator nodes.
+
+    Calling the graph runs every node as soon as the nodes it depends on have finished,
+    instead of interpreting the nested blocks level by level, so independent sub-chains
+    overlap and a slow branch only delays the nodes that actually consume its output.
+    The result is the same as calling the original chain.
+
+    The plan can be inspected through `nodes`, `edges` and `str(graph)`.
+    """
+
+    def __init__(self, nodes, output, executor="thread", max_workers=None, timeout=None):
+        """Initialize the graph. Use `compile_chain` to build one from a chain.
+
+        Args:
+            nodes (list of Node): The nodes, in topological order, the first one being the input node.
+            output (int): The node whose output is the result of the chain.
+            executor (str, Executor, optional): Where the nodes run, see `get_executor`. Defaults to "thread".
+                Thread and process pools are shared with other users of the same kind and size, see `close`.
+            max_workers (int, optional): The pool size for "thread" and "process".
+            timeout (float, optional): The number of seconds a whole run may take before a TimeoutError is raised.
+        """
+        self.nodes = nodes
+        self.output = output
+        self.executor = executor
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = None
+        self._release = None
+
+        self._dependents = [[] for _ in nodes]
+        for node in nodes:
+            for i in node.inputs:
+                self._dependents[i].append(node.index)
+
+    @property
+    def edges(self):
+        """list of tuple: The `(source, target)` node index pairs of the graph."""
+        return [(i, node.index) for node in self.nodes for i in node.inputs]
+
+    def depth(self):
+        """Return the number of nodes on the longest path, i.e. the steps of the critical path.
+
+        Returns:
+            int: The depth of the output node, not counting the input node.
+        """
+        depths = [0] * len(self.nodes)
+        for node in self.nodes[1:]:
+            depths[node.index] = max((depths[i] for i in node.inputs), default=0) + (node.kind == CALL)
+        return depths[self.output]
+
+    def __str__(self):
+        return "\n".join([repr(node) for node in self.nodes] + [f"return n{self.output}"])
+
+    @traced
+    def __call__(self, *args, **kwargs):
+        """Run the graph on the given inputs.
+
+        Returns:
+            The output of the chain.
+
+        Raises:
+            TimeoutError: If the run did not finish within `timeout`.
+        """
+        if self._executor is None:
+            with _executor_lock:
+                if self._executor is None:
+                    executor = acquire_executor(self.executor, self.max_workers)
+                    # Released by `close`, or when the graph is garbage collected
+                    self._release = weakref.finalize(self, release_executor, executor)
+                    self._executor = executor
+        executor = _reentrant(self._executor)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+
+        values = {}
+        waiting = [len(node.inputs) for node in self.nodes]
+        running = {}
+        ready = [node.index for node in self.nodes[1:] if not node.inputs]
+        # Only nodes whose every input is the chain input start right away
+        self._finish(0, (args, kwargs), values, waiting, ready)
+
+        try:
+            while ready or running:
+                while ready:
+                    node = self.nodes[ready.pop()]
+                    if node.kind == GATHER:
+                        # A branch reading the chain input directly (an empty Sequential) passes the arguments on
+                        gathered = [args if i == 0 else values[i] for i in node.inputs]
+                        self._finish(node.index, gathered, values, waiting, ready)
+                    else:
+                        running[executor.submit(bind(self._run), node, values[node.inputs[0]])] = node.index
+
+                if not running:
+                    break
+                remaining = None if deadline is None else max(0, deadline - time.monotonic())
+                done, _ = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+                if not done:
+                    raise TimeoutError(f"Chain did not finish within {self.timeout}s")
+                for future in done:
+                    self._finish(running.pop(future), future.result(), values, waiting, ready)
+        except BaseException:
+            _cancel(running)
+            raise
+
+        return args if self.output == 0 else values[self.output]
+
+    def _finish(self, index, value, values, waiting, ready):
+        values[index] = value
+        for dependent in self._dependents[index]:
+            waiting[dependent] -= 1
+            if not waiting[dependent]:
+                ready.append(dependent)
+
+    def _run(self, node, value):
+        # The input node holds (args, kwargs); any other output is splatted like Sequential does
+        if node.inputs[0] == 0:
+            args, kwargs = value
+        else:
+            args, kwargs = (value if isinstance(value, tuple) else (value,)), {}
+        for policy in node.isolation:
+            args, kwargs = isolate(args, kwargs, policy, 1)[0]
+        return node.operation(*args, **kwargs)
+
+    def close(self):
+        """Release the executor of the graph.
+
+        Pools created from an executor name are shared and shut down once nothing uses them
+        anymore; executor instances passed in are left to their owner. The graph can still
+        be called afterwards, which acquires a pool again.
+        """
+        with _executor_lock:
+            if self._release is not None:
+                self._release()
+            self._executor = self._release = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_executor"] = state["_release"] = None
+        return state
+
+
+def compile_chain(chain, executor="thread", max_workers=None, timeout=None):
+    """Flatten a chain of Sequential and Parallel blocks into a `ChainGraph`.
+
+    Args:
+        chain (Operator, Sequential, Parallel): The chain to compile.
+        executor (str, Executor, optional): Where the nodes run, see `get_executor`. Defaults to "thread".
+        max_workers (int, optional): The pool size for "thread" and "process".
+        timeout (float, optional): The number of seconds a whole run may take.
+
+    Returns:
+        ChainGraph: The compiled graph.
+
+    Raises:
+        ValueError: If the chain contains something other than Operators, Sequential and Parallel blocks.
+    """
+    nodes = [Node(0, INPUT)]
+
+    def add(kind, operation=None, inputs=(), isolation=()):
+        nodes.append(Node(len(nodes), kind, operation, inputs, isolation))
+        return len(nodes) - 1
+
+    def visit(operation, source, isolation):
+        if isinstance(operation, Sequential):
+            for step in operation.operations:
+                source = visit(step, source, isolation)
+                # Only the first step of a branch receives the branch inputs
+                isolation = ()
+            return source
+        if isinstance(operation, Parallel):
+            policies = isolation + (operation.isolation,)
+            return add(GATHER, inputs=[visit(branch, source, policies) for branch in operation.operations])
+        if isinstance(operation, Operator):
+            return add(CALL, operation, [source], isolation)
+        raise ValueError(f"{type(operation)} cannot be compiled. Chains can only hold Operators, Sequential and Parallel blocks")
+
+    output = visit(chain, 0, ())
+    return ChainGraph(nodes, output, executor=executor, max_workers=max_workers, timeout=timeout)
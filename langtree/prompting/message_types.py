@@ -1,49 +1,144 @@
+import copy
+import sys
 
-from langtree.utils.data import Data
+__all__ = ["ChatMessage", "SystemMessage", "AssistantMessage", "UserMessage", "FunctionMessage", "to_wire"]
 
-class ChatMessage(Data):
-    """A generic chat message with attributes role and content."""
-    role = None
-    content = None
+
+# Field values that can never change, so a message holding only these is safe to share
+_ATOMIC_TYPES = (str, bytes, int, float, complex, bool, type(None))
+
+
+def _immutable(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is immutable, call it with the new values to get an updated copy")
+
+
+class ChatMessage(dict):
+    """A generic chat message with attributes role and content.
+
+    Messages are the `{"role": ..., "content": ...}` dicts providers expect, so they can
+    be passed to any SDK call or `json.dumps` as they are. They are immutable and have
+    no instance `__dict__`. Calling a message with new values returns an updated copy and
+    leaves the message itself unchanged; messages used to be `Data` dicts, which the call
+    updated in place. Since they never change, `copy.copy` returns the message itself, and
+    so does `copy.deepcopy` unless a field holds a mutable value, e.g. the list of parts
+    of a multimodal message, which is then deep-copied into a new message.
+    """
+    __slots__ = ()
+    _fields = ("role", "content")
 
     def __init__(self, role=None, content=None):
-        super(ChatMessage, self).__init__(role=role, content=content)
-        self.content = content
+        # Long histories repeat the same few roles, so share one string per role
+        dict.__init__(self, role=sys.intern(role) if isinstance(role, str) else role, content=content)
+
+    role = property(lambda self: dict.__getitem__(self, "role"))
+    content = property(lambda self: dict.__getitem__(self, "content"))
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable, call it with the new values to get an updated copy")
+
+    __delattr__ = __setattr__
+
+    def __hash__(self):
+        try:
+            return hash(frozenset(self.items()))
+        except TypeError:
+            # Unhashable content, e.g. the parts of a multimodal message: equal messages still share the role
+            return hash(self.role)
+
+    def __call__(self, **kwargs):
+        """Return a copy of the message with some fields replaced. The message itself is not updated.
+
+        Raises:
+            KeyError: If a field is not one of the message's.
+        """
+        if not set(kwargs).issubset(self._fields):
+            raise KeyError("Attempting to update with a key that wasn't provided upon instantiation.")
+        return self._replace(kwargs)
+
+    def _replace(self, fields):
+        return ChatMessage(**{"role": self.role, "content": self.content, **fields})
+
+    def to_dict(self):
+        """Return the message as a plain, mutable dict."""
+        return dict(self)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        if all(isinstance(value, _ATOMIC_TYPES) for value in dict.values(self)):
+            return self
+        return self._replace({key: copy.deepcopy(value, memo) for key, value in self.items()})
+
+    def __reduce__(self):
+        return ChatMessage, (self.role, self.content)
 
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{key}={value!r}' for key, value in self.items())})"
 
-class SystemMessage(ChatMessage):
+
+class _RoleMessage(ChatMessage):
+    """A message whose role is fixed by its class, so it only takes the content."""
+    __slots__ = ()
+
+    def __init__(self, content=None):
+        dict.__init__(self, role=self.role, content=content)
+
+    def _replace(self, fields):
+        if fields.get("role", self.role) != self.role:
+            return super()._replace(fields)
+        return type(self)(fields.get("content", self.content))
+
+    def __reduce__(self):
+        return type(self), (self.content,)
+
+
+class SystemMessage(_RoleMessage):
     """A system message with predefined role as "system" and an attribute content."""
+    __slots__ = ()
     role = "system"
-    content = None
 
-    def __init__(self, content=None):
-        super(SystemMessage, self).__init__(role=SystemMessage.role, content=content)
-        self.content = content
 
-class AssistantMessage(ChatMessage):
+class AssistantMessage(_RoleMessage):
     """An assistant message with predefined role as "assistant" and an attribute content."""
+    __slots__ = ()
     role = "assistant"
-    content = None
 
-    def __init__(self, content=None):
-        super(AssistantMessage, self).__init__(role=AssistantMessage.role, content=content)
-        self.content = content
 
-class UserMessage(ChatMessage):
+class UserMessage(_RoleMessage):
     """A user message with predefined role as "user" and an attribute content."""
+    __slots__ = ()
     role = "user"
-    content = None
 
-    def __init__(self, content=None):
-        super(UserMessage, self).__init__(role=UserMessage.role, content=content)
-        self.content = content
 
 class FunctionMessage(ChatMessage):
-    """A function message with attributes role, content, and name. 
-    The role is predefined as "function"."""
+    """A function message with attributes role, content, and name.
+    The role is predefined as "function" and name is the function that produced the content."""
+    __slots__ = ()
+    _fields = ("role", "name", "content")
     role = "function"
-    name = None
+    name = property(lambda self: dict.__getitem__(self, "name"))
 
-    def __init__(self, content=None):
-        super(FunctionMessage, self).__init__(role=FunctionMessage.role, content=content)
-        self.content = content
+    def __init__(self, content=None, name=None):
+        dict.__init__(self, role=self.role, name=name, content=content)
+
+    def _replace(self, fields):
+        return FunctionMessage(fields.get("content", self.content), fields.get("name", self.name))
+
+    def __reduce__(self):
+        return FunctionMessage, (self.content, self.name)
+
+
+def to_wire(messages):
+    """Convert a list of messages to plain dicts, for clients that only accept `dict` itself.
+
+    Args:
+        messages (list): Messages and/or dicts.
+
+    Returns:
+        list of dict: One dict per message; plain dicts are passed through.
+    """
+    return [dict(message) if isinstance(message, ChatMessage) else message for message in messages]
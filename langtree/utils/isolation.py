@@ -0,0 +1,336 @@
+import copy
+from collections import defaultdict
+
+from langtree.prompting.message_types import ChatMessage
+
+__all__ = ["ISOLATION_POLICIES", "ReadOnlyList", "ReadOnlyDict", "CopyOnWriteList", "CopyOnWriteDict",
+           "readonly", "copy_on_write", "isolate"]
+
+ISOLATION_POLICIES = ("deepcopy", "shared", "copy-on-write")
+
+# Values of these types can be handed to any number of branches without copying
+IMMUTABLE_TYPES = (str, bytes, int, float, complex, bool, type(None), frozenset, range)
+
+_subclasses = {}
+
+
+def _immutable(value):
+    """Tell whether `value` can be shared by every branch, including chat messages whose fields are immutable."""
+    if isinstance(value, ChatMessage):
+        return all(isinstance(field, IMMUTABLE_TYPES) for field in dict.values(value))
+    return isinstance(value, IMMUTABLE_TYPES)
+
+
+def _subclass(mixin, cls):
+    """Return (and cache) a subclass of `cls` that layers `mixin` on top of it.
+
+    This keeps the original type visible to `isinstance`, e.g. a read-only
+    `Data` is still a `Data`.
+    """
+    if issubclass(cls, mixin):
+        return cls
+    if cls is mixin.__mro__[1]:
+        return mixin
+    key = (mixin, cls)
+    if key not in _subclasses:
+        name = mixin.__name__.replace("List", "").replace("Dict", "") + cls.__name__
+        _subclasses[key] = type(name, (mixin, cls), {"__module__": cls.__module__, "_isolated": True})
+    return _subclasses[key]
+
+
+def _base(obj, mixin):
+    """Return the type an isolated container was built from."""
+    cls = type(obj)
+    if cls is mixin:
+        return cls.__mro__[1]
+    return cls.__mro__[cls.__mro__.index(mixin) + 1]
+
+
+def _fill(obj, items):
+    """Fill a container created without calling its __init__.
+
+    Items are stored through the `__setitem__` of the container's original type, so types
+    that keep their own bookkeeping (e.g. the order of an `OrderedDict`) stay consistent,
+    while the read-only mixins, which refuse `__setitem__`, are bypassed.
+    """
+    if not isinstance(obj, dict):
+        list.extend(obj, items)
+        return
+    setitem = next(base for base in type(obj).__mro__ if base not in _MIXINS and not base.__dict__.get("_isolated")
+                   ).__setitem__
+    if setitem is dict.__setitem__:
+        dict.update(obj, items)
+    else:
+        for key, item in (items.items() if isinstance(items, dict) else items):
+            setitem(obj, key, item)
+
+
+def _set_attributes(obj, attributes):
+    if isinstance(obj, defaultdict):
+        obj.default_factory = attributes.pop("default_factory", None)
+    if attributes:
+        obj.__dict__.update(attributes)
+
+
+def _build(cls, value, items):
+    """Create an instance of `cls` without calling its __init__, copying the attributes of `value`."""
+    obj = cls.__new__(cls)
+    _fill(obj, items)
+    _set_attributes(obj, _attributes(value))
+    return obj
+
+
+def _restore(mixin, cls, items, attributes):
+    """Unpickle an isolated container, rebuilding its dynamic subclass when needed."""
+    if mixin is not None:
+        cls = _subclass(mixin, cls)
+    obj = cls.__new__(cls)
+    _fill(obj, items)
+    _set_attributes(obj, dict(attributes))
+    return obj
+
+
+def _attributes(obj):
+    """Return the attributes an isolated version of `obj` must carry over, e.g. a defaultdict's factory."""
+    attributes = dict(getattr(obj, "__dict__", {}))
+    attributes.pop("_borrowed", None)
+    if isinstance(obj, defaultdict):
+        attributes["default_factory"] = obj.default_factory
+    return attributes
+
+
+def _readonly_error(self, *args, **kwargs):
+    raise TypeError(f"'{type(self).__name__}' is a read-only view shared between parallel branches. Copy it before mutating.")
+
+
+class ReadOnlyList(list):
+    """A list that refuses every in-place mutation."""
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly_error
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly_error
+
+    def __reduce__(self):
+        return _restore, (ReadOnlyList, _base(self, ReadOnlyList), list(self), _attributes(self))
+
+
+class ReadOnlyDict(dict):
+    """A dict that refuses every in-place mutation."""
+    __setitem__ = __delitem__ = __ior__ = _readonly_error
+    clear = pop = popitem = setdefault = update = _readonly_error
+
+    def __reduce__(self):
+        return _restore, (ReadOnlyDict, _base(self, ReadOnlyDict), dict(self), _attributes(self))
+
+
+def readonly(value):
+    """Return a deeply read-only version of `value` that can be shared between branches.
+
+    Lists and dicts (including subclasses such as `Data`) are rebuilt once as
+    read-only subclasses of their own type, tuples and sets are frozen recursively
+    and immutable values are returned as-is. Chat messages with mutable content get
+    read-only content instead. Any other
+    object is shared unchanged and must be treated as read-only by the caller.
+
+    Args:
+        value: The value to make read-only.
+
+    Returns:
+        A read-only equivalent of `value`.
+    """
+    if _immutable(value) or isinstance(value, (ReadOnlyList, ReadOnlyDict)):
+        return value
+    if isinstance(value, ChatMessage):
+        return value._replace({key: readonly(field) for key, field in value.items()})
+    if isinstance(value, dict):
+        return _build(_subclass(ReadOnlyDict, type(value)), value, ((k, readonly(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return _build(_subclass(ReadOnlyList, type(value)), value, (readonly(v) for v in value))
+    if type(value) is tuple:
+        return tuple(readonly(v) for v in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def _borrow(items):
+    """Map the id of every container borrowed from the source to `[container, private copy or None]`.
+
+    The containers are held, so their ids cannot be reused while the branch runs, and a
+    container reached twice (e.g. the same list under two keys) gets the same copy.
+    """
+    return {id(item): [item, None] for item in items if not _immutable(item)}
+
+
+def _private(container, item):
+    """Return the branch's own version of an item read from `container`.
+
+    Only items still borrowed from the source are copied; anything the branch stored
+    itself is returned as is, so assigning then mutating an object keeps the alias.
+    """
+    borrowed = container.__dict__.get("_borrowed")
+    entry = borrowed.get(id(item)) if borrowed else None
+    if entry is None or entry[0] is not item:
+        return item
+    if entry[1] is None:
+        entry[1] = copy_on_write(item)
+    return entry[1]
+
+
+class CopyOnWriteList(list):
+    """A private shallow copy of a list whose nested containers are copied only once they are reached.
+
+    Reading an element still borrowed from the source replaces it with a copy-on-write
+    version first, so mutations never reach the list this was copied from. Copying
+    `list(view)`, `[*view]` or a slice goes through the same reads.
+    """
+
+    def _own(self, index):
+        item = list.__getitem__(self, index)
+        owned = _private(self, item)
+        if owned is not item:
+            list.__setitem__(self, index, owned)
+        return owned
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._own(i) for i in range(*index.indices(len(self)))]
+        return self._own(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._own(i)
+
+    def __reversed__(self):
+        for i in reversed(range(len(self))):
+            yield self._own(i)
+
+    def __add__(self, other):
+        return list(self) + other
+
+    def pop(self, index=-1):
+        self._own(index)
+        return list.pop(self, index)
+
+    def copy(self):
+        return list(self)
+
+    def __reduce__(self):
+        return _restore, (None, _base(self, CopyOnWriteList), list(self), _attributes(self))
+
+
+class CopyOnWriteDict(dict):
+    """A private shallow copy of a dict whose nested containers are copied only once they are reached.
+
+    Defining `__iter__` turns off CPython's dict-to-dict fast path, so `dict(view)`,
+    `{**view}` and `f(**view)` read every value through `__getitem__` as well.
+    """
+
+    def _own(self, key):
+        value = dict.__getitem__(self, key)
+        owned = _private(self, value)
+        if owned is not value:
+            dict.__setitem__(self, key, owned)
+        return owned
+
+    def __getitem__(self, key):
+        return self._own(key)
+
+    def __iter__(self):
+        return dict.__iter__(self)
+
+    def get(self, key, default=None):
+        return self._own(key) if key in self else default
+
+    def values(self):
+        return [self._own(key) for key in self]
+
+    def items(self):
+        return [(key, self._own(key)) for key in self]
+
+    def pop(self, key, *default):
+        if key in self:
+            self._own(key)
+        return super().pop(key, *default)
+
+    def popitem(self):
+        key = next(reversed(self.keys()))
+        return key, self.pop(key)
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self._own(key)
+        dict.__setitem__(self, key, default)
+        return default
+
+    def __or__(self, other):
+        return dict(self.items()) | other
+
+    def copy(self):
+        return dict(self.items())
+
+    def __reduce__(self):
+        return _restore, (None, _base(self, CopyOnWriteDict), dict(self.items()), _attributes(self))
+
+
+_MIXINS = (ReadOnlyList, ReadOnlyDict, CopyOnWriteList, CopyOnWriteDict)
+
+
+def copy_on_write(value):
+    """Return a private version of `value` that only copies the parts a branch actually reaches.
+
+    Lists and dicts (including subclasses) get a shallow copy of their own level;
+    nested containers are copied lazily the first time they are read. Immutable
+    values are shared, and any other object falls back to `copy.deepcopy`.
+
+    Args:
+        value: The value to isolate.
+
+    Returns:
+        A copy-on-write equivalent of `value`.
+    """
+    if _immutable(value) or isinstance(value, (ReadOnlyList, ReadOnlyDict)):
+        return value
+    if isinstance(value, ChatMessage):
+        return value._replace({key: copy_on_write(field) for key, field in value.items()})
+    if isinstance(value, dict):
+        view = _build(_subclass(CopyOnWriteDict, _plain(value, CopyOnWriteDict)), value, dict.items(value))
+        view._borrowed = _borrow(dict.values(view))
+        return view
+    if isinstance(value, list):
+        view = _build(_subclass(CopyOnWriteList, _plain(value, CopyOnWriteList)), value, list.__iter__(value))
+        view._borrowed = _borrow(list.__iter__(view))
+        return view
+    if type(value) is tuple:
+        return tuple(copy_on_write(v) for v in value)
+    return copy.deepcopy(value)
+
+
+def _plain(value, mixin):
+    return _base(value, mixin) if isinstance(value, mixin) else type(value)
+
+
+def isolate(args, kwargs, policy, copies):
+    """Prepare the inputs of `copies` parallel branches under an isolation policy.
+
+    Args:
+        args (tuple): The positional arguments passed to the parallel block.
+        kwargs (dict): The keyword arguments passed to the parallel block.
+        policy (str): "deepcopy" copies everything for every branch, "shared" hands
+            every branch the same read-only view, and "copy-on-write" gives each
+            branch a lazily copied version of the inputs.
+        copies (int): The number of branches.
+
+    Returns:
+        list of tuple: One (args, kwargs) pair per branch.
+
+    Raises:
+        ValueError: If the policy is unknown.
+    """
+    if policy == "deepcopy":
+        return [(copy.deepcopy(args), copy.deepcopy(kwargs)) for _ in range(copies)]
+    if policy == "shared":
+        shared = (readonly(args), {key: readonly(value) for key, value in kwargs.items()})
+        return [shared] * copies
+    if policy == "copy-on-write":
+        return [(copy_on_write(args), {key: copy_on_write(value) for key, value in kwargs.items()})
+                for _ in range(copies)]
+    raise ValueError(f"Unknown isolation policy '{policy}'. Expected one of {ISOLATION_POLICIES}")
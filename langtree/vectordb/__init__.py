@@ -0,0 +1,23 @@
+import importlib
+
+# The backends need NumPy, so a backend module is only imported when one of its names is first used
+_EXPORTS = {
+    "MetadataIndex": "langtree.vectordb.filters",
+    "MemoryVectorDatabase": "langtree.vectordb.memory",
+    "IVFVectorDatabase": "langtree.vectordb.ivf",
+    "kmeans": "langtree.vectordb.ivf",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
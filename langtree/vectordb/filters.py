@@ -0,0 +1,172 @@
+import bisect
+from collections.abc import Mapping
+from operator import itemgetter
+
+import numpy as np
+
+__all__ = ["MetadataIndex"]
+
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+
+
+class MetadataIndex:
+    """Per-field inverted indexes over dict metadata, maintained as rows are inserted.
+
+    Every field maps each of its values to the ids of the rows holding it (list values
+    are indexed element by element), so a filter is answered from the index instead of
+    by scanning the metadata. Range operators binary-search a sorted copy of the field's
+    values, one per kind of value (numbers, strings, ...), rebuilt after inserts.
+
+    Filters are dicts combined with AND, in the style of MongoDB:
+
+        {"tenant": "acme", "lang": {"$in": ["en", "fr"]}, "year": {"$gte": 2020, "$lt": 2024}}
+
+    Booleans are kept apart from numbers: `{"flag": 1}` does not match `True`.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._fields = {}
+        self._ordered = {}
+        self._sorted = {}
+
+    def add(self, start, metadata):
+        """Index the metadata of consecutive rows.
+
+        Args:
+            start (int): The id of the first row.
+            metadata (list): The metadata of each row. Entries that are not mappings are not indexed.
+        """
+        for row, entry in enumerate(metadata, start):
+            if not isinstance(entry, Mapping):
+                continue
+            for field, value in entry.items():
+                values = value if isinstance(value, (list, tuple, set, frozenset)) else (value,)
+                for value in values:
+                    try:
+                        self._fields.setdefault(field, {}).setdefault(_key(value), []).append(row)
+                    except TypeError:
+                        # Unhashable values cannot be matched by equality, so they are not indexed
+                        continue
+                    if value == value:  # NaN is never within a range
+                        self._ordered.setdefault((field, _kind(value)), []).append((value, row))
+                        self._sorted.pop((field, _kind(value)), None)
+
+    def ids(self, field, value):
+        """Return the ids of the rows whose `field` holds `value`.
+
+        Args:
+            field (str): The metadata field.
+            value: The value to look up.
+
+        Returns:
+            numpy.ndarray: The matching row ids, in insertion order.
+        """
+        try:
+            rows = self._fields.get(field, {}).get(_key(value), ())
+        except TypeError:
+            rows = ()
+        return np.asarray(rows, dtype=np.int64)
+
+    def range(self, field, bounds):
+        """Return the ids of the rows whose `field` holds a value within all `bounds`.
+
+        Args:
+            field (str): The metadata field.
+            bounds (dict): Maps range operators ("$gt", "$gte", "$lt", "$lte") to their bound.
+
+        Returns:
+            numpy.ndarray: The matching row ids, ordered by value.
+        """
+        kinds = {_kind(bound) for bound in bounds.values()}
+        if len(kinds) != 1:
+            # Values of one kind cannot be compared with bounds of another (e.g. strings against numbers)
+            return np.empty(0, dtype=np.int64)
+        values, rows = self._sorted_values(field, kinds.pop())
+
+        low, high = 0, len(values)
+        try:
+            for operator, bound in bounds.items():
+                if operator == "$gt":
+                    low = max(low, bisect.bisect_right(values, bound))
+                elif operator == "$gte":
+                    low = max(low, bisect.bisect_left(values, bound))
+                elif operator == "$lt":
+                    high = min(high, bisect.bisect_left(values, bound))
+                else:
+                    high = min(high, bisect.bisect_right(values, bound))
+        except TypeError:
+            return np.empty(0, dtype=np.int64)
+        return rows[low:max(low, high)]
+
+    def _sorted_values(self, field, kind):
+        key = (field, kind)
+        if key not in self._sorted:
+            pairs = self._ordered.get(key, [])
+            try:
+                pairs.sort(key=itemgetter(0))
+            except TypeError:
+                # Values of this kind have no order (e.g. dicts turned into frozensets), so no range matches them
+                pairs = []
+            self._sorted[key] = ([value for value, _ in pairs], np.asarray([row for _, row in pairs], dtype=np.int64))
+        return self._sorted[key]
+
+    def mask(self, filter, size):
+        """Evaluate a filter into a boolean mask over the rows.
+
+        Args:
+            filter (dict): The filter, see the class docstring.
+            size (int): The number of rows in the database.
+
+        Returns:
+            numpy.ndarray: A boolean array with True for every matching row.
+
+        Raises:
+            ValueError: If the filter uses an unknown operator, or `$in` with something other than a list.
+        """
+        mask = np.ones(size, dtype=bool)
+        for field, condition in filter.items():
+            mask &= self._field_mask(field, condition, size)
+        return mask
+
+    def _field_mask(self, field, condition, size):
+        if not isinstance(condition, Mapping):
+            condition = {"$eq": condition}
+
+        mask = np.ones(size, dtype=bool)
+        bounds = {}
+        for operator, operand in condition.items():
+            if operator == "$eq":
+                mask &= self._union(field, [operand], size)
+            elif operator == "$in":
+                if not isinstance(operand, (list, tuple, set, frozenset)):
+                    raise ValueError(f"Filter operator '$in' expects a list of values, got {type(operand).__name__}")
+                mask &= self._union(field, operand, size)
+            elif operator in RANGE_OPERATORS:
+                bounds[operator] = operand
+            else:
+                raise ValueError(f"Unknown filter operator '{operator}'. Expected $eq, $in, {', '.join(RANGE_OPERATORS)}")
+
+        if bounds:
+            in_range = np.zeros(size, dtype=bool)
+            in_range[self.range(field, bounds)] = True
+            mask &= in_range
+        return mask
+
+    def _union(self, field, values, size):
+        mask = np.zeros(size, dtype=bool)
+        for value in values:
+            mask[self.ids(field, value)] = True
+        return mask
+
+
+def _key(value):
+    """Return the key `value` is indexed under, so that True and 1 (which hash alike) stay apart."""
+    return (type(value) is bool, value)
+
+
+def _kind(value):
+    """Return the group of values `value` is sorted with: numbers together, anything else by type."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return "number"
+    return type(value)
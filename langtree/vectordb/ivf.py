@@ -0,0 +1,283 @@
+import os
+
+import numpy as np
+
+from langtree.vectordb.memory import MemoryVectorDatabase
+from langtree.vectordb.persistence import save_array
+from langtree.vectordb.utils import select_top_k, similarity
+
+__all__ = ["IVFVectorDatabase", "kmeans"]
+
+
+def kmeans(vectors, k, metric="l2", iterations=10, seed=0):
+    """Cluster vectors with Lloyd's algorithm.
+
+    Args:
+        vectors (numpy.ndarray): The `(n, dim)` float32 matrix to cluster.
+        k (int): The number of clusters.
+        metric (str, optional): The metric used to assign vectors to centroids. With "cosine",
+            centroids are re-normalized after every step (spherical k-means). Defaults to "l2".
+        iterations (int, optional): The number of refinement steps. Defaults to 10.
+        seed (int, optional): The seed of the k-means++ initialization. Defaults to 0.
+
+    Returns:
+        numpy.ndarray: The `(k, dim)` centroids.
+
+    Raises:
+        ValueError: If there are no vectors to cluster.
+    """
+    if len(vectors) == 0:
+        raise ValueError("Cannot cluster an empty set of vectors")
+    rng = np.random.default_rng(seed)
+    k = min(k, len(vectors))
+
+    # k-means++ seeding: each new centroid is drawn proportionally to its squared distance to the
+    # closest one. It runs on a subsample, since it is sequential in k
+    seeds = vectors
+    if len(vectors) > 16 * k:
+        seeds = vectors[rng.choice(len(vectors), size=16 * k, replace=False)]
+    squared_norms = np.einsum("ij,ij->i", seeds, seeds)
+    centroids = np.empty((k, vectors.shape[1]), dtype=np.float32)
+    distances = np.full(len(seeds), np.inf)
+    for i in range(k):
+        total = distances.sum() if i else np.inf
+        if i == 0 or total == 0:
+            centroids[i] = seeds[rng.integers(len(seeds))]
+        else:
+            centroids[i] = seeds[rng.choice(len(seeds), p=distances / total)]
+        centroid = centroids[i]
+        np.minimum(distances, np.maximum(squared_norms - 2 * (seeds @ centroid) + centroid @ centroid, 0), out=distances)
+
+    for _ in range(iterations):
+        assignments = _nearest(vectors, centroids, metric)
+        counts = np.bincount(assignments, minlength=k)
+        order = np.argsort(assignments, kind="stable")
+        sums = np.zeros_like(centroids)
+        filled = np.flatnonzero(counts)
+        sums[filled] = np.add.reduceat(vectors[order], np.cumsum(counts)[filled] - counts[filled])
+
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, np.newaxis]
+        # Restart empty clusters from random points so every list stays useful
+        centroids[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+        if metric == "cosine":
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+    return centroids
+
+
+def _nearest(vectors, centroids, metric):
+    """Return the index of the closest centroid of every vector."""
+    scores = vectors @ centroids.T
+    if metric == "l2":
+        # |v - c|^2 = |v|^2 - 2 v.c + |c|^2, and |v|^2 does not change the argmin
+        scores -= 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    return scores.argmax(axis=1)
+
+
+class IVFVectorDatabase(MemoryVectorDatabase):
+    """An approximate vector index using an inverted file (IVF) with a k-means coarse quantizer.
+
+    Vectors are clustered into `nlist` inverted lists. A query only scores the
+    vectors of its `nprobe` closest lists, trading recall for speed. Until the
+    index is trained it answers exactly, like `MemoryVectorDatabase`; it trains
+    itself once `train_size` vectors have been inserted. After training, new
+    vectors are appended to their closest list without rebuilding anything.
+    """
+
+    def __init__(self, dim=None, metric="cosine", nlist=100, nprobe=8, train_size=None, capacity=1024):
+        """Initialize an empty index.
+
+        Args:
+            dim (int, optional): The dimensionality of the vectors. Inferred from the first insert when omitted.
+            metric (str, optional): "cosine", "dot" or "l2". Defaults to "cosine".
+            nlist (int, optional): The number of inverted lists (k-means clusters). Defaults to 100.
+            nprobe (int, optional): The number of lists scanned per query. Defaults to 8.
+            train_size (int, optional): The number of vectors after which the quantizer is trained
+                automatically. Defaults to 39 * nlist.
+            capacity (int, optional): The number of rows to allocate up front. Defaults to 1024.
+        """
+        super().__init__(dim=dim, metric=metric, capacity=capacity)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_size = 39 * nlist if train_size is None else train_size
+        self.centroids = None
+        self._lists = []
+        self._arrays = []
+        # `(start, lists)` pairs recording the list of every row, in row order, as they were assigned
+        self._assignments = []
+        # The manifest entry of the centroids and assignments last saved or loaded, None after training
+        self._saved_state = None
+
+    @property
+    def is_trained(self):
+        """bool: Whether the coarse quantizer has been trained."""
+        return self.centroids is not None
+
+    def train(self, iterations=10, sample_size=None, seed=0):
+        """Train the coarse quantizer on the stored vectors and (re)build the inverted lists.
+
+        Args:
+            iterations (int, optional): The number of k-means iterations. Defaults to 10.
+            sample_size (int, optional): The number of vectors k-means runs on. Defaults to 256 * nlist.
+            seed (int, optional): The random seed. Defaults to 0.
+
+        Raises:
+            ValueError: If the index is empty.
+        """
+        if len(self) == 0:
+            raise ValueError("Cannot train an empty IVF index. Insert vectors before calling train().")
+        vectors = self.vectors
+        sample_size = 256 * self.nlist if sample_size is None else sample_size
+        if len(vectors) > sample_size:
+            vectors = vectors[np.random.default_rng(seed).choice(len(vectors), size=sample_size, replace=False)]
+
+        self.centroids = kmeans(vectors, self.nlist, self._quantizer_metric(), iterations, seed)
+        self._lists = [[] for _ in range(len(self.centroids))]
+        self._arrays = [None] * len(self.centroids)
+        self._assignments = []
+        self._saved_state = None
+        self._assign(0, len(self))
+
+    def insert(self, vector, metadata=None, **kwargs):
+        """Insert a vector, or a batch of vectors, and append them to their closest inverted lists.
+
+        Args:
+            vector (Vectors): A single vector or a 2-D batch of vectors.
+            metadata (Any, optional): The metadata of the vector, or a sequence with one entry per row of a batch.
+            **kwargs: Unused, accepted for compatibility with other databases.
+        """
+        start = len(self)
+        super().insert(vector, metadata, **kwargs)
+
+        if self.is_trained:
+            self._assign(start, len(self))
+        elif len(self) >= self.train_size:
+            self.train()
+
+    def search(self, vector, top_k=10, nprobe=None, filter=None, **kwargs):
+        """Find approximately the closest stored vectors.
+
+        Args:
+            vector (Vectors): A single query vector or a 2-D batch of queries.
+            top_k (int, optional): The number of results per query. Defaults to 10.
+            nprobe (int, optional): Overrides the number of lists scanned for this search.
+            filter (dict, optional): Only consider rows whose metadata matches, see `MetadataIndex`.
+                When fewer rows match than the probed lists would hold, the matching rows are searched
+                exactly instead.
+            **kwargs: Unused, accepted for compatibility with other databases.
+
+        Returns:
+            tuple: `(ids, scores)` arrays of shape `(q, k)`, best match first. Rows are padded with
+            id -1 and score -inf when the probed lists hold fewer than `top_k` vectors.
+        """
+        if not self.is_trained:
+            return super().search(vector, top_k, filter=filter, **kwargs)
+
+        queries = self._queries(vector)
+        nprobe = min(self.nprobe if nprobe is None else nprobe, len(self.centroids))
+
+        allowed = None
+        if filter is not None:
+            matching = self.filter_ids(filter)
+            # A selective filter leaves fewer rows than the probes would scan, so score them all exactly
+            if len(matching) <= len(self) * nprobe / len(self.centroids):
+                return self._search_rows(queries, matching, top_k)
+            allowed = np.zeros(len(self), dtype=bool)
+            allowed[matching] = True
+        probes, _ = select_top_k(similarity(queries, self.centroids, self._quantizer_metric()), nprobe)
+
+        ids = np.full((len(queries), top_k), -1, dtype=np.int64)
+        scores = np.full((len(queries), top_k), -np.inf, dtype=np.float32)
+        for row, (query, lists) in enumerate(zip(queries, probes)):
+            candidates = np.concatenate([self._ids(i) for i in lists])
+            if allowed is not None:
+                candidates = candidates[allowed[candidates]]
+            if not len(candidates):
+                continue
+            vectors, norms = self._gather(candidates)
+            found, found_scores = select_top_k(similarity(query[np.newaxis], vectors, self.metric, norms), top_k)
+            ids[row, :found.shape[1]] = candidates[found[0]]
+            scores[row, :found.shape[1]] = found_scores[0]
+        return ids, scores
+
+    def _config(self):
+        return {**super()._config(), "nlist": self.nlist, "nprobe": self.nprobe, "train_size": self.train_size}
+
+    def _save_state(self, path, segments, previous):
+        """Save the centroids once per training and the assignments of each segment next to it.
+
+        Segments saved under the current centroids are left untouched, so appending only
+        writes the assignments of the new segment. After a retraining, every assignment is
+        written again under a new generation and the old files are dropped by `save_index`.
+        """
+        if not self.is_trained:
+            return None
+        if self._saved_state is not None and self._saved_state == previous:
+            state = {**previous, "assignments": list(previous["assignments"])}
+        else:
+            generation = 0 if previous is None else previous["generation"] + 1
+            state = {"generation": generation, "centroids": f"ivf-{generation:05d}.centroids.npy", "assignments": []}
+            save_array(os.path.join(path, state["centroids"]), self.centroids)
+
+        start = sum(segment["rows"] for segment in segments[:len(state["assignments"])])
+        for segment in segments[len(state["assignments"]):]:
+            name = f"ivf-{state['generation']:05d}.{segment['name']}.assignments.npy"
+            save_array(os.path.join(path, name), self._assigned(start, start + segment["rows"]))
+            state["assignments"].append(name)
+            start += segment["rows"]
+
+        self._saved_state = state
+        return state
+
+    def _load_state(self, path, segments, state):
+        if state is None:
+            return
+        self.centroids = np.load(os.path.join(path, state["centroids"]))
+        self._lists = [[] for _ in range(len(self.centroids))]
+        self._arrays = [None] * len(self.centroids)
+        start = 0
+        for name in state["assignments"]:
+            assignments = np.load(os.path.join(path, name))
+            self._assignments.append((start, assignments))
+            for i, ids in _group(assignments, start):
+                self._lists[i].extend(ids)
+            start += len(assignments)
+        self._saved_state = state
+
+    def _state_files(self, state):
+        return [] if state is None else [state["centroids"], *state["assignments"]]
+
+    def _quantizer_metric(self):
+        # Spherical k-means keeps cosine centroids on the same scale as the normalized queries
+        return "cosine" if self.metric == "cosine" else "l2"
+
+    def _assign(self, start, end):
+        """Append rows `start:end` to the inverted list of their closest centroid."""
+        if start == end:
+            return
+        vectors, _ = self._gather(np.arange(start, end))
+        assignments = _nearest(vectors, self.centroids, self._quantizer_metric()).astype(np.int32)
+        self._assignments.append((start, assignments))
+        for i, ids in _group(assignments, start):
+            self._lists[i].extend(ids)
+            self._arrays[i] = None
+
+    def _assigned(self, start, end):
+        """Return the lists of rows `start:end`."""
+        return np.concatenate([assignments[max(start - offset, 0):end - offset]
+                               for offset, assignments in self._assignments
+                               if offset < end and offset + len(assignments) > start])
+
+    def _ids(self, i):
+        if self._arrays[i] is None:
+            self._arrays[i] = np.asarray(self._lists[i], dtype=np.int64)
+        return self._arrays[i]
+
+
+def _group(assignments, offset):
+    """Yield `(list, row ids)` pairs for every list that received rows."""
+    order = np.argsort(assignments, kind="stable")
+    lists, starts = np.unique(assignments[order], return_index=True)
+    for i, ids in zip(lists.tolist(), np.split(order + offset, starts[1:])):
+        yield i, ids.tolist()
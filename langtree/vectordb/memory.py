@@ -0,0 +1,270 @@
+import numpy as np
+
+from langtree.core.vectordb import VectorDatabase
+from langtree.vectordb.filters import MetadataIndex
+from langtree.vectordb.persistence import load_index, save_index
+from langtree.vectordb.utils import as_matrix, check_metric, normalize_rows, select_top_k, similarity
+
+__all__ = ["MemoryVectorDatabase"]
+
+
+class MemoryVectorDatabase(VectorDatabase):
+    """An exact, in-process vector index backed by a growable contiguous NumPy matrix.
+
+    Vectors are stored as float32 rows next to a parallel list of metadata. Queries
+    are brute force: a whole batch of queries is scored with one matrix
+    multiplication and the top-k of each row is selected with `argpartition`.
+
+    An index opened with `load` keeps its saved rows in read-only, memory-mapped
+    segments; new rows go to an in-memory tail that the next `save` appends as a
+    new segment.
+    """
+
+    def __init__(self, dim=None, metric="cosine", capacity=1024):
+        """Initialize an empty index.
+
+        Args:
+            dim (int, optional): The dimensionality of the vectors. Inferred from the first insert when omitted.
+            metric (str, optional): "cosine", "dot" or "l2". Defaults to "cosine".
+            capacity (int, optional): The number of rows to allocate up front. Defaults to 1024.
+        """
+        check_metric(metric)
+        self.dim = dim
+        self.metric = metric
+        self.metadata = []
+        self._metadata_index = MetadataIndex()
+        self._capacity = capacity
+        self._vectors = None
+        self._squared_norms = None
+        self._size = 0
+        # Read-only (vectors, squared norms) blocks opened from disk, holding the first `_offset` rows
+        self._segments = []
+        self._offset = 0
+        # The directory and row count of the last save or load, used to append new segments
+        self._persisted = None
+
+    def __len__(self):
+        return self._offset + self._size
+
+    @property
+    def vectors(self):
+        """numpy.ndarray: The stored vectors (normalized when the metric is "cosine").
+
+        This is a view when the index is a single block, and a copy when it spans several segments.
+        """
+        blocks = [vectors for _, vectors, _ in self._blocks()]
+        if not blocks:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+
+    def insert(self, vector, metadata=None, **kwargs):
+        """Insert a vector, or a batch of vectors, with their metadata.
+
+        Args:
+            vector (Vectors): A single vector or a 2-D batch of vectors.
+            metadata (Any, optional): The metadata of the vector, or a sequence with one entry per row of a batch.
+            **kwargs: Unused, accepted for compatibility with other databases.
+
+        Raises:
+            ValueError: If the vectors have the wrong dimension or the metadata does not match the batch.
+        """
+        matrix, single = as_matrix(vector, self.dim)
+        if single:
+            metadata = [metadata]
+        elif metadata is None:
+            metadata = [None] * len(matrix)
+        elif len(metadata) != len(matrix):
+            raise ValueError(f"Got {len(metadata)} metadata entries for {len(matrix)} vectors")
+
+        if self.metric == "cosine":
+            matrix = normalize_rows(matrix)
+
+        start, end = self._size, self._size + len(matrix)
+        self._reserve(end, matrix.shape[1])
+        self._vectors[start:end] = matrix
+        if self.metric == "l2":
+            self._squared_norms[start:end] = np.einsum("ij,ij->i", matrix, matrix)
+        self._add_metadata(metadata)
+        self._size = end
+
+    def search(self, vector, top_k=10, filter=None, **kwargs):
+        """Find the closest stored vectors and return their row ids and scores.
+
+        Args:
+            vector (Vectors): A single query vector or a 2-D batch of queries.
+            top_k (int, optional): The number of results per query. Defaults to 10.
+            filter (dict, optional): Only consider rows whose metadata matches, e.g.
+                `{"tenant": "acme", "year": {"$gte": 2020}}`. See `MetadataIndex` for the operators.
+                Matching rows are found through inverted indexes and only they are scored, so the
+                top-k is exact within the filtered subset.
+            **kwargs: Unused, accepted for compatibility with other databases.
+
+        Returns:
+            tuple: `(ids, scores)` arrays of shape `(q, k)`, best match first. Higher scores are
+            closer; for "l2" the score is the negated squared distance.
+        """
+        queries = self._queries(vector)
+        if filter is not None:
+            return self._search_rows(queries, self.filter_ids(filter), top_k)
+
+        blocks = list(self._blocks())
+        if len(blocks) <= 1:
+            vectors = blocks[0][1] if blocks else np.empty((0, queries.shape[1]), dtype=np.float32)
+            norms = blocks[0][2] if blocks else None
+            return select_top_k(similarity(queries, vectors, self.metric, norms), top_k)
+
+        # Keep the best `top_k` of every block, then pick the overall best among them
+        all_ids, all_scores = [], []
+        for offset, vectors, norms in blocks:
+            ids, scores = select_top_k(similarity(queries, vectors, self.metric, norms), top_k)
+            all_ids.append(ids + offset)
+            all_scores.append(scores)
+        ids = np.concatenate(all_ids, axis=1)
+        best, best_scores = select_top_k(np.concatenate(all_scores, axis=1), top_k)
+        return np.take_along_axis(ids, best, axis=1), best_scores
+
+    def query(self, vector, top_k=10, **kwargs):
+        """Query the index for the `top_k` closest vectors.
+
+        Args:
+            vector (Vectors): A single query vector or a 2-D batch of queries.
+            top_k (int, optional): The number of results per query. Defaults to 10.
+            **kwargs: Forwarded to `search`, e.g. `nprobe` for an IVF index.
+
+        Returns:
+            list: The metadata of the matches, best first, or one such list per query of a batch.
+        """
+        ids, _ = self.search(vector, top_k, **kwargs)
+        results = [[self.metadata[i] for i in row if i >= 0] for row in ids.tolist()]
+        return results[0] if np.ndim(vector) == 1 else results
+
+    def filter_ids(self, filter):
+        """Return the ids of the rows whose metadata matches a filter.
+
+        Args:
+            filter (dict): The filter, see `MetadataIndex`.
+
+        Returns:
+            numpy.ndarray: The matching row ids, in ascending order.
+        """
+        return np.flatnonzero(self._metadata_index.mask(filter, len(self)))
+
+    def save(self, path):
+        """Persist the index to a directory, appending only the rows added since the last save.
+
+        Vectors are written as `.npy` segments that `load` memory-maps, metadata as a JSON
+        lines sidecar per segment, and a manifest ties them together. The manifest is replaced
+        atomically, so processes reading the index never see a half-written segment.
+
+        Args:
+            path (str): The index directory. It must be new, or the one this index was loaded from or saved to.
+
+        Raises:
+            FileExistsError: If the directory holds a different index.
+        """
+        save_index(self, path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Open an index saved with `save`.
+
+        With `mmap`, the saved vectors stay on disk as read-only memory maps, so any number of
+        processes can open the same index without copying it; the OS shares the pages.
+
+        Args:
+            path (str): The index directory.
+            mmap (bool, optional): Memory-map the vectors instead of reading them into memory. Defaults to True.
+
+        Returns:
+            MemoryVectorDatabase: The index, an instance of the class it was saved from.
+        """
+        db = load_index(path, mmap=mmap)
+        if not isinstance(db, cls):
+            raise TypeError(f"{path} holds a {type(db).__name__}, not a {cls.__name__}")
+        return db
+
+    def _config(self):
+        """The constructor arguments stored in the manifest."""
+        return {"dim": self.dim, "metric": self.metric}
+
+    def _save_state(self, path, segments, previous):
+        """Write index-specific files next to the segments and return their manifest entry.
+
+        `segments` are the manifest entries of every saved segment, including the one just
+        written, and `previous` is the entry this method returned at the last save.
+        """
+        return None
+
+    def _load_state(self, path, segments, state):
+        """Restore what `_save_state` wrote."""
+
+    def _state_files(self, state):
+        """The files a manifest entry returned by `_save_state` refers to."""
+        return []
+
+    def _queries(self, vector):
+        queries, _ = as_matrix(vector, self.dim or None)
+        if self.metric == "cosine":
+            queries = normalize_rows(queries)
+        return queries
+
+    def _add_metadata(self, metadata):
+        self._metadata_index.add(len(self.metadata), metadata)
+        self.metadata.extend(metadata)
+
+    def _search_rows(self, queries, ids, top_k):
+        """Score the queries against the given rows only."""
+        if not len(ids):
+            # Nothing matched, e.g. the index is still empty and has no storage to gather from
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+        vectors, norms = self._gather(ids)
+        found, scores = select_top_k(similarity(queries, vectors, self.metric, norms), top_k)
+        return ids[found], scores
+
+    def _blocks(self):
+        """Yield `(first row id, vectors, squared norms)` for every segment and the in-memory tail."""
+        offset = 0
+        for vectors, norms in self._segments:
+            yield offset, vectors, norms
+            offset += len(vectors)
+        if self._size:
+            norms = None if self._squared_norms is None else self._squared_norms[:self._size]
+            yield offset, self._vectors[:self._size], norms
+
+    def _gather(self, ids):
+        """Return the vectors (and squared norms, for "l2") of arbitrary row ids."""
+        if not self._segments:
+            norms = None if self._squared_norms is None else self._squared_norms[ids]
+            return self._vectors[ids], norms
+
+        vectors = np.empty((len(ids), self.dim), dtype=np.float32)
+        norms = np.empty(len(ids), dtype=np.float32) if self.metric == "l2" else None
+        for offset, block, block_norms in self._blocks():
+            mask = (ids >= offset) & (ids < offset + len(block))
+            vectors[mask] = block[ids[mask] - offset]
+            if norms is not None:
+                norms[mask] = block_norms[ids[mask] - offset]
+        return vectors, norms
+
+    def _reserve(self, size, dim):
+        """Grow the storage geometrically so that at least `size` rows fit."""
+        if self._vectors is None:
+            self.dim = dim
+            capacity = max(self._capacity, size)
+            self._vectors = np.empty((capacity, dim), dtype=np.float32)
+            if self.metric == "l2":
+                self._squared_norms = np.empty(capacity, dtype=np.float32)
+            return
+
+        if size <= len(self._vectors):
+            return
+
+        capacity = max(size, 2 * len(self._vectors))
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+        if self._squared_norms is not None:
+            norms = np.empty(capacity, dtype=np.float32)
+            norms[:self._size] = self._squared_norms[:self._size]
+            self._squared_norms = norms
+
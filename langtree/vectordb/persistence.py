@@ -0,0 +1,159 @@
+import json
+import os
+
+import numpy as np
+
+from langtree.core.registry import VECTOR_DATABASES
+
+__all__ = ["save_index", "load_index", "write_file", "save_array"]
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def read_manifest(path):
+    """Read the manifest of an index directory, or return None if there is none.
+
+    Args:
+        path (str): The index directory.
+
+    Returns:
+        dict: The manifest.
+    """
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_file(path, write, mode="w"):
+    """Write a file through a temporary file that then replaces it, so it is never seen half written.
+
+    Args:
+        path (str): The file to write.
+        write (callable): Takes the open temporary file and writes the content.
+        mode (str, optional): The mode the temporary file is opened with. Defaults to "w".
+    """
+    temporary = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}")
+    try:
+        with open(temporary, mode) as f:
+            write(f)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def save_array(path, array):
+    """Write an array to a `.npy` file with `write_file`."""
+    write_file(path, lambda f: np.save(f, array), "wb")
+
+
+def save_index(db, path):
+    """Persist a `MemoryVectorDatabase` (or subclass) to a directory.
+
+    Rows already saved in `path` by this index are left untouched; only the newer
+    rows are written, as a new segment. Nothing is written if the metadata of the new
+    rows cannot be serialized to JSON.
+
+    Args:
+        db (MemoryVectorDatabase): The index to save.
+        path (str): The index directory.
+
+    Raises:
+        ValueError: If the class of the index is not registered in `VECTOR_DATABASES`.
+        FileExistsError: If the directory holds a different index.
+    """
+    kind = VECTOR_DATABASES.find(type(db))
+    if kind is None:
+        raise ValueError(f"{type(db).__name__} is not registered in VECTOR_DATABASES, register it to save it")
+    path = os.path.abspath(path)
+    os.makedirs(path, exist_ok=True)
+
+    manifest = read_manifest(path)
+    if manifest is None:
+        manifest = {
+            "format": FORMAT_VERSION,
+            "class": kind,
+            "rows": 0,
+            "segments": [],
+        }
+    elif db._persisted != (path, manifest["rows"]):
+        raise FileExistsError(f"{path} already holds an index that was not loaded from or saved by this one")
+
+    start, end = manifest["rows"], len(db)
+    # Serialized up front so that unserializable metadata fails the save before anything is written
+    lines = "".join(json.dumps(metadata) + "\n" for metadata in db.metadata[start:end])
+    if end > start:
+        name = f"segment-{len(manifest['segments']):05d}"
+        vectors, norms = db._gather(np.arange(start, end))
+        save_array(os.path.join(path, f"{name}.vectors.npy"), vectors)
+        if norms is not None:
+            save_array(os.path.join(path, f"{name}.norms.npy"), norms)
+        write_file(os.path.join(path, f"{name}.metadata.jsonl"), lambda f: f.write(lines))
+        manifest["segments"].append({"name": name, "rows": end - start, "norms": norms is not None})
+
+    previous = manifest.get("state")
+    manifest["rows"] = end
+    manifest["config"] = db._config()
+    manifest["state"] = db._save_state(path, manifest["segments"], previous)
+
+    # Readers only ever follow the manifest, so replacing it atomically publishes the new segment
+    write_file(os.path.join(path, MANIFEST), lambda f: json.dump(manifest, f, indent=2))
+    db._persisted = (path, end)
+
+    # State files the new manifest no longer references, e.g. the assignments of a retrained index
+    for name in set(db._state_files(previous)) - set(db._state_files(manifest["state"])):
+        try:
+            os.remove(os.path.join(path, name))
+        except FileNotFoundError:
+            pass
+
+
+def load_index(path, mmap=True):
+    """Open an index saved with `save_index`.
+
+    Args:
+        path (str): The index directory.
+        mmap (bool, optional): Memory-map the vectors read-only instead of reading them. Defaults to True.
+
+    Returns:
+        MemoryVectorDatabase: The index, an instance of the class it was saved from.
+
+    The manifest names the class of the index by its `VECTOR_DATABASES` name, so opening a
+    directory only ever constructs a registered vector database, never an arbitrary class.
+
+    Raises:
+        FileNotFoundError: If the directory holds no index.
+        ValueError: If the index was written in an unsupported format or names an unknown class.
+        TypeError: If the class it names is not a `MemoryVectorDatabase`.
+    """
+    from langtree.vectordb.memory import MemoryVectorDatabase
+
+    path = os.path.abspath(path)
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"No vector index found in {path}")
+    if manifest["format"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported index format {manifest['format']}")
+
+    cls = VECTOR_DATABASES.get(manifest["class"])
+    if not (isinstance(cls, type) and issubclass(cls, MemoryVectorDatabase)):
+        raise TypeError(f"'{manifest['class']}' is not a MemoryVectorDatabase and cannot be loaded from {path}")
+    db = cls(**manifest["config"])
+
+    mmap_mode = "r" if mmap else None
+    for segment in manifest["segments"]:
+        prefix = os.path.join(path, segment["name"])
+        vectors = np.load(f"{prefix}.vectors.npy", mmap_mode=mmap_mode)
+        norms = np.load(f"{prefix}.norms.npy", mmap_mode=mmap_mode) if segment["norms"] else None
+        with open(f"{prefix}.metadata.jsonl") as f:
+            db._add_metadata([json.loads(line) for line in f])
+        db._segments.append((vectors, norms))
+        db._offset += len(vectors)
+
+    db._load_state(path, manifest["segments"], manifest.get("state"))
+    db._persisted = (path, manifest["rows"])
+    return db
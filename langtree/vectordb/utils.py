@@ -0,0 +1,109 @@
+import numpy as np
+
+METRICS = ("cosine", "dot", "l2")
+
+
+def as_matrix(vectors, dim=None):
+    """Convert a vector or a batch of vectors into a C-contiguous float32 matrix.
+
+    Float32 NumPy input is used as-is, without a copy.
+
+    Args:
+        vectors (Vectors): A single vector or a 2-D batch of vectors.
+        dim (int, optional): The expected dimensionality.
+
+    Returns:
+        tuple: The `(n, dim)` matrix and whether the input was a single vector.
+
+    Raises:
+        ValueError: If the input is not 1-D or 2-D, or does not match `dim`.
+    """
+    matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+    single = matrix.ndim == 1
+    if single:
+        matrix = matrix[np.newaxis]
+    if matrix.ndim != 2:
+        raise ValueError(f"Expected a vector or a 2-D batch of vectors, got an array with {matrix.ndim} dimensions")
+    if dim is not None and matrix.shape[1] != dim:
+        raise ValueError(f"Expected vectors of dimension {dim}, got {matrix.shape[1]}")
+    return matrix, single
+
+
+def normalize_rows(matrix):
+    """Scale every row of a matrix to unit L2 norm, leaving all-zero rows untouched.
+
+    Args:
+        matrix (numpy.ndarray): The `(n, dim)` matrix.
+
+    Returns:
+        numpy.ndarray: The normalized matrix.
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def check_metric(metric):
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric '{metric}'. Expected one of {METRICS}")
+
+
+def similarity(queries, vectors, metric, squared_norms=None):
+    """Score every query against every vector in a single matrix multiplication.
+
+    Higher is always better: for "l2" the negated squared distance is returned.
+    For "cosine", both sides are expected to be normalized already.
+
+    Args:
+        queries (numpy.ndarray): The `(q, dim)` query matrix.
+        vectors (numpy.ndarray): The `(n, dim)` matrix to search.
+        metric (str): One of "cosine", "dot" or "l2".
+        squared_norms (numpy.ndarray, optional): The precomputed squared norms of `vectors`, used by "l2".
+
+    Returns:
+        numpy.ndarray: The `(q, n)` score matrix.
+    """
+    scores = queries @ vectors.T
+    if metric == "l2":
+        if squared_norms is None:
+            squared_norms = np.einsum("ij,ij->i", vectors, vectors)
+        scores *= 2
+        scores -= squared_norms
+        scores -= np.einsum("ij,ij->i", queries, queries)[:, np.newaxis]
+    return scores
+
+
+def select_top_k(scores, k):
+    """Select the `k` best scores of every row with `argpartition`, best first.
+
+    Args:
+        scores (numpy.ndarray): The `(q, n)` score matrix.
+        k (int): The number of results per row.
+
+    Returns:
+        tuple: The `(q, k)` column indices and their scores.
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(scores.dtype)
+    if k < scores.shape[1]:
+        indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        indices = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    selected = np.take_along_axis(scores, indices, axis=1)
+    order = np.argsort(-selected, axis=1, kind="stable")
+    return np.take_along_axis(indices, order, axis=1), np.take_along_axis(selected, order, axis=1)
+
+
+def recall_at_k(approximate_ids, exact_ids):
+    """Measure the share of the exact top-k neighbours an approximate search found.
+
+    Args:
+        approximate_ids (numpy.ndarray): The `(q, k)` ids returned by the approximate index.
+        exact_ids (numpy.ndarray): The `(q, k)` ids returned by an exact search.
+
+    Returns:
+        float: The recall@k, between 0 and 1.
+    """
+    hits = sum(len(np.intersect1d(found, truth)) for found, truth in zip(approximate_ids, exact_ids))
+    return hits / exact_ids.size
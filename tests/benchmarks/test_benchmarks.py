@@ -0,0 +1,58 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from benchmarks import compare, run
+from benchmarks.fakes import FakeChatCompletion, FakeEmbedding
+
+
+class TestFakes(unittest.TestCase):
+
+    def test_chat_completion_is_seeded(self):
+        messages = [{"role": "user", "content": "hi"}]
+        first, second = FakeChatCompletion(seed=1), FakeChatCompletion(seed=1)
+        self.assertEqual(first(messages=messages), second(messages=messages))
+        self.assertEqual(first.calls, 1)
+        self.assertIn("usage", first(messages=messages))
+
+    def test_embedding_shape(self):
+        response = FakeEmbedding(dim=8)(input=["a", "b", "c"], model="fake")
+        self.assertEqual(len(response["data"]), 3)
+        self.assertEqual(len(response["data"][0]["embedding"]), 8)
+
+
+class TestRunAndCompare(unittest.TestCase):
+
+    def test_quick_suite_round_trip(self):
+        results = run.run_suite(quick=True, names="sequential", repeat=1, min_time=0)
+        self.assertEqual({result["name"] for result in results["results"]}, {"sequential.dispatch"})
+        self.assertIn("python", results["meta"])
+        json.dumps(results)
+
+        rows = compare.compare(results, results)
+        self.assertEqual(len(rows), len(results["results"]))
+        self.assertTrue(all(row["ratio"] == 1 and not row["regression"] for row in rows))
+
+    def test_memory_benchmark(self):
+        results = run.run_suite(quick=True, names="memory", repeat=1, min_time=0)
+        self.assertTrue(results["results"])
+        for result in results["results"]:
+            self.assertGreater(result["stats"]["peak_bytes_per_item"], 0)
+
+    def test_compare_flags_regressions(self):
+        def results(median):
+            return {"results": [{"name": "case", "kind": "time", "params": {"size": 1}, "stats": {"median": median}}]}
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [os.path.join(directory, name) for name in ("baseline.json", "current.json")]
+            for path, median in zip(paths, (1.0, 1.5)):
+                with open(path, "w") as f:
+                    json.dump(results(median), f)
+
+            with redirect_stdout(io.StringIO()) as output:
+                self.assertEqual(compare.main(paths), 1)
+                self.assertEqual(compare.main(paths + ["--threshold", "0.6"]), 0)
+            self.assertIn("REGRESSION", output.getvalue())
@@ -0,0 +1,12 @@
+import unittest
+
+from benchmarks.startup import measure_import
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_heavy_dependencies_are_lazy(self):
+        # The time budget is checked by `python -m benchmarks.startup`, wall-clock time is too noisy here
+        seconds, loaded = measure_import(repeat=1)
+        self.assertEqual(loaded, [])
+        self.assertGreater(seconds, 0)
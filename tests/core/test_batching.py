@@ -0,0 +1,84 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from langtree.core import Operator
+from langtree.core.batching import BatchedOperator
+from langtree.models.openai import OpenAIEmbedding
+
+
+class RecordingCall:
+    """Embeds every text as [len(text)] and records the batches it receives."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, texts, model=None):
+        with self.lock:
+            self.batches.append((list(texts), model))
+        if self.fail:
+            raise RuntimeError("provider down")
+        return [[len(text)] for text in texts]
+
+
+class TestBatchedOperator(unittest.TestCase):
+
+    def run_concurrently(self, function, calls):
+        with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+            return list(executor.map(lambda args: function(*args[0], **args[1]), calls))
+
+    def test_concurrent_calls_share_a_batch(self):
+        call = RecordingCall()
+        batched = BatchedOperator(Operator(call=call, parse=lambda output: [row[0] for row in output]), max_wait_ms=50)
+        calls = [((["a" * i, "b"],), {"model": "m"}) for i in range(1, 9)]
+        results = self.run_concurrently(batched, calls)
+        self.assertEqual(results, [[i, 1] for i in range(1, 9)])
+        self.assertEqual(len(call.batches), 1)
+        self.assertEqual(len(call.batches[0][0]), 16)
+
+    def test_calls_are_grouped_by_kwargs(self):
+        call = RecordingCall()
+        batched = BatchedOperator(Operator(call=call, parse=None), max_wait_ms=50)
+        calls = [((["x"],), {"model": f"m{i % 2}"}) for i in range(6)]
+        self.run_concurrently(batched, calls)
+        self.assertEqual(sorted(model for _, model in call.batches), ["m0", "m1"])
+
+    def test_full_batch_is_sent_without_waiting(self):
+        call = RecordingCall()
+        batched = BatchedOperator(Operator(call=call, parse=None), max_batch_size=4, max_wait_ms=10_000)
+        start = time.perf_counter()
+        self.run_concurrently(batched, [((["x"],), {}) for _ in range(8)])
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertEqual([len(texts) for texts, _ in call.batches], [4, 4])
+
+    def test_single_call_waits_for_window(self):
+        call = RecordingCall()
+        batched = BatchedOperator(Operator(call=call, parse=None), max_wait_ms=1)
+        self.assertEqual(batched(["abc"]), [[3]])
+        self.assertEqual(batched.batches, 1)
+
+    def test_errors_reach_every_caller(self):
+        batched = BatchedOperator(Operator(call=RecordingCall(fail=True), parse=None), max_wait_ms=20)
+        futures = [batched.submit(["x"]) for _ in range(3)]
+        for future in futures:
+            with self.assertRaises(RuntimeError):
+                future.result()
+
+    def test_embedding_operator(self):
+        stub_requests = []
+
+        def create(input, model=None):
+            stub_requests.append(list(input))
+            return {"data": [{"index": i, "embedding": [len(doc), 0]} for i, doc in enumerate(input)]}
+
+        batched = BatchedOperator(OpenAIEmbedding(create=create, model="m"), max_wait_ms=50)
+        results = self.run_concurrently(batched, [(([doc],), {}) for doc in ["a", "bb", "ccc"]])
+        self.assertEqual(results, [[[1.0, 0.0]], [[2.0, 0.0]], [[3.0, 0.0]]])
+        self.assertEqual(len(stub_requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,8 @@
+import json
 import unittest
-from langtree.core.buffer import Buffer
+from langtree.core.buffer import Buffer, TokenBuffer
+from langtree.core.cache import make_cache_key
+from langtree.prompting import SystemMessage, UserMessage
 
 
 class TestBuffer(unittest.TestCase):
@@ -56,5 +59,88 @@ class TestBuffer(unittest.TestCase):
         buffer.extend([1, 2, 3])
         self.assertEqual(repr(buffer), "[1, 2, 3]")
 
+    def test_keeps_the_newest_items(self):
+        items = list(range(1_000))
+        appended, extended = Buffer(100), Buffer(100)
+        for item in items:
+            appended.append(item)
+        extended.extend(items)
+        self.assertEqual(appended.memory, items[-100:])
+        self.assertEqual(extended.memory, items[-100:])
+
+    def test_memory_is_a_list_copy(self):
+        buffer = Buffer(3)
+        buffer.extend([1, 2])
+        memory = buffer.memory
+        self.assertIsInstance(memory, list)
+        self.assertEqual(json.dumps(memory), "[1, 2]")
+        memory.append(3)
+        self.assertEqual(buffer.memory, [1, 2])
+
+    def test_view_is_read_only_and_live(self):
+        buffer = Buffer(3)
+        view = buffer.view()
+        buffer.extend([1, 2])
+        self.assertEqual(view, [1, 2])
+        self.assertEqual(view, (1, 2))
+        self.assertEqual((view[0], view[-1], view[:1]), (1, 2, [1]))
+        self.assertEqual(view + [3], [1, 2, 3])
+        with self.assertRaises(AttributeError):
+            view.append(3)
+        with self.assertRaises(TypeError):
+            view[0] = 3
+        self.assertEqual(buffer.memory, [1, 2])
+        self.assertEqual(make_cache_key(len, (view,)), make_cache_key(len, ([1, 2],)))
+
+
+class TestTokenBuffer(unittest.TestCase):
+
+    def test_evicts_oldest_by_tokens(self):
+        buffer = TokenBuffer(5, tokenizer=str.split)
+        buffer += ["one two", "three", "four five six"]
+        self.assertEqual(buffer.memory, ["three", "four five six"])
+        self.assertEqual(buffer.tokens, 4)
+
+    def test_counts_message_content(self):
+        buffer = TokenBuffer(4, tokenizer=str.split)
+        buffer.append(UserMessage(content="a b c"))
+        buffer.append(UserMessage(content="d e"))
+        self.assertEqual(buffer.memory, [UserMessage(content="d e")])
+        self.assertEqual(buffer.tokens, 2)
+
+    def test_default_tokenizer(self):
+        buffer = TokenBuffer(2)
+        buffer.append("12345678")
+        self.assertEqual(buffer.tokens, 2)
+        buffer.append("x")
+        self.assertEqual(buffer.memory, ["x"])
+
+    def test_pin_system_message(self):
+        buffer = TokenBuffer(5, tokenizer=str.split, pin_system=True)
+        system = SystemMessage(content="be nice")
+        buffer += [system, UserMessage(content="hi"), UserMessage(content="how are you")]
+        self.assertEqual(buffer.memory, [system, UserMessage(content="how are you")])
+        self.assertEqual(buffer.view()[0], system)
+        self.assertEqual(len(buffer.view()), 2)
+        self.assertEqual(buffer.tokens, 5)
+
+    def test_pinned_message_over_budget(self):
+        buffer = TokenBuffer(3, tokenizer=str.split, pin_system=True)
+        buffer.append(UserMessage(content="hi"))
+        with self.assertRaises(ValueError):
+            buffer.append(SystemMessage(content="be nice and short"))
+        self.assertEqual(buffer.memory, [UserMessage(content="hi")])
+        self.assertEqual(buffer.tokens, 1)
+
+        buffer.append(SystemMessage(content="be nice"))
+        buffer.append(UserMessage(content="ok"))
+        self.assertEqual(buffer.memory, [SystemMessage(content="be nice"), UserMessage(content="ok")])
+
+    def test_repr(self):
+        buffer = TokenBuffer(10)
+        buffer.extend(["a", "b"])
+        self.assertEqual(repr(buffer), "['a', 'b']")
+
+
 if __name__ == "__main__":
     unittest.main()
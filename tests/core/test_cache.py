@@ -0,0 +1,348 @@
+import asyncio
+import importlib.util
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from langtree.core import Operator
+from langtree.core.cache import CachedOperator, EmbeddingCache, MemoryCache, SQLiteCache, make_cache_key
+
+
+def echo(*args, **kwargs):
+    return {"args": list(args), "kwargs": kwargs}
+
+
+class Client:
+
+    def __init__(self, api_base):
+        self.api_base = api_base
+        self.session = threading.Lock()
+
+    def create(self, **kwargs):
+        return {"api_base": self.api_base, **kwargs}
+
+
+class CountingCall:
+    """Records how many times it is called, optionally blocking until released."""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, **kwargs):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("boom")
+        return {"choices": [{"message": {"role": "assistant", "content": kwargs["messages"][-1]["content"]}}]}
+
+
+class TestCacheKey(unittest.TestCase):
+
+    def test_frozen_and_call_kwargs_are_equivalent(self):
+        operator = Operator(call=echo)
+        operator.freeze_call(model="m", temperature=0)
+        self.assertEqual(make_cache_key(operator.call, kwargs={"messages": [{"content": "hi"}]}),
+                         make_cache_key(echo, kwargs={"temperature": 0, "messages": [{"content": "hi"}], "model": "m"}))
+
+    def test_differs_by_arguments_and_function(self):
+        key = make_cache_key(echo, kwargs={"model": "a"})
+        self.assertNotEqual(key, make_cache_key(echo, kwargs={"model": "b"}))
+        self.assertNotEqual(key, make_cache_key(print, kwargs={"model": "a"}))
+        self.assertNotEqual(make_cache_key(echo, ("a",)), make_cache_key(echo, ("b",)))
+
+    def test_lambdas_and_closures_are_told_apart(self):
+        first, second = lambda x: x, lambda x: x + 1
+        self.assertNotEqual(make_cache_key(first, (1,)), make_cache_key(second, (1,)))
+        self.assertEqual(make_cache_key(first, (1,)), make_cache_key(first, (1,)))
+
+        def make(suffix):
+            return lambda x: x + suffix
+
+        self.assertNotEqual(make_cache_key(make("a"), ("x",)), make_cache_key(make("b"), ("x",)))
+        self.assertEqual(make_cache_key(make("a"), ("x",)), make_cache_key(make("a"), ("x",)))
+
+    def test_unserializable_arguments_are_refused(self):
+        with self.assertRaises(TypeError):
+            make_cache_key(echo, (object(),))
+        with self.assertRaises(TypeError):
+            make_cache_key(echo, kwargs={"callback": None, "handle": threading.Lock()})
+
+    def test_bound_methods_are_told_apart_by_instance(self):
+        first, second = Client("https://a"), Client("https://b")
+        self.assertNotEqual(make_cache_key(first.create, kwargs={"model": "m"}),
+                            make_cache_key(second.create, kwargs={"model": "m"}))
+        self.assertEqual(make_cache_key(first.create, kwargs={"model": "m"}),
+                         make_cache_key(Client("https://a").create, kwargs={"model": "m"}))
+
+        def wrap(create):
+            # Like a scheduler wrapping a client's endpoint
+            return lambda **kwargs: create(**kwargs)
+
+        self.assertNotEqual(make_cache_key(wrap(first.create)), make_cache_key(wrap(second.create)))
+
+        class Slotted:
+            __slots__ = ()
+
+            def create(self):
+                return None
+
+        with self.assertRaises(TypeError):
+            make_cache_key(Slotted().create)
+
+    def test_captured_state_does_not_change_the_key(self):
+        calls = []
+
+        def call(x):
+            calls.append(x)
+            return x
+
+        key = make_cache_key(call, (1,))
+        calls.append(1)
+        self.assertEqual(make_cache_key(call, (1,)), key)
+
+
+class TestMemoryCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = MemoryCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), (True, 1))
+        self.assertEqual(cache.get("b"), (False, None))
+        self.assertEqual(len(cache), 2)
+
+    def test_ttl(self):
+        cache = MemoryCache(ttl=0.05)
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), (True, 1))
+        time.sleep(0.06)
+        self.assertEqual(cache.get("a"), (False, None))
+
+
+class TestSQLiteCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_max_size_evicts_the_oldest(self):
+        with SQLiteCache(self.path, max_size=2) as cache:
+            for key in "abc":
+                cache.set(key, key.upper())
+            self.assertEqual(len(cache), 2)
+            self.assertEqual(cache.get("a"), (False, None))
+            self.assertEqual(cache.get("c"), (True, "C"))
+
+    def test_close_closes_every_thread(self):
+        cache = SQLiteCache(self.path)
+        thread = threading.Thread(target=cache.set, args=("a", 1))
+        thread.start()
+        thread.join()
+        self.assertEqual(len(cache._connections), 2)
+        cache.close()
+        self.assertEqual(cache._connections, [])
+        self.assertEqual(cache.get("a"), (True, 1))
+        cache.close()
+
+
+class TestCachedOperator(unittest.TestCase):
+
+    def make(self, call, **kwargs):
+        operator = Operator(call=call, parse=lambda output: output["choices"][0]["message"]["content"])
+        operator.freeze_call(model="m", temperature=0)
+        return CachedOperator(operator, **kwargs)
+
+    def test_hits_and_misses(self):
+        call = CountingCall()
+        cached = self.make(call)
+        messages = [{"role": "user", "content": "hi"}]
+        self.assertEqual(cached(messages=messages), "hi")
+        self.assertEqual(cached(messages=messages), "hi")
+        self.assertEqual(cached(messages=[{"role": "user", "content": "other"}]), "other")
+        self.assertEqual(call.calls, 2)
+        self.assertEqual(cached.stats, {"hits": 1, "misses": 2, "coalesced": 0})
+
+    def test_concurrent_calls_are_coalesced(self):
+        call = CountingCall(delay=0.1)
+        cached = self.make(call)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cached(messages=[{"content": "x"}])))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["x"] * 5)
+        self.assertEqual(call.calls, 1)
+        self.assertEqual(cached.stats["coalesced"], 4)
+
+    def test_failures_are_not_cached(self):
+        call = CountingCall(fail=True)
+        cached = self.make(call)
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                cached(messages=[{"content": "x"}])
+        self.assertEqual(call.calls, 2)
+
+    def test_sqlite_tier_is_shared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite")
+            call = CountingCall()
+            self.make(call, backend=SQLiteCache(path))(messages=[{"content": "x"}])
+            # A fresh wrapper, as another process would build, finds the answer on disk
+            other = self.make(call, backend=SQLiteCache(path))
+            self.assertEqual(other(messages=[{"content": "x"}]), "x")
+            self.assertEqual(call.calls, 1)
+            self.assertEqual(other.stats, {"hits": 1, "misses": 0, "coalesced": 0})
+
+    def test_async(self):
+        call = CountingCall()
+        cached = self.make(call)
+
+        async def main():
+            return await asyncio.gather(*[cached.acall(messages=[{"content": "x"}]) for _ in range(3)])
+
+        self.assertEqual(asyncio.run(main()), ["x"] * 3)
+        self.assertEqual(call.calls, 1)
+
+    def test_async_call_function(self):
+        calls = []
+
+        async def call(**kwargs):
+            calls.append(kwargs)
+            return {"choices": [{"message": {"content": kwargs["messages"][-1]["content"]}}]}
+
+        cached = self.make(call)
+
+        async def main():
+            return [await cached.acall(messages=[{"content": "x"}]) for _ in range(2)]
+
+        self.assertEqual(asyncio.run(main()), ["x", "x"])
+        self.assertEqual(len(calls), 1)
+        with self.assertRaises(TypeError):
+            cached(messages=[{"content": "y"}])
+        self.assertEqual(cached.stats["hits"], 1)
+
+    def test_streaming_bypasses_cache(self):
+        operator = Operator(call=lambda stream=False: iter("ab") if stream else "ab", parse=None)
+        cached = CachedOperator(operator)
+        self.assertEqual(list(cached.stream()), ["a", "b"])
+        self.assertEqual(list(cached(stream=True)), ["a", "b"])
+        self.assertEqual(cached.stats["misses"], 0)
+
+
+def _save_embeddings(directory, worker):
+    for i in range(10):
+        cache = EmbeddingCache()
+        cache.put("m", [f"{worker}-{i}"], [[float(worker), float(i)]])
+        cache.save(directory)
+
+
+@unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy is not installed")
+class TestEmbeddingCache(unittest.TestCase):
+
+    def fetcher(self):
+        requests = []
+
+        def fetch(texts):
+            requests.append(list(texts))
+            return [[len(text), 1.0] for text in texts]
+
+        return fetch, requests
+
+    def test_only_misses_are_fetched(self):
+        cache = EmbeddingCache()
+        fetch, requests = self.fetcher()
+        cache.embed("m", ["a", "bb"], fetch)
+        result = cache.embed("m", ["bb", "ccc", "a", "ccc"], fetch)
+        self.assertEqual(result.dtype.name, "float32")
+        self.assertEqual(result[:, 0].tolist(), [2, 3, 1, 3])
+        self.assertEqual(requests, [["a", "bb"], ["ccc"]])
+        self.assertEqual(len(cache), 3)
+
+    def test_keyed_by_model(self):
+        cache = EmbeddingCache()
+        fetch, requests = self.fetcher()
+        cache.embed("m1", ["a"], fetch)
+        cache.embed("m2", ["a"], fetch)
+        self.assertEqual(len(requests), 2)
+        self.assertEqual(cache.get("m3", ["a"]), [None])
+
+    def test_dimension_mismatch(self):
+        cache = EmbeddingCache(dim=3)
+        with self.assertRaises(ValueError):
+            cache.put("m", ["a"], [[1.0, 2.0]])
+
+    def test_save_and_mmap(self):
+        cache = EmbeddingCache(capacity=2)
+        fetch, requests = self.fetcher()
+        texts = [f"text {i}" * (i + 1) for i in range(50)]
+        cache.embed("m", texts, fetch)
+        with tempfile.TemporaryDirectory() as directory:
+            cache.save(directory)
+            loaded = EmbeddingCache.load(directory)
+            self.assertEqual(len(loaded), 50)
+            self.assertEqual(loaded.embed("m", texts[::-1], fetch).tolist(), cache.embed("m", texts[::-1], fetch).tolist())
+            loaded.embed("m", ["new"], fetch)
+            loaded.save(directory)
+            self.assertEqual(len(EmbeddingCache.load(directory, mmap=False)), 51)
+        self.assertEqual(len(requests), 2)
+
+    def test_save_appends_a_segment(self):
+        cache = EmbeddingCache()
+        fetch, requests = self.fetcher()
+        cache.embed("m", ["a", "bb"], fetch)
+        with tempfile.TemporaryDirectory() as directory:
+            cache.save(directory)
+            files = {name: os.stat(os.path.join(directory, name)).st_mtime_ns
+                     for name in os.listdir(directory) if name.endswith(".npy")}
+            cache.save(directory)
+            cache.embed("m", ["ccc"], fetch)
+            cache.save(directory)
+            for name, modified in files.items():
+                self.assertEqual(os.stat(os.path.join(directory, name)).st_mtime_ns, modified)
+            self.assertEqual(len([name for name in os.listdir(directory) if name.endswith(".npy")]), 4)
+
+            loaded = EmbeddingCache.load(directory)
+            self.assertEqual(loaded.embed("m", ["ccc", "a", "bb"], fetch)[:, 0].tolist(), [3, 1, 2])
+            self.assertEqual(requests, [["a", "bb"], ["ccc"]])
+
+    def test_save_merges_into_another_cache(self):
+        fetch, requests = self.fetcher()
+        first, second = EmbeddingCache(), EmbeddingCache()
+        first.embed("m", ["a", "bb"], fetch)
+        second.embed("m", ["bb", "ccc"], fetch)
+        with tempfile.TemporaryDirectory() as directory:
+            first.save(directory)
+            second.save(directory)
+            loaded = EmbeddingCache.load(directory)
+            self.assertEqual(len(loaded), 3)
+            self.assertEqual(loaded.embed("m", ["ccc", "bb", "a"], fetch)[:, 0].tolist(), [3, 2, 1])
+            with self.assertRaises(ValueError):
+                EmbeddingCache(dim=3).save(directory)
+        with self.assertRaises(FileNotFoundError):
+            EmbeddingCache.load(directory)
+
+    def test_concurrent_saves_keep_every_segment(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with ProcessPoolExecutor(4) as pool:
+                list(pool.map(_save_embeddings, [directory] * 4, range(4)))
+            loaded = EmbeddingCache.load(directory)
+            self.assertEqual(len(loaded), 40)
+            self.assertEqual(loaded.get("m", ["3-9"])[0].tolist(), [3.0, 9.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
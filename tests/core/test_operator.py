@@ -1,5 +1,8 @@
+import asyncio
+import threading
 import unittest
 from langtree.core import Operator
+from langtree.core.operator import accepts_stream, streaming
 from langtree.operators import chainable
 
 
@@ -46,5 +49,83 @@ class TestOperator(unittest.TestCase):
         self.assertEqual(result, {'foo': 'bar'})
 
 
+class TestAsyncOperator(unittest.IsolatedAsyncioTestCase):
+
+    async def test_acall_default_behavior(self):
+        operator = Operator()
+        self.assertEqual(await operator.acall(foo='bar'), {'foo': 'bar'})
+
+    async def test_acall_awaits_async_call(self):
+        async def call(x, y=0):
+            await asyncio.sleep(0)
+            return x + y
+
+        operator = Operator(call=call, parse=lambda output: output * 10)
+        operator.freeze_call(y=2)
+        self.assertEqual(await operator.acall(1), 30)
+
+    async def test_acall_offloads_sync_call(self):
+        operator = Operator(call=lambda: threading.get_ident())
+        self.assertNotEqual(await operator.acall(), threading.get_ident())
+
+
+def fake_stream(text, stream=False):
+    """Streams one chunk per word when asked to, like a streaming completion endpoint."""
+    if not stream:
+        return {"text": text}
+    return iter([{"delta": word} for word in text.split()] + [{"delta": None}])
+
+
+class TestStreamingOperator(unittest.TestCase):
+
+    def test_stream_parses_chunks(self):
+        operator = Operator(call=fake_stream, parse=lambda output: output["text"], parse_chunk=lambda chunk: chunk["delta"])
+        self.assertEqual(list(operator.stream("a b c")), ["a", "b", "c"])
+        self.assertEqual(list(operator("a b c", stream=True)), ["a", "b", "c"])
+        self.assertEqual(operator("a b c"), "a b c")
+
+    def test_stream_yields_raw_chunks_without_parse_chunk(self):
+        operator = Operator(call=fake_stream)
+        self.assertEqual(list(operator.stream("a b")), [{"delta": "a"}, {"delta": "b"}, {"delta": None}])
+
+    def test_stream_is_lazy(self):
+        received = []
+
+        def call(stream=False):
+            for word in ["a", "b"]:
+                received.append(word)
+                yield word
+
+        chunks = Operator(call=call).stream()
+        self.assertEqual(next(chunks), "a")
+        self.assertEqual(received, ["a"])
+
+    def test_non_streaming_call_yields_parsed_result(self):
+        operator = Operator(call=lambda stream=False, **kwargs: kwargs, parse=lambda output: output["x"])
+        self.assertEqual(list(operator.stream(x=1)), [1])
+
+    def test_plain_call_is_not_given_stream(self):
+        operator = Operator(call=lambda x: x + 1)
+        self.assertFalse(operator.streams)
+        self.assertEqual(list(operator.stream(1)), [2])
+        self.assertEqual(list(Operator().stream(foo=1)), [{"foo": 1}])
+
+    def test_stream_argument_reaches_plain_call(self):
+        self.assertEqual(Operator()(stream=True, foo=1), {"stream": True, "foo": 1})
+        self.assertEqual(Operator(call=lambda **kwargs: kwargs)(stream=False), {"stream": False})
+
+    def test_opt_in_with_streaming(self):
+        def create(**kwargs):
+            return iter(kwargs["prompt"].split()) if kwargs.get("stream") else kwargs["prompt"]
+
+        self.assertFalse(accepts_stream(create))
+        operator = Operator(call=streaming(create), parse=None)
+        self.assertTrue(operator.streams)
+        self.assertEqual(list(operator.stream(prompt="a b")), ["a", "b"])
+        operator.freeze_call(prompt="c d")
+        self.assertEqual(list(operator(stream=True)), ["c", "d"])
+        self.assertEqual(operator(), "c d")
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,8 +1,10 @@
+import io
 import unittest
-from langtree.core import Prompt, render_prompt
+from langtree.core import Prompt, compile_template, render_prompt
 
 # Assuming the previous definitions are here
 
+
 class TestRenderPrompt(unittest.TestCase):
 
     def test_render_with_no_substitution(self):
@@ -20,6 +22,24 @@ class TestRenderPrompt(unittest.TestCase):
     def test_render_with_special_characters(self):
         self.assertEqual(render_prompt("Hello, {{name}}!", name="Alice (from Wonderland)"), "Hello, Alice (from Wonderland)!")
 
+    def test_render_leaves_unknown_placeholders(self):
+        self.assertEqual(render_prompt("{{a}} and {{b}}", a="x", c="y"), "x and {{b}}")
+
+    def test_render_does_not_interpret_escapes(self):
+        self.assertEqual(render_prompt("{{path}}", path="C:\\new"), "C:\\new")
+
+    def test_render_repeated_placeholder(self):
+        self.assertEqual(render_prompt("{{a}}{{a}}", a="x"), "xx")
+
+
+class TestCompileTemplate(unittest.TestCase):
+
+    def test_segments(self):
+        self.assertEqual(compile_template("Hi {{name}}, {{greeting}}!"), ("Hi ", "name", ", ", "greeting", "!"))
+        self.assertEqual(compile_template("plain"), ("plain",))
+        self.assertEqual(compile_template("{{{x}}}"), ("{", "x", "}"))
+
+
 class TestPrompt(unittest.TestCase):
 
     def test_call_with_substitution(self):
@@ -43,5 +63,83 @@ class TestPrompt(unittest.TestCase):
         with self.assertRaises(TypeError):
             prompt + 123
 
+    def test_missing_variable_raises(self):
+        with self.assertRaises(KeyError):
+            Prompt("Hello, {{name}}!")()
+
+    def test_extra_variable_raises(self):
+        with self.assertRaises(KeyError):
+            Prompt("Hello, {{name}}!")(name="Fay", age=3)
+
+    def test_variables(self):
+        self.assertEqual(Prompt("{{a}} {{b}} {{a}}").variables, {"a", "b"})
+
+    def test_add_merges_segments(self):
+        prompt = Prompt("{{a}} {{") + "b}} " + Prompt("{{c}}")
+        self.assertEqual(prompt.segments, compile_template(prompt.template))
+        self.assertEqual(prompt(a="1", b="2", c="3"), "1 2 3")
+
+    def test_template_can_be_replaced(self):
+        prompt = Prompt("{{a}}")
+        prompt.template = "{{b}}!"
+        self.assertEqual(prompt(b="x"), "x!")
+
+
+class TestRenderMany(unittest.TestCase):
+
+    def test_rows(self):
+        prompt = Prompt("{{a}} + {{b}} = {{a}}{{b}} {x}")
+        rendered = prompt.render_many([{"a": 1, "b": "2"}, {"a": "3", "b": "4"}])
+        self.assertNotIsInstance(rendered, list)
+        self.assertEqual(list(rendered), ["1 + 2 = 12 {x}", "3 + 4 = 34 {x}"])
+
+    def test_matches_call(self):
+        prompt = Prompt("Hello, {{name}}!")
+        rows = [{"name": "Gus"}, {"name": "Hana"}]
+        self.assertEqual(list(prompt.render_many(rows)), [prompt(**row) for row in rows])
+
+    def test_columns(self):
+        prompt = Prompt("{{q}}? {{a}}.")
+        rendered = prompt.render_many({"q": ["Why", "How"], "a": ["Because", "Like so"]})
+        self.assertEqual(list(rendered), ["Why? Because.", "How? Like so."])
+
+    def test_no_placeholders(self):
+        prompt = Prompt("static")
+        self.assertEqual(list(prompt.render_many([{}, {}])), ["static", "static"])
+        self.assertEqual(list(prompt.render_many({})), [])
+
+    def test_sink(self):
+        sink = io.StringIO()
+        self.assertIsNone(Prompt("<{{x}}>").render_many(({"x": i} for i in range(3)), sink=sink))
+        self.assertEqual(sink.getvalue(), "<0>\n<1>\n<2>\n")
+
+    def test_missing_value(self):
+        with self.assertRaises(KeyError):
+            list(Prompt("{{x}}").render_many([{"y": 1}]))
+        with self.assertRaises(KeyError):
+            list(Prompt("{{x}} {{y}}").render_many([{"x": 1}]))
+        with self.assertRaises(KeyError):
+            Prompt("{{x}} {{y}}").render_many({"x": [1]})
+
+    def test_extra_keys_raise_like_call(self):
+        prompt = Prompt("{{x}}")
+        with self.assertRaises(KeyError):
+            prompt(x=1, y=2)
+        with self.assertRaises(KeyError):
+            list(prompt.render_many([{"x": 1}, {"x": 2, "y": 3}]))
+        with self.assertRaises(KeyError):
+            prompt.render_many({"x": [1], "y": [2]})
+        with self.assertRaises(KeyError):
+            list(Prompt("static").render_many([{"a": 1}]))
+
+    def test_columns_of_different_lengths(self):
+        with self.assertRaises(ValueError):
+            Prompt("{{q}}? {{a}}.").render_many({"q": ["Why", "How"], "a": ["Because"]})
+
+    def test_no_template(self):
+        with self.assertRaises(ValueError):
+            Prompt(None).render_many([{}])
+
+
 if __name__ == '__main__':
     unittest.main()
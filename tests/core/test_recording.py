@@ -0,0 +1,186 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from langtree.core import Operator
+from langtree.core.cache import CachedOperator
+from langtree.core.recording import JSONLinesSink, MemorySink, OTLPSink, Recorder, annotate, span
+from langtree.operators import Parallel, Sequential
+
+
+def completion(prompt, model="gpt-4"):
+    return {"model": model, "choices": [{"text": prompt.upper()}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}}
+
+
+def text(output):
+    return output["choices"][0]["text"]
+
+
+def slow(x):
+    time.sleep(0.05)
+    return x
+
+
+class FailingSink:
+
+    def write(self, spans):
+        raise IOError("disk full")
+
+
+class TestRecording(unittest.TestCase):
+
+    def record(self, function, *args, **kwargs):
+        sink = MemorySink()
+        with Recorder([sink], **kwargs):
+            result = function(*args)
+        return result, {span.name: span for span in sink.spans}, sink.spans
+
+    def test_spans_mirror_the_chain(self):
+        chain = Sequential([Operator(call=completion, parse=text),
+                            Parallel([Operator(call=slow), Operator(call=str.lower)], executor="thread")])
+        result, spans, _ = self.record(chain, "hi")
+        self.assertEqual(result, ["HI", "hi"])
+        self.assertEqual(set(spans), {"Sequential", "completion", "Parallel", "slow", "lower"})
+        root = spans["Sequential"]
+        self.assertIsNone(root.parent_id)
+        self.assertEqual(spans["completion"].parent_id, root.span_id)
+        self.assertEqual(spans["Parallel"].parent_id, root.span_id)
+        self.assertEqual(spans["slow"].parent_id, spans["Parallel"].span_id)
+        self.assertEqual({span.trace_id for span in spans.values()}, {root.trace_id})
+        self.assertGreaterEqual(spans["slow"].duration, 0.05)
+        self.assertGreaterEqual(root.duration, spans["slow"].duration)
+        self.assertGreaterEqual(spans["slow"].queue_time, 0)
+
+    def test_process_pools_under_a_recorder(self):
+        with Parallel([Operator(call=str.upper), Operator(call=str.lower)], executor="process", max_workers=2) as chain:
+            result, spans, _ = self.record(chain, "Hi")
+            self.assertEqual(result, ["HI", "hi"])
+            self.assertIn("Parallel", spans)
+
+            graph = Sequential([Operator(call=str.upper)]).compile(executor="process", max_workers=1)
+            with graph:
+                self.assertEqual(self.record(graph, "hi")[0], "HI")
+
+    def test_cached_usage_is_recorded_once(self):
+        cached = CachedOperator(Operator(call=completion, parse=text))
+        sink = MemorySink()
+        with Recorder([sink], prices={"gpt-4": (0.03, 0.06)}):
+            cached("hi")
+            cached("hi")
+            asyncio.run(cached.acall("hi"))
+        costs = [span.attributes.get("cost") for span in sink.spans]
+        self.assertEqual(len(costs), 3)
+        self.assertAlmostEqual(sum(cost or 0 for cost in costs), 0.0006)
+
+    def test_usage_and_cost(self):
+        _, spans, _ = self.record(Operator(call=completion, parse=text), "hi", prices={"gpt-4": (0.03, 0.06)})
+        attributes = spans["completion"].attributes
+        self.assertEqual(attributes["total_tokens"], 15)
+        self.assertEqual(attributes["model"], "gpt-4")
+        self.assertAlmostEqual(attributes["cost"], 0.0006)
+
+    def test_errors(self):
+        def fail(x):
+            raise ValueError("bad input")
+
+        sink = MemorySink()
+        with Recorder([sink]):
+            with self.assertRaises(ValueError):
+                Sequential([Operator(call=fail)])(1)
+        self.assertEqual([span.error for span in sink.spans], ["ValueError('bad input')"] * 2)
+
+    def test_cache_hits(self):
+        cached = CachedOperator(Operator(call=completion, parse=text))
+        sink = MemorySink()
+        with Recorder([sink]):
+            cached("a")
+            cached("a")
+        self.assertEqual([span.attributes["cache"] for span in sink.spans], ["miss", "hit"])
+
+    def test_custom_spans(self):
+        def retrieve(question):
+            with span("retriever"):
+                annotate(documents=3)
+                return [question] * 3
+
+        _, spans, _ = self.record(Sequential([Operator(call=retrieve), Operator(call=len)]), "q")
+        self.assertEqual(spans["retriever"].attributes, {"documents": 3})
+        self.assertEqual(spans["retriever"].parent_id, spans["retrieve"].span_id)
+
+    def test_nothing_recorded_when_inactive(self):
+        sink = MemorySink()
+        Recorder([sink])
+        Operator(call=completion, parse=text)("hi")
+        with span("ignored") as current:
+            self.assertIsNone(current)
+        self.assertEqual(sink.spans, [])
+
+    def test_async(self):
+        async def call(x):
+            await asyncio.sleep(0)
+            return x + 1
+
+        chain = Sequential([Operator(call=call), Parallel([Operator(call=call), Operator(call=lambda x: x * 2)])])
+        sink = MemorySink()
+
+        async def main():
+            with Recorder([sink]):
+                return await chain.acall(1)
+
+        self.assertEqual(asyncio.run(main()), [3, 4])
+        spans = {span.name: span for span in sink.spans}
+        self.assertEqual(spans["<lambda>"].parent_id, spans["Parallel"].span_id)
+
+    def test_sink_errors_do_not_break_chains(self):
+        sink = MemorySink()
+        recorder = Recorder([FailingSink(), sink])
+        with recorder:
+            self.assertEqual(Operator(call=str.upper)("a"), "A")
+        self.assertEqual(recorder.dropped, 1)
+        self.assertEqual(len(sink.spans), 1)
+        recorder.close()
+
+    def test_writer_thread_lifecycle(self):
+        sink = MemorySink()
+        recorder = Recorder([sink])
+        self.assertIsNone(recorder._writer)
+        with recorder:
+            with recorder:
+                Operator(call=str.upper)("a")
+            writer = recorder._writer
+            self.assertTrue(writer.is_alive())
+            self.assertEqual(len(sink.spans), 1)
+        self.assertFalse(writer.is_alive())
+        self.assertIsNone(recorder._writer)
+
+        with recorder:
+            Operator(call=str.upper)("b")
+        self.assertEqual(len(sink.spans), 2)
+        self.assertIsNone(recorder._writer)
+
+    def test_file_sinks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            lines = os.path.join(directory, "spans.jsonl")
+            otlp = os.path.join(directory, "otlp.jsonl")
+            with Recorder([JSONLinesSink(lines), OTLPSink(path=otlp)]):
+                Sequential([Operator(call=completion, parse=text)])("hi")
+
+            with open(lines) as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual([record["name"] for record in records], ["completion", "Sequential"])
+            self.assertEqual(records[0]["parent_id"], records[1]["span_id"])
+
+            with open(otlp) as f:
+                payload = json.loads(f.readline())
+            spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+            self.assertEqual(spans[0]["parentSpanId"], spans[1]["spanId"])
+            self.assertEqual(len(spans[0]["traceId"]), 32)
+            self.assertIn({"key": "total_tokens", "value": {"intValue": "15"}}, spans[0]["attributes"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import importlib.util
+import subprocess
+import sys
+import unittest
+
+from langtree.core import PROVIDERS, VECTOR_DATABASES, Operator, Registry
+
+
+class TestRegistry(unittest.TestCase):
+
+    def test_register_and_resolve(self):
+        registry = Registry("widget")
+        registry.register("path", "langtree.core.operator:Operator.name")
+        self.assertIs(registry.get("path"), Operator.name)
+
+        @registry.register("double")
+        def double(x):
+            return 2 * x
+
+        self.assertEqual(registry.create("double", 4), 8)
+        self.assertEqual(registry.names(), ["double", "path"])
+        self.assertIn("double", registry)
+        self.assertEqual(registry.find(double), "double")
+        self.assertEqual(registry.find(Operator), None)
+        self.assertEqual(VECTOR_DATABASES.find(Operator), None)
+        with self.assertRaises(ValueError):
+            registry.get("missing")
+
+    def test_builtin_names(self):
+        self.assertIn("openai.chat", PROVIDERS)
+        self.assertIn("ivf", VECTOR_DATABASES)
+        chat = PROVIDERS.create("openai.chat", call=lambda **kwargs: {"choices": [{"message": {"content": "hi"}}]})
+        self.assertEqual(chat(messages=[]), {"content": "hi"})
+        if importlib.util.find_spec("numpy"):
+            self.assertEqual(VECTOR_DATABASES.get("memory").__name__, "MemoryVectorDatabase")
+
+    def test_resolution_is_lazy(self):
+        code = ("import sys\nfrom langtree.core import PROVIDERS, VECTOR_DATABASES\nimport langtree.vectordb\n"
+                "PROVIDERS.names()\nassert 'numpy' not in sys.modules and 'openai' not in sys.modules\n"
+                "PROVIDERS.get('openai.chat')\nassert 'openai' not in sys.modules\n")
+        if importlib.util.find_spec("numpy"):
+            code += "langtree.vectordb.MemoryVectorDatabase\nassert 'numpy' in sys.modules\n"
+        subprocess.run([sys.executable, "-c", code], check=True)
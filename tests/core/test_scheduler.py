@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langtree.core.scheduler import BATCH, INTERACTIVE, Scheduler, TokenBucket, estimate_request_tokens
+from langtree.models.openai import OpenAIChatCompletion
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    """Answers 429 with a retry-after hint to the first `server.throttle` requests."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.requests += 1
+            throttled = self.server.requests <= self.server.throttle
+        if throttled:
+            self.send_response(429)
+            self.send_header("Retry-After", "0.05")
+            self.end_headers()
+            return
+        reply = {"choices": [{"message": {"role": "assistant", "content": body["messages"][-1]["content"]}}],
+                 "usage": {"total_tokens": 7}}
+        data = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_refill_and_debt(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, capacity=2, clock=clock)
+        self.assertEqual(bucket.delay(2), 0)
+        bucket.consume(5)
+        self.assertAlmostEqual(bucket.delay(1), 4.0)
+        # A request larger than the capacity only waits for a full bucket
+        clock.now = 4.0
+        self.assertAlmostEqual(bucket.delay(10), 1.0)
+        clock.now = 100.0
+        self.assertEqual(bucket.level, 2)
+
+
+class TestScheduler(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottlingHandler)
+        cls.server.lock = threading.Lock()
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = 0
+        self.server.throttle = 0
+
+    def post(self, **kwargs):
+        request = urllib.request.Request(f"http://127.0.0.1:{self.server.server_address[1]}/chat",
+                                         data=json.dumps(kwargs).encode(), method="POST")
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def test_retries_throttled_requests(self):
+        self.server.throttle = 2
+        scheduler = Scheduler(max_backoff=0.1)
+        chat = OpenAIChatCompletion(call=self.post, scheduler=scheduler, model="m")
+        start = time.perf_counter()
+        self.assertEqual(chat(messages=[{"role": "user", "content": "hi"}])["content"], "hi")
+        self.assertGreaterEqual(time.perf_counter() - start, 0.1)
+        self.assertEqual(scheduler.retries, 2)
+        self.assertEqual(self.server.requests, 3)
+
+    def test_gives_up_after_max_retries(self):
+        self.server.throttle = 10
+        scheduler = Scheduler(max_retries=1, max_backoff=0.01)
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            scheduler.submit(self.post, messages=[])
+        self.assertEqual(context.exception.code, 429)
+        self.assertEqual(self.server.requests, 2)
+
+    def test_other_errors_are_not_retried(self):
+        scheduler = Scheduler()
+        with self.assertRaises(ValueError):
+            scheduler.submit(lambda: int("x"))
+        self.assertEqual(scheduler.retries, 0)
+
+    def test_requests_per_minute(self):
+        scheduler = Scheduler(requests_per_minute=1200)
+        start = time.perf_counter()
+        threads = [threading.Thread(target=scheduler.submit, args=(self.post,), kwargs={"messages": [{"content": "x"}]})
+                   for _ in range(30)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 20 requests fit in the initial burst, the other 10 are spread over half a second
+        self.assertGreaterEqual(time.perf_counter() - start, 0.45)
+        self.assertEqual(self.server.requests, 30)
+
+    def test_tokens_are_reconciled_with_usage(self):
+        # A frozen clock keeps the bucket from refilling while the request is in flight
+        scheduler = Scheduler(tokens_per_minute=6000, clock=lambda: 0.0)
+        scheduler.submit(self.post, messages=[{"content": "a" * 400}])
+        # 100 tokens were reserved, the response reported 7
+        self.assertEqual(scheduler.buckets["tokens"].level, 100 - 7)
+
+    def test_priority(self):
+        scheduler = Scheduler(requests_per_minute=600, burst_seconds=0.1)
+        order = []
+        scheduler.submit(order.append, "first")
+
+        threads = [threading.Thread(target=scheduler.submit, args=(order.append, "batch"), kwargs={"priority": BATCH})]
+        threads[0].start()
+        time.sleep(0.02)
+        threads.append(threading.Thread(target=scheduler.submit, args=(order.append, "interactive-1")))
+        threads.append(threading.Thread(target=scheduler.submit, args=(order.append, "interactive-2"),
+                                        kwargs={"priority": INTERACTIVE}))
+        for thread in threads[1:]:
+            thread.start()
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ["first", "interactive-1", "interactive-2", "batch"])
+
+    def test_estimate_request_tokens(self):
+        self.assertEqual(estimate_request_tokens({"messages": [{"content": "abcdefgh"}], "max_tokens": 10}), 12)
+        self.assertEqual(estimate_request_tokens({"input": ["abcd", "efgh"]}), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
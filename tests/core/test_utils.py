@@ -0,0 +1,39 @@
+import unittest
+
+try:
+    import numpy as np
+except ImportError:  # NumPy comes with the "vectordb" extra
+    np = None
+
+from langtree.core.utils import get_embedding_content
+
+
+class TestGetEmbeddingContent(unittest.TestCase):
+
+    def test_lists(self):
+        self.assertEqual(get_embedding_content([[1, 2], [3, 4]]), [[1.0, 2.0], [3.0, 4.0]])
+
+    def test_normalized_lists(self):
+        self.assertEqual(get_embedding_content([[3, 4], [0, 0]], normalize=True), [[0.6, 0.8], [0.0, 0.0]])
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_array(self):
+        matrix = get_embedding_content([[1, 2], [3, 4]], as_array=True)
+        self.assertIsInstance(matrix, np.ndarray)
+        self.assertEqual(matrix.dtype, np.float32)
+        self.assertEqual(matrix.shape, (2, 2))
+        self.assertTrue(matrix.flags["C_CONTIGUOUS"])
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_normalized_array(self):
+        matrix = get_embedding_content([[3, 4], [0, 0]], as_array=True, normalize=True)
+        np.testing.assert_allclose(matrix, [[0.6, 0.8], [0.0, 0.0]], rtol=1e-6)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_array_input_is_not_copied(self):
+        matrix = np.ones((2, 3), dtype=np.float32)
+        self.assertIs(get_embedding_content(matrix, as_array=True), matrix)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import importlib.util
+import threading
+import time
+import unittest
+
+from langtree.core.cache import EmbeddingCache
+
+from langtree.models.openai import OpenAIChatCompletion, OpenAIEmbedding, batch_documents, make_open_ai_embedding_call
+
+
+class StubEmbeddings:
+    """Mimics openai.Embedding.create, returning [len(doc), position] vectors in shuffled order."""
+
+    def __init__(self, delay=0.0, barrier=None):
+        self.delay = delay
+        self.barrier = barrier
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def __call__(self, input, model=None):
+        with self.lock:
+            self.requests.append(list(input))
+        if self.barrier is not None:
+            self.barrier.wait()
+        time.sleep(self.delay)
+        data = [{"index": i, "embedding": [len(doc), i]} for i, doc in enumerate(input)]
+        return {"data": list(reversed(data)), "model": model}
+
+
+class TestEmbeddingBatching(unittest.TestCase):
+
+    def test_batch_documents_by_count(self):
+        self.assertEqual(batch_documents(["a", "b", "c"], 2), [["a", "b"], ["c"]])
+
+    def test_batch_documents_by_tokens(self):
+        docs = ["a b", "c", "d e f", "g"]
+        self.assertEqual(batch_documents(docs, 10, max_batch_tokens=3, tokenizer=str.split),
+                         [["a b", "c"], ["d e f"], ["g"]])
+        self.assertEqual(batch_documents(["a b c d"], 10, max_batch_tokens=1, tokenizer=str.split), [["a b c d"]])
+        self.assertEqual(batch_documents([], 10), [])
+
+    def test_results_in_input_order(self):
+        stub = StubEmbeddings()
+        embed = make_open_ai_embedding_call(stub, batch_size=2)
+        docs = ["a", "bb", "ccc", "dddd", "eeeee"]
+        self.assertEqual([e[0] for e in embed(docs, model="m")], [1, 2, 3, 4, 5])
+        # Batches run on a thread pool, so only the results are in input order
+        self.assertEqual(sorted(stub.requests), [["a", "bb"], ["ccc", "dddd"], ["eeeee"]])
+
+    def test_batches_run_concurrently(self):
+        # Every request waits until all five are in flight, which fails unless they overlap
+        stub = StubEmbeddings(barrier=threading.Barrier(5, timeout=10))
+        embed = make_open_ai_embedding_call(stub, batch_size=1, max_workers=5)
+        self.assertEqual(len(embed(["a"] * 5)), 5)
+
+    def test_operator_with_stub(self):
+        stub = StubEmbeddings()
+        embedding = OpenAIEmbedding(create=stub, batch_size=3, model="text-embedding-ada-002")
+        self.assertEqual(embedding(["x", "yy", "zzz", "w"]), [[1.0, 0.0], [2.0, 1.0], [3.0, 2.0], [1.0, 0.0]])
+        self.assertEqual(len(stub.requests), 2)
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy is not installed")
+    def test_operator_array_output(self):
+        embedding = OpenAIEmbedding(create=StubEmbeddings(), as_array=True, normalize=True, model="m")
+        matrix = embedding(["abc", "abcd"])
+        self.assertEqual(matrix.dtype.name, "float32")
+        self.assertEqual(matrix.shape, (2, 2))
+        self.assertAlmostEqual(float((matrix[1] ** 2).sum()), 1.0, places=5)
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy is not installed")
+    def test_operator_with_cache(self):
+        stub = StubEmbeddings()
+        cache = EmbeddingCache()
+        embedding = OpenAIEmbedding(create=stub, cache=cache, model="m")
+        self.assertEqual(embedding(["a", "bb"]), [[1.0, 0.0], [2.0, 1.0]])
+        self.assertEqual(embedding(["ccc", "bb", "a"]), [[3.0, 0.0], [2.0, 1.0], [1.0, 0.0]])
+        self.assertEqual(stub.requests, [["a", "bb"], ["ccc"]])
+
+
+def fake_chat_completion(messages, model=None, stream=False):
+    """Mimics openai.ChatCompletion.create, streaming the reply as delta chunks."""
+    reply = "Hello there!"
+    if not stream:
+        return {"choices": [{"message": {"role": "assistant", "content": reply}}]}
+
+    def chunks():
+        yield {"choices": [{"delta": {"role": "assistant"}}]}
+        for i in range(0, len(reply), 5):
+            yield {"choices": [{"delta": {"content": reply[i:i + 5]}}]}
+        yield {"choices": [{"delta": {}, "finish_reason": "stop"}]}
+
+    return chunks()
+
+
+class TestChatStreaming(unittest.TestCase):
+
+    def test_stream_deltas(self):
+        chat = OpenAIChatCompletion(call=fake_chat_completion, model="gpt")
+        messages = [{"role": "user", "content": "hi"}]
+        self.assertEqual(list(chat.stream(messages=messages)), ["Hello", " ther", "e!"])
+        self.assertEqual(chat(messages=messages)["content"], "Hello there!")
+
+
+if __name__ == '__main__':
+    unittest.main()
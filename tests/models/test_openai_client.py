@@ -0,0 +1,126 @@
+import json
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from langtree.core.scheduler import Scheduler
+from langtree.models.openai import OpenAIChatCompletion, OpenAIClient, OpenAIEmbedding
+from langtree.prompting import SystemMessage, UserMessage
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """A keep-alive stub of the OpenAI REST API that records the connections it serves."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.headers.append(dict(self.headers))
+        if self.server.fail:
+            self.server.fail -= 1
+            return self.reply(429, {"error": {"message": "slow down"}}, {"Retry-After": "0.01"})
+
+        if self.path == "/v1/embeddings":
+            data = [{"index": i, "embedding": [len(text), 0.0]} for i, text in enumerate(body["input"])]
+            return self.reply(200, {"data": data})
+
+        content = body["messages"][-1]["content"]
+        if not body.get("stream"):
+            return self.reply(200, {"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+        events = b"".join(b"data: " + json.dumps({"choices": [{"delta": {"content": word}}]}).encode() + b"\n\n"
+                          for word in content.split())
+        events += b"data: [DONE]\n\n"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(len(events)))
+        self.end_headers()
+        self.wfile.write(events)
+
+    def reply(self, status, payload, headers=()):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in dict(headers).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestOpenAIClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.connections = 0
+        self.server.headers = []
+        self.server.fail = 0
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+        self.client = OpenAIClient(api_key="sk-test", api_base=f"http://127.0.0.1:{self.server.server_address[1]}/v1",
+                                   pool_size=4)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        chat = OpenAIChatCompletion(client=self.client, model="m")
+        for i in range(50):
+            self.assertEqual(chat(messages=[{"role": "user", "content": str(i)}])["content"], str(i))
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.server.headers[0]["Authorization"], "Bearer sk-test")
+
+    def test_message_objects_are_sent_as_dicts(self):
+        chat = OpenAIChatCompletion(client=self.client, model="m")
+        self.assertEqual(chat(messages=[SystemMessage("be brief"), UserMessage("hello")])["content"], "hello")
+
+    def test_pool_is_shared_between_threads(self):
+        chat = OpenAIChatCompletion(client=self.client, model="m")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda i: chat(messages=[{"content": str(i)}])["content"], range(100)))
+        self.assertEqual(results, [str(i) for i in range(100)])
+        self.assertLessEqual(self.server.connections, 4)
+
+    def test_streaming(self):
+        chat = OpenAIChatCompletion(client=self.client, model="m")
+        self.assertEqual(list(chat.stream(messages=[{"content": "one two three"}])), ["one", "two", "three"])
+        self.assertEqual(self.server.connections, 1)
+
+    def test_embeddings(self):
+        embedding = OpenAIEmbedding(client=self.client, batch_size=2, model="e")
+        self.assertEqual(embedding(["a", "bb", "ccc"]), [[1.0, 0.0], [2.0, 0.0], [3.0, 0.0]])
+
+    def test_missing_requests_is_explained(self):
+        with mock.patch.dict("sys.modules", {"requests": None, "requests.adapters": None}):
+            with self.assertRaisesRegex(ImportError, "pip install requests"):
+                OpenAIClient(api_key="sk-test")
+
+    def test_errors_can_be_retried_by_a_scheduler(self):
+        self.server.fail = 1
+        with self.assertRaises(requests.HTTPError) as context:
+            self.client.create_chat_completion(messages=[{"content": "x"}])
+        self.assertEqual(context.exception.response.status_code, 429)
+
+        self.server.fail = 2
+        chat = OpenAIChatCompletion(client=self.client, scheduler=Scheduler(max_backoff=0.01), model="m")
+        self.assertEqual(chat(messages=[{"content": "x"}])["content"], "x")
+        self.assertEqual(self.server.connections, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import pickle
+import tempfile
+import threading
+import time
+import unittest
+
+from langtree.core import Operator
+from langtree.operators import Checkpoint, Parallel, Sequential, chainable, map_chain
+
+
+def square(x):
+    return x * x
+
+
+def fail_on_three(x):
+    if x == 3:
+        raise ValueError("three")
+    return x
+
+
+@chainable
+def scale(x, factor=1):
+    return x * factor
+
+
+class Counter:
+    """Counts the items it sees, to check which items were run again."""
+
+    def __init__(self):
+        self.seen = []
+        self.lock = threading.Lock()
+
+    def __call__(self, x):
+        with self.lock:
+            self.seen.append(x)
+        return x + 1
+
+
+class TestMapChain(unittest.TestCase):
+
+    def test_process_pool_ordered(self):
+        chain = Sequential([Operator(call=square), scale(factor=3)])
+        results = list(map_chain(chain, range(20), max_workers=2, chunk_size=3))
+        self.assertEqual(results, [3 * x * x for x in range(20)])
+
+    def test_chainable_is_picklable(self):
+        operator = pickle.loads(pickle.dumps(scale(factor=2)))
+        self.assertEqual(operator(4), 8)
+        self.assertEqual(scale.__name__, "scale")
+        self.assertEqual(scale.__wrapped__.__qualname__, "scale")
+
+    def test_chainable_not_used_as_decorator(self):
+        operator = pickle.loads(pickle.dumps(chainable(square)(), protocol=pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(operator(3), 9)
+        self.assertEqual(square.__qualname__, "square")
+
+    def test_closures_fall_back_to_cloudpickle(self):
+        offset = 10
+        chain = Parallel([Operator(call=lambda x: x + offset), Operator(call=square)])
+        chain(1)  # creates the executor of the block, which must not be pickled
+        results = list(map_chain(chain, range(5), max_workers=2))
+        self.assertEqual(results, [[x + 10, x * x] for x in range(5)])
+
+    def test_unordered_yields_indexed_results(self):
+        def call(x):
+            time.sleep(0.02 if x == 0 else 0)
+            return x
+
+        results = list(map_chain(Operator(call=call), range(6), executor="thread", max_workers=3, ordered=False))
+        self.assertEqual(sorted(results), [(x, x) for x in range(6)])
+        self.assertNotEqual(results[0], (0, 0))
+
+    def test_bounded_in_flight(self):
+        consumed = []
+
+        def inputs():
+            for x in range(100):
+                consumed.append(x)
+                yield x
+
+        results = map_chain(Operator(call=square), inputs(), executor="thread", max_workers=2, max_in_flight=4)
+        self.assertEqual(next(results), 0)
+        self.assertLessEqual(len(consumed), 6)
+        self.assertEqual(list(results), [x * x for x in range(1, 100)])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            list(map_chain(Operator(call=fail_on_three), range(6), executor="thread"))
+
+        results = list(map_chain(Operator(call=fail_on_three), range(6), executor="serial", return_exceptions=True))
+        self.assertIsInstance(results[3], ValueError)
+        self.assertEqual(results[:3], [0, 1, 2])
+
+        with self.assertRaises(ValueError):
+            map_chain(Operator(call=square), range(3), chunk_size=0)
+
+    def test_checkpoint_resumes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "job.ckpt")
+
+            first = Counter()
+            results = map_chain(Operator(call=first), range(10), executor="serial", chunk_size=2, checkpoint=path)
+            self.assertEqual([next(results) for _ in range(4)], [1, 2, 3, 4])
+            results.close()
+
+            # A record cut short by a kill is ignored
+            with open(path, "ab") as f:
+                f.write(pickle.dumps([(8, 9)])[:-3])
+
+            second = Counter()
+            results = list(map_chain(Operator(call=second), range(10), executor="serial", chunk_size=2,
+                                     checkpoint=path))
+            self.assertEqual(results, list(range(1, 11)))
+            self.assertTrue(set(second.seen).isdisjoint(first.seen))
+            self.assertEqual(len(first.seen) + len(second.seen), 10)
+
+            with Checkpoint(path) as checkpoint:
+                self.assertEqual(len(checkpoint), 10)
@@ -0,0 +1,138 @@
+import gc
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from langtree.core import Operator
+from langtree.operators import Parallel, Sequential, SerialExecutor, acquire_executor, get_executor, release_executor
+
+
+def sleepy(seconds, value):
+    def call(x):
+        time.sleep(seconds)
+        return x + value
+    return Operator(call=call)
+
+
+def double(x):
+    return x * 2
+
+
+class TestExecutors(unittest.TestCase):
+
+    def test_get_executor(self):
+        self.assertIsInstance(get_executor(None), SerialExecutor)
+        self.assertIsInstance(get_executor("thread", 2), ThreadPoolExecutor)
+        pool = ThreadPoolExecutor(1)
+        self.assertIs(get_executor(pool), pool)
+        with self.assertRaises(ValueError):
+            get_executor("gpu")
+
+    def test_thread_results_keep_operation_order(self):
+        parallel = Parallel([sleepy(0.05, 1), sleepy(0.0, 2), sleepy(0.02, 3)], executor="thread")
+        self.assertEqual(parallel(10), [11, 12, 13])
+
+    def test_thread_branches_overlap(self):
+        parallel = Parallel([sleepy(0.1, i) for i in range(5)], executor="thread", max_workers=5)
+        start = time.perf_counter()
+        parallel(0)
+        self.assertLess(time.perf_counter() - start, 0.4)
+
+    def test_process_executor(self):
+        parallel = Parallel([Operator(call=double), Operator(call=double)], executor="process", max_workers=2)
+        self.assertEqual(parallel(4), [8, 8])
+
+    def test_timeout(self):
+        parallel = Parallel([sleepy(0.5, 1), sleepy(0.0, 2)], executor="thread", timeout=0.05)
+        with self.assertRaises(TimeoutError):
+            parallel(0)
+
+    def test_failure_cancels_pending_branches(self):
+        started = []
+
+        def fail(x):
+            raise RuntimeError("boom")
+
+        def record(x):
+            started.append(x)
+            return x
+
+        parallel = Parallel([Operator(call=fail), Operator(call=record)])
+        with self.assertRaises(RuntimeError):
+            parallel(1)
+        self.assertEqual(started, [])
+
+        gate = threading.Event()
+        blocker = Operator(call=lambda x: gate.wait(1))
+        parallel = Parallel([Operator(call=fail), blocker, Operator(call=record)], executor="thread", max_workers=1)
+        with self.assertRaises(RuntimeError):
+            try:
+                parallel(1)
+            finally:
+                gate.set()
+        self.assertEqual(started, [])
+
+    def test_shared_pools(self):
+        first = acquire_executor("thread", 3)
+        second = acquire_executor("thread", 3)
+        self.assertIs(first, second)
+        self.assertIsNot(acquire_executor("thread", 4), first)
+        release_executor(get_executor("thread", 4))
+        release_executor(first)
+        self.assertEqual(first.submit(double, 2).result(), 4)
+        release_executor(second)
+        with self.assertRaises(RuntimeError):
+            first.submit(double, 2)
+
+    def test_close_releases_the_pool(self):
+        with Parallel([sleepy(0, 1), sleepy(0, 2)], executor="thread", max_workers=7) as parallel:
+            self.assertEqual(parallel(0), [1, 2])
+            pool = parallel._executor
+        with self.assertRaises(RuntimeError):
+            pool.submit(double, 2)
+        # A closed block acquires a pool again when it is called
+        self.assertEqual(parallel(1), [2, 3])
+        parallel.close()
+
+    def test_collected_block_releases_the_pool(self):
+        parallel = Parallel([sleepy(0, 1)], executor="thread", max_workers=9)
+        parallel(0)
+        pool = parallel._executor
+        del parallel
+        gc.collect()
+        with self.assertRaises(RuntimeError):
+            pool.submit(double, 2)
+
+    def test_nested_block_on_the_same_pool(self):
+        inner = Parallel([sleepy(0, 1), sleepy(0, 2)], executor="thread", max_workers=1)
+        outer = Parallel([inner, sleepy(0, 3)], executor="thread", max_workers=1, timeout=5)
+        with Sequential([outer]) as chain:
+            self.assertEqual(chain(0), [[1, 2], 3])
+
+    def test_nested_block_keeps_its_settings(self):
+        def mutate(history):
+            history.append("branch")
+            return len(history)
+
+        inner = Parallel([Operator(call=len)], executor="thread", isolation="shared")
+        parallel = Parallel([Operator(call=mutate), inner])
+        self.assertIs(parallel.operations[1], inner)
+        self.assertEqual(parallel(["a"]), [2, [1]])
+
+    def test_add_merges_branches(self):
+        parallel = Parallel([Operator(call=double)]) + Parallel([Operator(call=lambda x: x + 3)])
+        self.assertEqual(parallel(3), [6, 6])
+        parallel += Parallel([Operator(call=double)], isolation="copy-on-write")
+        self.assertEqual(parallel(3), [6, 6, 6])
+        self.assertEqual(len(parallel.operations), 3)
+
+    def test_add_keeps_executor(self):
+        parallel = Parallel([sleepy(0, 1)], executor="thread", timeout=1) + sleepy(0, 2)
+        self.assertEqual(parallel.executor, "thread")
+        self.assertEqual(parallel.timeout, 1)
+        self.assertEqual(parallel(0), [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,5 @@
+import asyncio
+import time
 import unittest
 from langtree.core import Operator
 from langtree.operators import Sequential, Parallel, chainable
@@ -124,5 +126,106 @@ class TestEdgeCases(unittest.TestCase):
         self.assertNotIsInstance(result, tuple)
 
 
+class TestStreamingSequential(unittest.TestCase):
+
+    def make_streamer(self):
+        def call(prompt, stream=False):
+            words = prompt.split()
+            return iter(words) if stream else " ".join(words)
+
+        return Operator(call=call, parse=None)
+
+    def test_stream_forwards_to_last_stage(self):
+        calls = []
+        prompt = Operator(call=lambda topic: calls.append(topic) or f"tell me about {topic}", parse=None)
+        sequential = Sequential([prompt, self.make_streamer()])
+        self.assertEqual(list(sequential.stream("cats")), ["tell", "me", "about", "cats"])
+        self.assertEqual(list(sequential("dogs", stream=True)), ["tell", "me", "about", "dogs"])
+        self.assertEqual(sequential("birds"), "tell me about birds")
+        self.assertEqual(calls, ["cats", "dogs", "birds"])
+
+    def test_single_stage_receives_kwargs(self):
+        sequential = Sequential([self.make_streamer()])
+        self.assertEqual(list(sequential.stream(prompt="x y")), ["x", "y"])
+
+    def test_non_streaming_last_stage(self):
+        sequential = Sequential([Operator(call=lambda x: x + 1), Parallel([Operator(call=lambda x: x * 2)])])
+        self.assertEqual(list(sequential.stream(1)), [[4]])
+
+    def test_plain_last_stage_yields_once(self):
+        sequential = Sequential([Operator(call=lambda x: x + 1)])
+        self.assertFalse(sequential.streams)
+        self.assertEqual(list(sequential.stream(1)), [2])
+        sequential = Sequential([Operator(call=lambda x: x * 2), Operator(call=lambda x: x + 1)])
+        self.assertEqual(list(sequential.stream(1)), [3])
+
+    def test_stream_argument_reaches_plain_first_stage(self):
+        sequential = Sequential([Operator(call=lambda **kwargs: kwargs), Operator(call=lambda output: output)])
+        self.assertEqual(sequential(stream=True), {"stream": True})
+
+
+class TestAsyncOperators(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_sequential(self):
+        async def add_one(x):
+            return x + 1
+
+        sequential = Sequential([Operator(call=add_one), Operator(call=lambda x: x * 2)])
+        self.assertEqual(await sequential.acall(5), 12)
+
+    async def test_async_parallel_gathers_in_order(self):
+        async def delayed(x, delay=0):
+            await asyncio.sleep(delay)
+            return x + delay
+
+        op1 = Operator(call=delayed)
+        op1.freeze_call(delay=0.05)
+        op2 = Operator(call=delayed)
+        parallel = Parallel([op1, op2, Sequential([Operator(call=lambda x: x * 2)])])
+
+        start = time.perf_counter()
+        self.assertEqual(await parallel.acall(1), [1.05, 1, 2])
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    async def test_async_parallel_concurrency_limit(self):
+        running = []
+        peak = []
+
+        async def track(x):
+            running.append(x)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(x)
+            return x
+
+        parallel = Parallel([Operator(call=track) for _ in range(6)], max_workers=2)
+        await parallel.acall(1)
+        self.assertEqual(max(peak), 2)
+
+    async def test_async_parallel_cancels_on_failure(self):
+        cancelled = asyncio.Event()
+
+        async def slow(x):
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def fail(x):
+            raise RuntimeError("boom")
+
+        parallel = Parallel([Operator(call=slow), Operator(call=fail)])
+        with self.assertRaises(RuntimeError):
+            await parallel.acall(1)
+        await asyncio.sleep(0)
+        self.assertTrue(cancelled.is_set())
+
+    async def test_async_parallel_timeout(self):
+        parallel = Parallel([Operator(call=lambda x: time.sleep(0.2))], timeout=0.01)
+        with self.assertRaises(asyncio.TimeoutError):
+            await parallel.acall(1)
+
+
 if __name__ == '__main__':
     unittest.main()
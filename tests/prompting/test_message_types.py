@@ -0,0 +1,89 @@
+import copy
+import json
+import pickle
+import unittest
+
+from langtree.core import make_cache_key
+from langtree.prompting import (AssistantMessage, ChatMessage, FunctionMessage, SystemMessage, UserMessage,
+                                to_wire)
+
+
+class TestMessageTypes(unittest.TestCase):
+
+    def test_reads_like_a_dict(self):
+        message = UserMessage(content="hi")
+        self.assertEqual(message, {"role": "user", "content": "hi"})
+        self.assertEqual(dict(message), {"role": "user", "content": "hi"})
+        self.assertEqual(message["content"], "hi")
+        self.assertEqual(message.get("role"), "user")
+        self.assertIsNone(message.get("name"))
+        self.assertEqual(message, ChatMessage(role="user", content="hi"))
+        self.assertNotEqual(message, AssistantMessage(content="hi"))
+        self.assertNotIsInstance(message, SystemMessage)
+
+    def test_is_a_dict(self):
+        messages = [UserMessage(content="hi"), FunctionMessage("42", name="answer")]
+        self.assertIsInstance(messages[0], dict)
+        self.assertEqual(json.loads(json.dumps(messages)), [{"role": "user", "content": "hi"},
+                                                           {"role": "function", "name": "answer", "content": "42"}])
+        self.assertEqual(dict(**messages[0]), {"role": "user", "content": "hi"})
+
+    def test_hash(self):
+        self.assertEqual(hash(UserMessage("a")), hash(ChatMessage("user", "a")))
+        self.assertEqual(len({UserMessage("a"), UserMessage("a"), UserMessage("b")}), 2)
+        multimodal = UserMessage([{"type": "text", "text": "hi"}])
+        self.assertEqual(hash(multimodal), hash(UserMessage([{"type": "text", "text": "hi"}])))
+        self.assertIn(multimodal, {multimodal})
+
+    def test_immutable(self):
+        message = SystemMessage(content="be nice")
+        for mutate in (lambda: message.__setitem__("content", "be mean"), lambda: message.update(content="x"),
+                       lambda: message.pop("content"), message.clear):
+            with self.assertRaises(TypeError):
+                mutate()
+        with self.assertRaises(AttributeError):
+            message.content = "be mean"
+        with self.assertRaises(AttributeError):
+            message.extra = 1
+
+        updated = message(content="be brief")
+        self.assertEqual(message.content, "be nice")
+        self.assertIsInstance(updated, SystemMessage)
+        self.assertEqual(updated.content, "be brief")
+        with self.assertRaises(KeyError):
+            message(name="x")
+
+    def test_copies_share_the_message(self):
+        message = UserMessage(content="hi")
+        self.assertIs(copy.copy(message), message)
+        self.assertIs(copy.deepcopy([message])[0], message)
+
+    def test_deepcopy_copies_mutable_content(self):
+        for message in (UserMessage(content=[{"type": "text", "text": "hi"}]), ChatMessage("tool", ["a"]),
+                        FunctionMessage(["c"], name="f")):
+            copied = copy.deepcopy(message)
+            self.assertIs(type(copied), type(message))
+            self.assertEqual(copied, message)
+            copied.content.append("more")
+            self.assertEqual(len(message.content), 1)
+
+    def test_pickle(self):
+        for message in (UserMessage("a"), ChatMessage("tool", "b"), FunctionMessage("c", name="f")):
+            restored = pickle.loads(pickle.dumps(message))
+            self.assertIs(type(restored), type(message))
+            self.assertEqual(restored, message)
+
+    def test_slots_and_interned_roles(self):
+        self.assertFalse(hasattr(UserMessage("a"), "__dict__"))
+        role = "".join(["assis", "tant"])
+        self.assertIs(ChatMessage(role, "a").role, AssistantMessage("b").role)
+
+    def test_wire_format(self):
+        messages = [SystemMessage("s"), FunctionMessage("42", name="answer"), {"role": "user", "content": "u"}]
+        wire = to_wire(messages)
+        self.assertEqual(wire, [{"role": "system", "content": "s"},
+                                {"role": "function", "name": "answer", "content": "42"},
+                                {"role": "user", "content": "u"}])
+        self.assertIs(type(wire[0]), dict)
+        self.assertEqual(make_cache_key(print, (), {"messages": messages}),
+                         make_cache_key(print, (), {"messages": wire}))
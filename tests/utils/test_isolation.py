@@ -0,0 +1,201 @@
+import copy
+import pickle
+import unittest
+from collections import OrderedDict, defaultdict
+
+from langtree.core import Operator
+from langtree.operators import Parallel
+from langtree.prompting import UserMessage
+from langtree.utils.data import Data
+from langtree.utils.isolation import copy_on_write, isolate, readonly
+
+
+class TestReadOnly(unittest.TestCase):
+
+    def test_readonly_blocks_mutation(self):
+        history = readonly([UserMessage(content="hi"), {"a": [1, 2]}])
+        with self.assertRaises(TypeError):
+            history.append(1)
+        with self.assertRaises(TypeError):
+            history[1]["a"].append(3)
+        with self.assertRaises(TypeError):
+            history[0]["content"] = "changed"
+
+    def test_readonly_keeps_types_and_values(self):
+        message = readonly(UserMessage(content="hi"))
+        self.assertIsInstance(message, UserMessage)
+        self.assertEqual(message, {"role": "user", "content": "hi"})
+        self.assertEqual(message.content, "hi")
+        self.assertEqual(readonly([1, [2]]) + [3], [1, [2], 3])
+
+    def test_readonly_ordered_and_default_dicts(self):
+        ordered = readonly(OrderedDict([("b", 1), ("a", 2)]))
+        self.assertIsInstance(ordered, OrderedDict)
+        self.assertEqual(list(ordered.items()), [("b", 1), ("a", 2)])
+        self.assertEqual(list(pickle.loads(pickle.dumps(ordered)).items()), [("b", 1), ("a", 2)])
+
+        counts = readonly(defaultdict(list, {"a": [1]}))
+        self.assertIs(counts.default_factory, list)
+        self.assertEqual(counts["a"], [1])
+        self.assertIs(pickle.loads(pickle.dumps(counts)).default_factory, list)
+        with self.assertRaises(TypeError):
+            counts["missing"]
+
+    def test_readonly_message_content(self):
+        message = readonly(UserMessage(content=[{"type": "text", "text": "hi"}]))
+        self.assertIsInstance(message, UserMessage)
+        self.assertEqual(message.content, [{"type": "text", "text": "hi"}])
+        with self.assertRaises(TypeError):
+            message.content.append({"type": "text", "text": "more"})
+        with self.assertRaises(TypeError):
+            message.content[0]["text"] = "changed"
+
+    def test_readonly_pickles(self):
+        message = pickle.loads(pickle.dumps(readonly([UserMessage(content="hi")])))
+        self.assertIsInstance(message[0], UserMessage)
+        with self.assertRaises(TypeError):
+            message[0]["content"] = "changed"
+
+
+class TestCopyOnWrite(unittest.TestCase):
+
+    def test_mutations_do_not_leak(self):
+        source = [{"role": "user", "content": "hi"}, [1, 2]]
+        view = copy_on_write(source)
+        view[0]["content"] = "changed"
+        view[1].append(3)
+        view.append("new")
+        for item in view:
+            if isinstance(item, list):
+                item.append(4)
+        self.assertEqual(source, [{"role": "user", "content": "hi"}, [1, 2]])
+        self.assertEqual(view, [{"role": "user", "content": "changed"}, [1, 2, 3, 4], "new"])
+
+    def test_copies_of_the_view_do_not_leak(self):
+        source = {"a": [1], "b": {"c": [2]}}
+        for copy_view in (dict, lambda view: {**view}, lambda view: (lambda **kwargs: kwargs)(**view),
+                          lambda view: dict(view.items())):
+            view = copy_on_write(source)
+            copied = copy_view(view)
+            copied["a"].append(2)
+            copied["b"]["c"].append(3)
+        self.assertEqual(source, {"a": [1], "b": {"c": [2]}})
+
+        nested = [[1], [2]]
+        for copy_view in (list, lambda view: [*view], lambda view: view[:], tuple):
+            copy_view(copy_on_write(nested))[0].append(3)
+        self.assertEqual(nested, [[1], [2]])
+
+    def test_assigned_objects_keep_their_alias(self):
+        view = copy_on_write({"a": [1]})
+        mine = []
+        view["x"] = mine
+        view["x"].append(1)
+        self.assertEqual(mine, [1])
+
+        view = copy_on_write([[1]])
+        view.append(mine)
+        view[1].append(2)
+        self.assertEqual(mine, [1, 2])
+
+    def test_shared_children_get_one_copy(self):
+        child = [1]
+        view = copy_on_write({"a": child, "b": child})
+        view["a"].append(2)
+        self.assertIs(view["a"], view["b"])
+        self.assertEqual(child, [1])
+
+    def test_untouched_children_are_shared(self):
+        child = [1, 2]
+        view = copy_on_write([child])
+        self.assertIs(list.__getitem__(view, 0), child)
+        self.assertIsNot(view[0], child)
+        self.assertIs(view[0], view[0])
+
+    def test_data_subclass(self):
+        source = Data(role="user", content="hi")
+        view = copy_on_write(source)
+        self.assertIsInstance(view, Data)
+        view(content="changed")
+        self.assertEqual(source["content"], "hi")
+        self.assertEqual(copy.deepcopy(view)["content"], "changed")
+
+    def test_ordered_and_default_dicts(self):
+        source = OrderedDict([("b", [1]), ("a", [2])])
+        view = copy_on_write(source)
+        view["b"].append(3)
+        view["c"] = [4]
+        self.assertEqual(list(view), ["b", "a", "c"])
+        self.assertEqual(view.pop("a"), [2])
+        self.assertEqual(list(view.items()), [("b", [1, 3]), ("c", [4])])
+        self.assertEqual(source, OrderedDict([("b", [1]), ("a", [2])]))
+
+        counts = defaultdict(list, {"a": [1]})
+        view = copy_on_write(counts)
+        self.assertIs(view.default_factory, list)
+        view["a"].append(2)
+        view["new"].append(3)
+        self.assertEqual(dict(view), {"a": [1, 2], "new": [3]})
+        self.assertEqual(counts, {"a": [1]})
+        self.assertIs(pickle.loads(pickle.dumps(view)).default_factory, list)
+
+    def test_nested_copy_on_write(self):
+        source = [[1]]
+        outer = copy_on_write(source)
+        inner = copy_on_write(outer)
+        inner[0].append(2)
+        self.assertEqual(outer, [[1]])
+        self.assertEqual(source, [[1]])
+
+
+class TestIsolate(unittest.TestCase):
+
+    def test_shared_uses_one_view(self):
+        inputs = isolate(([1],), {"a": {"b": 1}}, "shared", 3)
+        self.assertEqual(len(inputs), 3)
+        self.assertIs(inputs[0][0][0], inputs[2][0][0])
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            isolate((), {}, "borrow", 1)
+        with self.assertRaises(ValueError):
+            Parallel([], isolation="borrow")
+
+    def test_parallel_policies(self):
+        def mutate(history):
+            history.append("branch")
+            return len(history)
+
+        for policy in ("deepcopy", "copy-on-write"):
+            history = ["a"]
+            parallel = Parallel([Operator(call=mutate), Operator(call=mutate)], isolation=policy)
+            self.assertEqual(parallel(history), [2, 2])
+            self.assertEqual(history, ["a"])
+
+        parallel = Parallel([Operator(call=mutate)], isolation="shared")
+        with self.assertRaises(TypeError):
+            parallel(["a"])
+
+        parallel = Parallel([Operator(call=len), Operator(call=len)], isolation="shared")
+        self.assertEqual(parallel(["a", "b"]), [2, 2])
+
+        def extend(history):
+            history[0].content.append("branch")
+            return len(history[0].content)
+
+        for policy in ("deepcopy", "copy-on-write"):
+            history = [UserMessage(content=["part"])]
+            parallel = Parallel([Operator(call=extend), Operator(call=extend)], isolation=policy)
+            self.assertEqual(parallel(history), [2, 2])
+            self.assertEqual(history[0].content, ["part"])
+
+        for policy in ("shared", "copy-on-write", "deepcopy"):
+            ordered = OrderedDict([("b", 1), ("a", 2)])
+            self.assertEqual(Parallel([Operator(call=lambda d: list(d.items()))], isolation=policy)(ordered),
+                             [[("b", 1), ("a", 2)]])
+            self.assertEqual(Parallel([Operator(call=lambda d: d.default_factory)], isolation=policy)(
+                defaultdict(int, {"x": 1})), [int])
+
+
+if __name__ == '__main__':
+    unittest.main()
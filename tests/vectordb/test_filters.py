@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+except ImportError:  # NumPy comes with the "vectordb" extra
+    raise unittest.SkipTest("numpy is not installed")
+
+from langtree.vectordb import IVFVectorDatabase, MemoryVectorDatabase
+from langtree.vectordb.filters import MetadataIndex
+
+
+class TestMetadataIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = MetadataIndex()
+        self.index.add(0, [
+            {"tenant": "a", "year": 2019, "tags": ["x", "y"]},
+            {"tenant": "b", "year": 2021, "tags": ["y"]},
+            {"tenant": "a", "year": 2023, "extra": {"unhashable": True}},
+            "not a mapping",
+            {"tenant": "c", "year": "unknown"},
+        ])
+
+    def matches(self, filter):
+        return np.flatnonzero(self.index.mask(filter, 5)).tolist()
+
+    def test_equality(self):
+        self.assertEqual(self.matches({"tenant": "a"}), [0, 2])
+        self.assertEqual(self.matches({"tenant": {"$eq": "b"}}), [1])
+        self.assertEqual(self.matches({"tenant": "z"}), [])
+
+    def test_in(self):
+        self.assertEqual(self.matches({"tenant": {"$in": ["b", "c"]}}), [1, 4])
+        self.assertEqual(self.matches({"tenant": {"$in": ("a",)}}), [0, 2])
+
+    def test_in_needs_a_list(self):
+        # A string would otherwise match each of its characters
+        with self.assertRaises(ValueError):
+            self.matches({"tenant": {"$in": "abc"}})
+
+    def test_range(self):
+        self.assertEqual(self.matches({"year": {"$gte": 2020}}), [1, 2])
+        self.assertEqual(self.matches({"year": {"$gt": 2019, "$lt": 2023}}), [1])
+
+    def test_list_values_and_conjunction(self):
+        self.assertEqual(self.matches({"tags": "y"}), [0, 1])
+        self.assertEqual(self.matches({"tags": "y", "tenant": "a"}), [0])
+
+    def test_range_bounds_are_exact(self):
+        index = MetadataIndex()
+        index.add(0, [{"t": t} for t in (5, 1, 3, 3.5, 3, True, "3")])
+        self.assertEqual(sorted(index.range("t", {"$gte": 3, "$lte": 3.5}).tolist()), [2, 3, 4])
+        self.assertEqual(sorted(index.range("t", {"$gt": 3}).tolist()), [0, 3])
+        self.assertEqual(sorted(index.range("t", {"$lt": 3}).tolist()), [1])
+        self.assertEqual(index.range("t", {"$gt": 4, "$lt": 2}).tolist(), [])
+        self.assertEqual(index.range("t", {"$gte": "3"}).tolist(), [6])
+        self.assertEqual(index.range("t", {"$gte": 0, "$lt": "9"}).tolist(), [])
+
+    def test_booleans_are_not_numbers(self):
+        index = MetadataIndex()
+        index.add(0, [{"flag": True}, {"flag": 1}, {"flag": 1.0}, {"flag": False}, {"flag": 0}])
+        self.assertEqual(index.ids("flag", True).tolist(), [0])
+        self.assertEqual(index.ids("flag", 1).tolist(), [1, 2])
+        self.assertEqual(index.ids("flag", False).tolist(), [3])
+        self.assertEqual(index.range("flag", {"$gte": 0}).tolist(), [4, 1, 2])
+
+    def test_inserts_after_a_range_query(self):
+        index = MetadataIndex()
+        index.add(0, [{"t": t} for t in range(0, 100, 2)])
+        self.assertEqual(len(index.range("t", {"$gte": 50})), 25)
+        index.add(50, [{"t": t} for t in range(1, 100, 2)])
+        self.assertEqual(len(index.range("t", {"$gte": 50})), 50)
+
+    def test_unknown_operator(self):
+        with self.assertRaises(ValueError):
+            self.matches({"year": {"$near": 2020}})
+
+
+class TestFilteredQueries(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(0)
+        cls.data = rng.normal(size=(4000, 16)).astype(np.float32)
+        cls.metadata = [{"tenant": f"t{i % 40}", "i": i} for i in range(len(cls.data))]
+        cls.query = rng.normal(size=16).astype(np.float32)
+
+    def expected(self, tenant, k):
+        rows = [i for i, m in enumerate(self.metadata) if m["tenant"] == tenant]
+        data = self.data[rows] / np.linalg.norm(self.data[rows], axis=1, keepdims=True)
+        order = np.argsort(-(data @ (self.query / np.linalg.norm(self.query))))[:k]
+        return [self.metadata[rows[j]] for j in order]
+
+    def test_exact_top_k_within_subset(self):
+        db = MemoryVectorDatabase()
+        db.insert(self.data, metadata=self.metadata)
+        self.assertEqual(db.query(self.query, top_k=10, filter={"tenant": "t7"}), self.expected("t7", 10))
+        self.assertEqual(len(db.query(self.query, top_k=500, filter={"tenant": "t7"})), 100)
+
+    def test_empty_database(self):
+        for db in (MemoryVectorDatabase(), IVFVectorDatabase()):
+            ids, scores = db.search(self.query, filter={"tenant": "t7"})
+            self.assertEqual((ids.shape, scores.shape), ((1, 0), (1, 0)))
+            self.assertEqual(db.query(self.query, filter={"tenant": "t7"}), [])
+
+    def test_filters_survive_persistence(self):
+        db = MemoryVectorDatabase()
+        db.insert(self.data[:2000], metadata=self.metadata[:2000])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "index")
+            db.save(path)
+            loaded = MemoryVectorDatabase.load(path)
+            loaded.insert(self.data[2000:], metadata=self.metadata[2000:])
+            self.assertEqual(loaded.query(self.query, top_k=10, filter={"tenant": "t7"}), self.expected("t7", 10))
+
+    def test_ivf_filters(self):
+        db = IVFVectorDatabase(nlist=16, nprobe=16)
+        db.insert(self.data, metadata=self.metadata)
+        self.assertTrue(db.is_trained)
+        self.assertEqual(db.query(self.query, top_k=10, filter={"tenant": "t3"}), self.expected("t3", 10))
+        broad = db.query(self.query, top_k=10, filter={"i": {"$lt": 3000}})
+        self.assertTrue(all(m["i"] < 3000 for m in broad))
+        self.assertEqual(len(broad), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
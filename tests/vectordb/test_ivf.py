@@ -0,0 +1,84 @@
+import unittest
+
+try:
+    import numpy as np
+except ImportError:  # NumPy comes with the "vectordb" extra
+    raise unittest.SkipTest("numpy is not installed")
+
+from langtree.vectordb import IVFVectorDatabase, MemoryVectorDatabase, kmeans
+from langtree.vectordb.utils import recall_at_k
+
+
+def clustered(rng, n, dim=32, clusters=64):
+    centers = rng.normal(size=(clusters, dim))
+    return (centers[rng.integers(clusters, size=n)] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+class TestKMeans(unittest.TestCase):
+
+    def test_finds_separated_clusters(self):
+        rng = np.random.default_rng(0)
+        data = np.concatenate([rng.normal(loc, 0.1, size=(50, 2)) for loc in (-5, 5)]).astype(np.float32)
+        centroids = kmeans(data, 2)
+        self.assertEqual(sorted(np.round(centroids[:, 0]).tolist()), [-5.0, 5.0])
+
+    def test_empty_input(self):
+        with self.assertRaises(ValueError):
+            kmeans(np.empty((0, 2), dtype=np.float32), 2)
+
+
+class TestIVFVectorDatabase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(42)
+        cls.data = clustered(rng, 20_000)
+        cls.queries = clustered(rng, 200)
+
+    def build(self, metric="cosine", **kwargs):
+        exact = MemoryVectorDatabase(metric=metric)
+        exact.insert(self.data)
+        index = IVFVectorDatabase(metric=metric, nlist=64, **kwargs)
+        index.insert(self.data)
+        return exact, index
+
+    def test_untrained_index_is_exact(self):
+        index = IVFVectorDatabase(nlist=4, train_size=100)
+        index.insert(self.data[:50], metadata=list(range(50)))
+        self.assertFalse(index.is_trained)
+        exact = MemoryVectorDatabase()
+        exact.insert(self.data[:50], metadata=list(range(50)))
+        self.assertEqual(index.query(self.queries[:3], 5), exact.query(self.queries[:3], 5))
+
+    def test_recall_against_exact_search(self):
+        for metric in ("cosine", "l2"):
+            exact, index = self.build(metric)
+            self.assertTrue(index.is_trained)
+            truth, _ = exact.search(self.queries, 10)
+
+            self.assertGreaterEqual(recall_at_k(index.search(self.queries, 10, nprobe=8)[0], truth), 0.9)
+            self.assertEqual(recall_at_k(index.search(self.queries, 10, nprobe=64)[0], truth), 1.0)
+
+    def test_train_empty_index(self):
+        index = IVFVectorDatabase(nlist=4)
+        with self.assertRaises(ValueError):
+            index.train()
+        self.assertFalse(index.is_trained)
+
+    def test_incremental_insert_after_training(self):
+        _, index = self.build()
+        lists_before = sum(len(ids) for ids in index._lists)
+        index.insert([1.0] * 32, metadata="new")
+        self.assertEqual(sum(len(ids) for ids in index._lists), lists_before + 1)
+        self.assertEqual(index.query([1.0] * 32, top_k=1, nprobe=2), ["new"])
+
+    def test_pads_when_lists_are_small(self):
+        index = IVFVectorDatabase(nlist=2, nprobe=1, train_size=4)
+        index.insert(np.array([[1, 0], [1, 0.1], [-1, 0], [-1, -0.1]], dtype=np.float32), metadata=list("abcd"))
+        ids, scores = index.search([1.0, 0.05], top_k=3)
+        self.assertEqual(ids[0, 2], -1)
+        self.assertEqual(sorted(index.query([1.0, 0.05], top_k=3)), ["a", "b"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import copy
+import pickle
+import unittest
+
+try:
+    import numpy as np
+except ImportError:  # NumPy comes with the "vectordb" extra
+    raise unittest.SkipTest("numpy is not installed")
+
+from langtree.vectordb import MemoryVectorDatabase
+
+
+class TestMemoryVectorDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def brute_force(self, data, queries, k, metric):
+        if metric == "cosine":
+            data = data / np.linalg.norm(data, axis=1, keepdims=True)
+            queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+        if metric == "l2":
+            scores = -((queries[:, None, :] - data[None, :, :]) ** 2).sum(-1)
+        else:
+            scores = queries @ data.T
+        return np.argsort(-scores, axis=1)[:, :k]
+
+    def test_metrics_match_brute_force(self):
+        data = self.rng.normal(size=(500, 16)).astype(np.float32)
+        queries = self.rng.normal(size=(20, 16)).astype(np.float32)
+        for metric in ("cosine", "dot", "l2"):
+            db = MemoryVectorDatabase(metric=metric, capacity=8)
+            db.insert(data, metadata=list(range(len(data))))
+            self.assertEqual(db.query(queries, top_k=5), self.brute_force(data, queries, 5, metric).tolist())
+
+    def test_incremental_inserts_grow_storage(self):
+        db = MemoryVectorDatabase(dim=2, capacity=1)
+        for i in range(10):
+            db.insert([float(i), 1.0], metadata=f"doc{i}")
+        self.assertEqual(len(db), 10)
+        self.assertEqual(db.vectors.shape, (10, 2))
+        self.assertEqual(db.query([9.0, 1.0], top_k=1), ["doc9"])
+
+    def test_single_query_and_scores(self):
+        db = MemoryVectorDatabase(metric="dot")
+        db.insert(np.eye(3, dtype=np.float32), metadata=["x", "y", "z"])
+        self.assertEqual(db.query([0, 2, 1], top_k=2), ["y", "z"])
+        ids, scores = db.search([0, 2, 1], top_k=5)
+        self.assertEqual(ids.tolist(), [[1, 2, 0]])
+        self.assertEqual(scores.tolist(), [[2.0, 1.0, 0.0]])
+
+    def test_empty_index(self):
+        self.assertEqual(MemoryVectorDatabase().query([1.0, 0.0], top_k=3), [])
+
+    def test_invalid_input(self):
+        db = MemoryVectorDatabase(dim=3)
+        with self.assertRaises(ValueError):
+            db.insert([1.0, 2.0])
+        with self.assertRaises(ValueError):
+            db.insert(np.ones((2, 3)), metadata=["only one"])
+        with self.assertRaises(ValueError):
+            MemoryVectorDatabase(metric="hamming")
+
+    def test_copy_and_pickle(self):
+        db = MemoryVectorDatabase()
+        db.insert([1.0, 0.0], metadata="a")
+        self.assertEqual(copy.deepcopy(db).query([1.0, 0.0], 1), ["a"])
+        self.assertEqual(pickle.loads(pickle.dumps(db)).query([1.0, 0.0], 1), ["a"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    import numpy as np
+except ImportError:  # NumPy comes with the "vectordb" extra
+    raise unittest.SkipTest("numpy is not installed")
+
+from langtree.core.registry import VECTOR_DATABASES
+from langtree.vectordb import IVFVectorDatabase, MemoryVectorDatabase
+from langtree.vectordb.persistence import load_index
+
+
+class TestPersistence(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "index")
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip_is_memory_mapped(self):
+        for metric in ("cosine", "dot", "l2"):
+            path = os.path.join(self.directory.name, metric)
+            db = MemoryVectorDatabase(metric=metric)
+            data = self.rng.normal(size=(100, 8)).astype(np.float32)
+            db.insert(data, metadata=[{"id": i} for i in range(100)])
+            db.save(path)
+
+            loaded = MemoryVectorDatabase.load(path)
+            self.assertIsInstance(loaded._segments[0][0], np.memmap)
+            self.assertFalse(loaded._segments[0][0].flags.writeable)
+            self.assertEqual(loaded.metric, metric)
+            self.assertEqual(loaded.query(data[:5], top_k=3), db.query(data[:5], top_k=3))
+
+    def test_append_writes_only_a_new_segment(self):
+        db = MemoryVectorDatabase()
+        db.insert(self.rng.normal(size=(10, 4)), metadata=list(range(10)))
+        db.save(self.path)
+        first = os.path.join(self.path, "segment-00000.vectors.npy")
+        modified = os.stat(first).st_mtime_ns
+
+        loaded = MemoryVectorDatabase.load(self.path)
+        loaded.insert(np.ones((3, 4)), metadata=["a", "b", "c"])
+        loaded.save(self.path)
+
+        self.assertEqual(os.stat(first).st_mtime_ns, modified)
+        with open(os.path.join(self.path, "manifest.json")) as f:
+            manifest = json.load(f)
+        self.assertEqual([segment["rows"] for segment in manifest["segments"]], [10, 3])
+
+        reloaded = MemoryVectorDatabase.load(self.path)
+        self.assertEqual(len(reloaded), 13)
+        self.assertEqual(reloaded.query([1, 1, 1, 1], top_k=3), ["a", "b", "c"])
+        self.assertEqual(reloaded.metadata[:10], list(range(10)))
+
+    def test_refuses_to_overwrite_another_index(self):
+        db = MemoryVectorDatabase()
+        db.insert([1.0, 0.0])
+        db.save(self.path)
+        other = MemoryVectorDatabase()
+        other.insert([0.0, 1.0])
+        with self.assertRaises(FileExistsError):
+            other.save(self.path)
+
+    def test_missing_index(self):
+        with self.assertRaises(FileNotFoundError):
+            load_index(self.path)
+
+    def test_only_registered_classes_are_loaded(self):
+        db = MemoryVectorDatabase()
+        db.insert([1.0, 0.0])
+        db.save(self.path)
+        manifest_path = os.path.join(self.path, "manifest.json")
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest["class"], "memory")
+
+        calls = []
+        with mock.patch.dict(VECTOR_DATABASES._targets, {"widget": lambda **config: calls.append(config)}):
+            for name, error in (("os:system", ValueError), ("widget", TypeError)):
+                manifest["class"] = name
+                with open(manifest_path, "w") as f:
+                    json.dump(manifest, f)
+                with self.assertRaises(error):
+                    load_index(self.path)
+        self.assertEqual(calls, [])
+
+    def test_unregistered_class_is_not_saved(self):
+        class Custom(MemoryVectorDatabase):
+            pass
+
+        db = Custom()
+        db.insert([1.0, 0.0])
+        with self.assertRaises(ValueError):
+            db.save(self.path)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_ivf_round_trip(self):
+        data = self.rng.normal(size=(400, 8)).astype(np.float32)
+        db = IVFVectorDatabase(nlist=8, nprobe=2, train_size=200)
+        db.insert(data, metadata=list(range(400)))
+        db.save(self.path)
+
+        loaded = load_index(self.path)
+        self.assertIsInstance(loaded, IVFVectorDatabase)
+        self.assertTrue(loaded.is_trained)
+        self.assertEqual(loaded.query(data[:10], top_k=5), db.query(data[:10], top_k=5))
+        loaded.insert(data[0], metadata="again")
+        loaded.save(self.path)
+        self.assertIn("again", load_index(self.path).query(data[0], top_k=2))
+
+    def test_ivf_append_writes_only_new_assignments(self):
+        data = self.rng.normal(size=(300, 8)).astype(np.float32)
+        db = IVFVectorDatabase(nlist=4, train_size=100)
+        db.insert(data[:200])
+        db.save(self.path)
+        files = {name: os.stat(os.path.join(self.path, name)).st_mtime_ns for name in os.listdir(self.path)}
+
+        db.save(self.path)
+        loaded = load_index(self.path)
+        loaded.insert(data[200:])
+        loaded.save(self.path)
+        for name, modified in files.items():
+            if name != "manifest.json":
+                self.assertEqual(os.stat(os.path.join(self.path, name)).st_mtime_ns, modified)
+        self.assertEqual(sorted(set(os.listdir(self.path)) - set(files)),
+                         ["ivf-00000.segment-00001.assignments.npy", "segment-00001.metadata.jsonl",
+                          "segment-00001.vectors.npy"])
+        self.assertEqual(load_index(self.path).query(data[250], top_k=1), loaded.query(data[250], top_k=1))
+
+    def test_retraining_drops_old_state_files(self):
+        data = self.rng.normal(size=(200, 8)).astype(np.float32)
+        db = IVFVectorDatabase(nlist=4, train_size=100)
+        db.insert(data)
+        db.save(self.path)
+        db.train(seed=1)
+        db.save(self.path)
+        state = sorted(name for name in os.listdir(self.path) if name.startswith("ivf-"))
+        self.assertEqual(state, ["ivf-00001.centroids.npy", "ivf-00001.segment-00000.assignments.npy"])
+        self.assertEqual(load_index(self.path).query(data[:5], top_k=3), db.query(data[:5], top_k=3))
+
+    def test_unserializable_metadata_writes_nothing(self):
+        db = MemoryVectorDatabase()
+        db.insert([1.0, 0.0], metadata="a")
+        db.save(self.path)
+        files = sorted(os.listdir(self.path))
+        db.insert([0.0, 1.0], metadata=object())
+        with self.assertRaises(TypeError):
+            db.save(self.path)
+        self.assertEqual(sorted(os.listdir(self.path)), files)
+        self.assertEqual(len(load_index(self.path)), 1)
+
+    def test_shared_between_processes(self):
+        db = MemoryVectorDatabase()
+        db.insert(np.eye(3), metadata=["x", "y", "z"])
+        db.save(self.path)
+        script = (
+            "from langtree.vectordb import MemoryVectorDatabase;"
+            f"print(MemoryVectorDatabase.load({self.path!r}).query([0, 0, 1], top_k=1)[0])"
+        )
+        outputs = [subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+                   for _ in range(2)]
+        self.assertEqual(outputs, ["z\n", "z\n"])
+
+
+if __name__ == '__main__':
+    unittest.main()